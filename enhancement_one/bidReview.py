@@ -7,10 +7,18 @@
 #               Contains Bid class and implementation of interaction
 #=======================================================================================
 
-from typing import NoReturn, NewType
+from typing import Iterator, NoReturn, NewType
 import binarySearchTree
+import collections
 import csv
 import datetime
+import os
+import sys
+import time
+
+# bidIngest is shared by all three enhancements and lives in the ingest folder beside them
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ingest'))
+import bidIngest
 
 BinarySearchTree = NewType('BinarySearchTree', binarySearchTree.BinarySearchTree)
 Bid = NewType('Bid', 'Bid')
@@ -118,19 +126,85 @@ class Bid:
         """
         return f"{self.bidId} | {self.title} | {self.fund} | {self.bidAmount}"
 
-class FileFormatError(Exception):
+# Kept here for code that catches bidReview.FileFormatError
+FileFormatError = bidIngest.FileFormatError
+   
+def loadBids(csvPath: str, bst: BinarySearchTree | None = None, parallel: bool = False, cached: bool = True, sortFirst: bool = False) -> BinarySearchTree:
     """
-    Custom exception for handling incorrectly formatted file
+    Loads bid data from a csv to the binary search tree in memory, reading the file a batch
+    of bids at a time
+    
+    Parameters
+    ----------
+    csvPath : str
+        Relative path of CSV file to load, which may be compressed as .gz, .bz2 or .xz,
+        or a file already open in text mode
+    bst : BinarySearchTree | None
+        A binary search tree to add the bids to. If None, a new one is created (default is None)
+    parallel : bool
+        Parse the file in one process per CPU. Bids are still inserted in file order
+        (default is False)
+    cached : bool
+        Reuse the parsed columns cached by an earlier load of the same, unchanged file,
+        and cache them if there aren't any (default is True)
+    sortFirst : bool
+        Read the file in bid ID order, sorted on disk if it is bigger than memory, and
+        rebuild the tree balanced as the bids stream in (default is False)
+        
+    Returns
+    -------
+    BinarySearchTree
+        A binary search tree loaded with the data from the csv file
     """
-   
-def loadBids(csvPath: str) -> BinarySearchTree:
+    print('Loading CSV file:', getattr(csvPath, 'name', csvPath))
+    if bst is None:
+        bst = binarySearchTree.BinarySearchTree()
+    try:
+        if sortFirst:
+            # The cache holds bids in file order, so sorted loads read the file itself
+            bst.insertSorted(Bid(*record) for batch in bidIngest.readBatchesSorted(csvPath) for record in batch)
+        else:
+            reader = bidIngest.readBatchesParallel if parallel else bidIngest.readBatches
+            batches = bidIngest.readBatchesCached(csvPath, reader) if cached and isinstance(csvPath, str) else reader(csvPath)
+            for batch in batches:
+                for record in batch:
+                    bst.insert(Bid(*record))
+    except Exception as error:
+        print("Error loading file")
+        print(f"Error type: {type(error)}")
+        print(f"Error message: {error}")
+    finally:
+        return bst
+    
+# Seconds of loading between snapshots of the tree when loading with checkpoints
+CHECKPOINT_SECONDS : float = 60.0
+
+def loadBidsResumable(csvPath: str,
+                      bst: BinarySearchTree | None = None,
+                      snapshotPath: str | None = None,
+                      rejectPath: str | None = None,
+                      checkpointSeconds: float = CHECKPOINT_SECONDS) -> BinarySearchTree:
     """
-    Loads bid data from a csv to the binary search tree in memory
+    Loads bid data from a csv like loadBids, but every checkpointSeconds writes the whole
+    tree, with how far through the file it has got, to a snapshot file. Running it again
+    after an interruption restores the tree from the snapshot and carries on from there.
+    Malformed rows are written to a reject file instead of stopping the load, and the
+    snapshot is deleted once the whole file is loaded
     
     Parameters
     ----------
     csvPath : str
         Relative path of CSV file to load
+    bst : BinarySearchTree | None
+        A binary search tree to add the bids to. If None, a new one is created (default is None)
+    snapshotPath : str | None
+        Relative path of the snapshot file. If None, the CSV's path with .checkpoint
+        added (default is None)
+    rejectPath : str | None
+        Relative path of the file malformed rows are written to. If None, the CSV's name
+        with _rejects added (default is None)
+    checkpointSeconds : float
+        Seconds between snapshots. Each one writes the whole tree (default is CHECKPOINT_SECONDS)
         
     Returns
     -------
@@ -138,38 +212,237 @@ def loadBids(csvPath: str) -> BinarySearchTree:
         A binary search tree loaded with the data from the csv file
     """
     print('Loading CSV file:', csvPath)
-    bst = binarySearchTree.BinarySearchTree()
+    snapshotPath = snapshotPath or f'{csvPath}.checkpoint'
+    rejectPath = rejectPath or bidIngest.rejectsPath(csvPath)
+    if bst is None:
+        bst = binarySearchTree.BinarySearchTree()
+    progress : dict | None = None
     try:
-        with open(csvPath) as csvFile:
-            # detects csv dialect and presence of header
-            dialect = csv.Sniffer().sniff(csvFile.read(1024))
-            csvFile.seek(0)
-            headerPresent = csv.Sniffer().has_header(csvFile.read(1024))
-            csvFile.seek(0)
-            csvReader = csv.reader(csvFile, dialect)
-            # check for presence of header
-            if not headerPresent:
-                raise FileFormatError("No header found in CSV file")
+        if os.path.exists(snapshotPath):
+            progress, records = bidIngest.readSnapshot(snapshotPath)
+            if bidIngest.checkpointMatches(csvPath, progress):
+                print(f'Resuming after {progress["rowsLoaded"]} bids')
+                # The snapshot is in bid ID order, which would leave the tree a linked list, so insert middles first
+                for record in _balancedOrder(records):
+                    bst.insert(Bid(*record))
             else:
-                rowNumber = 1
-                for row in csvReader:
-                    if rowNumber == 1:
-                        bidIdColumn = row.index('Auction ID')
-                        titleColumn = row.index('Auction Title')
-                        fundColumn = row.index('Fund')
-                        bidAmountColumn = row.index('Winning Bid')
-                        rowNumber = rowNumber + 1
-                    else:
-                        bst.insert(Bid(int(row[bidIdColumn]),
-                                       row[titleColumn],
-                                       row[fundColumn],
-                                       float((row[bidAmountColumn][1:]).replace(',','')))) #strip initial $ sign and convert to float
+                print('File has changed since the interrupted load, so loading it from the start')
+                progress = None
+        snapshotTime : float = time.monotonic()
+        for batch, progress in bidIngest.readBatchesResumable(csvPath, progress, rejectPath):
+            for record in batch:
+                bst.insert(Bid(*record))
+            if time.monotonic() - snapshotTime >= checkpointSeconds:
+                bidIngest.writeSnapshot(snapshotPath, progress, ((bid.bidId, bid.title, bid.fund, bid.bidAmount) for bid in bst.inOrderKeys()))
+                snapshotTime = time.monotonic()
+        if os.path.exists(snapshotPath):
+            os.remove(snapshotPath)
+        if progress is not None:
+            print(f'{progress["rowsLoaded"]} bids loaded')
+            if progress['rowsRejected']:
+                print(f'{progress["rowsRejected"]} malformed rows written to {rejectPath}')
     except Exception as error:
         print("Error loading file")
         print(f"Error type: {type(error)}")
         print(f"Error message: {error}")
     finally:
         return bst
+
+def _balancedOrder(records: list) -> Iterator:
+    """
+    Yields sorted records middle first, then the middles of each half, so inserting them
+    in that order builds a balanced tree. Not meant to be called on it's own
+    """
+    ranges : collections.deque = collections.deque([(0, len(records))])
+    while ranges:
+        low, high = ranges.popleft()
+        if low < high:
+            middle : int = (low + high) // 2
+            yield records[middle]
+            ranges.append((low, middle))
+            ranges.append((middle + 1, high))
+
+def loadBidsBulk(pattern: str,
+                 bst: BinarySearchTree | None = None,
+                 policy: str = 'latest',
+                 workers: int | None = None) -> BinarySearchTree:
+    """
+    Loads every CSV file in a directory, or matching a glob pattern, to the binary search tree
+    in one pass. The files are parsed at the same time, one per process, into temporary run
+    files sorted by bid ID, which are merged into a single stream with one bid per ID and
+    built into a balanced tree. The rows and megabytes per second of each file and of the
+    whole load are printed
+    
+    Parameters
+    ----------
+    pattern : str
+        A directory, whose .csv files are loaded, or a glob pattern such as 'eBid_*.csv'
+    bst : BinarySearchTree | None
+        A binary search tree to add the bids to. If None, a new one is created (default is None)
+    policy : str
+        Which copy of a bid ID found in several files is kept. 'latest' keeps the one from
+        the file modified last, 'first' the one from the file modified first. Bids already
+        in the tree are kept either way (default is 'latest')
+    workers : int | None
+        Number of parser processes. If None, one per CPU (default is None)
+        
+    Returns
+    -------
+    BinarySearchTree
+        A binary search tree loaded with the data from the csv files
+    """
+    print('Loading CSV files:', pattern)
+    if bst is None:
+        bst = binarySearchTree.BinarySearchTree()
+    try:
+        startTime : float = time.perf_counter()
+        paths : list = bidIngest.expandSources(pattern)
+        if not paths:
+            raise FileNotFoundError(f'No CSV files found for {pattern}')
+        stats : list = []
+        loaded : int = 0
+        
+        def _mergedBids() -> Iterator[Bid]:
+            nonlocal loaded
+            for record in bidIngest.mergeFiles(paths, policy, workers, stats=stats):
+                loaded += 1
+                yield Bid(*record)
+        
+        # The merge comes out in bid ID order, which insert would chain into a linked list
+        bst.insertSorted(_mergedBids())
+        bidIngest.reportThroughput(stats, loaded, time.perf_counter() - startTime)
+    except Exception as error:
+        print("Error loading file")
+        print(f"Error type: {type(error)}")
+        print(f"Error message: {error}")
+    finally:
+        return bst
+
+def followBids(csvPath: str, follower: bidIngest.BidFollower | None = None) -> bidIngest.BidFollower | None:
+    """
+    Starts following a CSV file for bids appended to it, in place of any file followed
+    before. Start it before loading the file so no row appended during the load is missed.
+    Rows read by both are duplicates, which the tree ignores
+    
+    Parameters
+    ----------
+    csvPath : str
+        Relative path of the CSV file to follow
+    follower : BidFollower | None
+        The follower of the file followed before, which is stopped (default is None)
+        
+    Returns
+    -------
+    BidFollower | None
+        The new follower, or None if the file can't be followed
+    """
+    if follower is not None:
+        follower.stop()
+    try:
+        follower = bidIngest.BidFollower(csvPath)
+        print('Following CSV file:', csvPath)
+        return follower
+    except Exception as error:
+        print(f'Error encountered: {error}')
+        print(f'    Encounted while following {csvPath}')
+        return None
+
+def applyFollowed(follower: bidIngest.BidFollower, bst: BinarySearchTree) -> int:
+    """
+    Inserts the bids appended to a followed file since the last call. Called before every
+    menu choice, so each answer includes the rows appended up to a poll interval before
+    
+    Parameters
+    ----------
+    follower : BidFollower
+        The follower of the file
+    bst : BinarySearchTree
+        The binary search tree to add the bids to
+        
+    Returns
+    -------
+    int
+        The number of bids read
+    """
+    try:
+        records : list = follower.pending()
+    except Exception as error:
+        print(f'Error encountered: {error}')
+        print(f'    Encounted while following {follower.csvPath}')
+        return 0
+    for record in records:
+        bst.insert(Bid(*record))
+    if records:
+        print(f'{len(records)} appended bids loaded from {follower.csvPath}')
+    return len(records)
+
+def applyDiff(oldPath: str, newPath: str, bst: BinarySearchTree) -> BinarySearchTree:
+    """
+    Brings a tree loaded from one export up to date with a corrected export of the same
+    auctions, adding, changing and removing only the bids that differ between them. Both
+    files are read in bid ID order a batch at a time, so memory doesn't depend on their size
+    
+    Parameters
+    ----------
+    oldPath : str
+        Relative path of the CSV file the tree was loaded from
+    newPath : str
+        Relative path of the corrected CSV file
+    bst : BinarySearchTree
+        The binary search tree holding the bids of oldPath
+        
+    Returns
+    -------
+    BinarySearchTree
+        The binary search tree, now holding the bids of newPath
+    """
+    print(f'Applying changes from {oldPath} to {newPath}')
+    counts : dict = {'insert': 0, 'update': 0, 'delete': 0}
+    try:
+        for changeSet in bidIngest.diffBatches(oldPath, newPath):
+            # Changes come in bid ID order, so insert middles first to keep the tree from becoming a list
+            for record in _balancedOrder(changeSet['insert']):
+                bst.insert(Bid(*record))
+            for record in changeSet['update']:
+                bid : Bid | None = bst.search(Bid(record[0], None, None, None))
+                if bid is None:
+                    bst.insert(Bid(*record))
+                else:
+                    # The bid ID is unchanged, so the bid keeps its place in the tree
+                    bid.title, bid.fund, bid.bidAmount = record[1:]
+            for record in changeSet['delete']:
+                bst.remove(Bid(record[0], None, None, None))
+            for change in counts:
+                counts[change] += len(changeSet[change])
+        print(f"{counts['insert']} bids added, {counts['update']} changed, {counts['delete']} removed")
+    except Exception as error:
+        print("Error loading file")
+        print(f"Error type: {type(error)}")
+        print(f"Error message: {error}")
+    finally:
+        return bst
+
+def exportBids(tree: BinarySearchTree, path: str) -> int:
+    """
+    Streams the bids in the binary search tree to a file in bid ID order, as JSON Lines when the
+    name ends in .jsonl and as CSV otherwise. Bids are written as the tree is walked so
+    no copy of the data is made
+    
+    Parameters
+    ----------
+    tree : BinarySearchTree
+        The tree to export
+    path : str
+        Relative path of the file to write. Ending it in .gz, .bz2 or .xz compresses the file
+        
+    Returns
+    -------
+    int
+        The number of bids exported
+    """
+    exported : int = bidIngest.exportRecords(((bid.bidId, bid.title, bid.fund, bid.bidAmount) for bid in tree.inOrderKeys()), path)
+    print(f'{exported} bids exported')
+    return exported
     
 def displayMainMenu() -> int:
     """
@@ -187,10 +460,12 @@ def displayMainMenu() -> int:
         print("  2. Display All Bids")
         print("  3. Find Bid")
         print("  4. Remove Bid")
+        print("  5. Apply Corrected Export")
+        print("  6. Export Bids")
         print("  9. Exit")
         choice = input("Enter choice: ")
         
-        if choice in ["1", "2", "3", "4", "9"]:
+        if choice in ["1", "2", "3", "4", "5", "6", "9"]:
             return int(choice)
         else:
             print("Invalid choice. Please try again")
@@ -228,10 +503,25 @@ def displayLoadMenu(bstRoot : Node) -> int:
         return 2
     
 if __name__ == '__main__':
+    # Run with --parallel to parse loaded files in one process per CPU, or with --resume
+    # to snapshot the tree as files load so an interrupted load can carry on
+    parallel : bool = '--parallel' in sys.argv[1:]
+    resume : bool = '--resume' in sys.argv[1:]
+    # Entering a directory or glob pattern to load loads every file it names. Duplicate
+    # bid IDs keep the copy from the newest file, or the oldest when run with --first-wins
+    policy : str = 'first' if '--first-wins' in sys.argv[1:] else 'latest'
+    # Run with --follow to keep loading rows appended to the last file loaded
+    follow : bool = '--follow' in sys.argv[1:]
+    follower : bidIngest.BidFollower | None = None
+    # Run with --sorted to load files in bid ID order, sorting them on disk first when they
+    # are bigger than memory
+    presort : bool = '--sorted' in sys.argv[1:]
     bst : binarySearchTree = binarySearchTree.BinarySearchTree()
     choice : int = 0
     while (choice != 9):
         choice = displayMainMenu()
+        if follower is not None:
+            applyFollowed(follower, bst)
     
         match choice:
             # Load file
@@ -244,7 +534,14 @@ if __name__ == '__main__':
                         bst.root = None
                     csvFile : str = input("Enter name of file to load: ")
                     time1 = datetime.datetime.now()
-                    bst = loadBids(csvFile)
+                    if follow and not bidIngest.isBulkSource(csvFile):
+                        follower = followBids(csvFile, follower)
+                    if bidIngest.isBulkSource(csvFile):
+                        bst = loadBidsBulk(csvFile, bst, policy)
+                    elif resume:
+                        bst = loadBidsResumable(csvFile, bst)
+                    else:
+                        bst = loadBids(csvFile, bst, parallel, sortFirst=presort)
                     time2 = datetime.datetime.now()
                     print (f'Total load time: {time2 - time1}')
                 elif loadChoice == 3:
@@ -271,5 +568,26 @@ if __name__ == '__main__':
                 bst.remove(searchedBid)
                 time2 = datetime.datetime.now()
                 print (f'Total removal time: {time2 - time1}')
+            # Apply only the differences between a loaded export and its correction
+            case 5:
+                oldFile : str = input("Enter name of file originally loaded: ")
+                newFile : str = input("Enter name of corrected file: ")
+                time1 = datetime.datetime.now()
+                bst = applyDiff(oldFile, newFile, bst)
+                time2 = datetime.datetime.now()
+                print (f'Total update time: {time2 - time1}')
+            # Write the bids out in bid ID order
+            case 6:
+                exportFile : str = input("Enter name of file to export to: ")
+                time1 = datetime.datetime.now()
+                try:
+                    exportBids(bst, exportFile)
+                except OSError as error:
+                    print(f'Error encountered: {error}')
+                    print(f'    Encounted while exporting to: {exportFile}')
+                time2 = datetime.datetime.now()
+                print (f'Total export time: {time2 - time1}')
+    if follower is not None:
+        follower.stop()
     print("Good bye")
             
@@ -7,7 +7,8 @@
 #               Contains BinarySearchTree class
 #=======================================================================================
 
-from typing import NewType, Any, NoReturn
+from typing import NewType, Any, NoReturn, Iterable, Iterator
+import heapq
 
 # New type definitions
 # Prefixed with 't_' to differentiate from 
@@ -155,6 +156,8 @@ class BinarySearchTree:
     -------
     insert(key=Any)
         Inserts a new key into the BST
+    insertSorted(keys=Iterable)
+        Inserts keys given in order, rebuilding the BST balanced
     remove(key=any)
         Removes a key from the BST
     search(key=any)
@@ -205,6 +208,59 @@ class BinarySearchTree:
         else:
             parentNode.rightNode = Node(key)
     
+    def insertSorted(self, keys: Iterable[Any]) -> NoReturn:
+        """
+        Inserts keys given in ascending order, which insert would chain into a linked list,
+        by rebuilding the BST balanced in a single pass over them and the keys already in
+        it. The keys are never gathered into a list, so they can stream in. As with insert,
+        keys already in the BST and repeats of a key are not added
+        
+        Parameters
+        ----------
+        keys : Iterable[Any]
+            The keys to be inserted into the BST, smallest first
+        """
+        # Keys already in the BST come first among equal keys, so they are the ones kept
+        mergedKeys : Iterator[Any] = heapq.merge(list(self.inOrderKeys()), keys)
+        # The nth node in order sits at the height of n's lowest set bit, as in a complete
+        # tree, so each node's left child is the last node one level down, and a node that
+        # is a right child hangs from the last node one level up
+        lastAtLevel : list = []
+        count : int = 0
+        previousKey : Any = None
+        for key in mergedKeys:
+            if count and not previousKey < key:
+                continue
+            previousKey = key
+            count += 1
+            node : Node = Node(key)
+            level : int = (count & -count).bit_length() - 1
+            if level:
+                node.leftNode = lastAtLevel[level - 1]
+            if (count >> (level + 1)) & 1:
+                lastAtLevel[level + 1].rightNode = node
+            if level == len(lastAtLevel):
+                lastAtLevel.append(node)
+            else:
+                lastAtLevel[level] = node
+        
+        # Nodes whose parents would have come after the last key are left over, highest
+        # first, and each goes at the bottom of the right edge of the ones above it
+        self.root = None
+        bottomRight : Node = None
+        for level in range(len(lastAtLevel) - 1, -1, -1):
+            # The last node at a level is the largest odd multiple of 2 ** level up to count
+            position : int = ((count >> level) - 1 | 1) << level
+            if (position >> (level + 1)) & 1 or position + (1 << level) <= count:
+                continue
+            if self.root is None:
+                self.root = lastAtLevel[level]
+            else:
+                bottomRight.rightNode = lastAtLevel[level]
+            bottomRight = lastAtLevel[level]
+            while bottomRight.rightNode is not None:
+                bottomRight = bottomRight.rightNode
+    
     def remove(self, key: Any) -> NoReturn:
         """
         Removes a key from the BST
@@ -290,9 +346,20 @@ class BinarySearchTree:
         return None
     
     # Solution adapted from: https://www.geeksforgeeks.org/inorder-tree-traversal-without-recursion/
-    def inOrderTraversal(self) -> NoReturn:
+    def inOrderKeys(self, low : Any = None) -> Iterator[Any]:
         """
-        Prints the BST to the screen in order
+        Yields the keys in the BST in order without building a list of them
+        
+        Parameters
+        ----------
+        low: Any (optional)
+            Start at the first key not less than low, without visiting the
+            subtrees below it. If None, start at the smallest key (default is None)
+        
+        Returns
+        -------
+        Iterator[Any]
+            The keys from smallest to largest
         """
         # Stack to hold path while traversing
         stack : list = []
@@ -300,9 +367,23 @@ class BinarySearchTree:
         while currentNode is not None or len(stack) > 0:
             # Traverse tree and add path to stack
             while currentNode is not None:
+                # Keys to the left of one below low are below low too
+                if low is not None and currentNode.key < low:
+                    currentNode = currentNode.rightNode
+                    continue
                 stack.append(currentNode)
                 currentNode = currentNode.leftNode
+            # The keys left were all below low
+            if len(stack) == 0:
+                break
             currentNode = stack.pop()
-            print(currentNode, end='\n')
+            yield currentNode.key
             currentNode = currentNode.rightNode
+    
+    def inOrderTraversal(self) -> NoReturn:
+        """
+        Prints the BST to the screen in order
+        """
+        for key in self.inOrderKeys():
+            print(key, end='\n')
         return
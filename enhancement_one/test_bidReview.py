@@ -8,12 +8,27 @@
 
 import unittest
 import bidReview
+# Importable once bidReview has put the shared ingest folder on the path
+import bidIngest
 import binarySearchTree
 import csv
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from io import StringIO
 
 class TestBid(unittest.TestCase):
     # Setup bids for tests
     def setUp(self):
+        # Work in a temporary directory so the test files and the load cache stay out of the source tree
+        scratchDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(scratchDirectory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(scratchDirectory.name)
         self.bid1 = bidReview.Bid(1, "Bid 1", "General Fund", 1000)
         self.bid2 = bidReview.Bid(2, "Bid 2", "Enterprise", 2000)
         self.bid3 = bidReview.Bid(3, "Bid 3", "General Fund", 1500)
@@ -82,5 +97,120 @@ class TestBid(unittest.TestCase):
         except Exception as e:
             self.fail(f"loadBids raised an exception on \"good\" CSV file: {e}")
         
+    # Test exporting bids to CSV and compressed JSON Lines in bid ID order
+    def test_export_bids(self):
+        tree = binarySearchTree.BinarySearchTree()
+        for bid in (self.bid3, self.bid1, self.bid2):
+            tree.insert(bid)
+        sys.stdout = StringIO()
+        try:
+            self.assertEqual(bidReview.exportBids(tree, 'test_export.csv'), 3)
+            self.assertEqual(bidReview.exportBids(tree, 'test_export.jsonl.gz'), 3)
+        finally:
+            sys.stdout = sys.__stdout__
+        with open('test_export.csv', newline='') as exportFile:
+            self.assertEqual(list(csv.reader(exportFile)), [['auctionID', 'auctionTitle', 'fund', 'winningBid'],
+                                                             ['1', 'Bid 1', 'General Fund', '1000'],
+                                                             ['2', 'Bid 2', 'Enterprise', '2000'],
+                                                             ['3', 'Bid 3', 'General Fund', '1500']])
+        with gzip.open('test_export.jsonl.gz', 'rt') as exportFile:
+            self.assertEqual([json.loads(line)['auctionID'] for line in exportFile], [1, 2, 3])
+        os.remove('test_export.csv')
+        os.remove('test_export.jsonl.gz')
+        
+    # Test that loadBidsResumable restores the tree from a snapshot, carries on after it and sets malformed rows aside
+    def test_load_bids_resumable(self):
+        with open('test_bidReviewGood.csv', 'w', newline='') as csvfile:
+            testCsvWriter = csv.writer(csvfile)
+            testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+            for auctionID in range(1, 9):
+                testCsvWriter.writerow([auctionID, f'Title{auctionID}', 'Fund1', 'unknown' if auctionID == 6 else f'${auctionID}'])
+        self.addCleanup(os.remove, 'test_bidReviewGood_rejects.csv')
+        # Snapshot the first batch, as an interrupted load would have
+        records, progress = next(bidIngest.readBatchesResumable('test_bidReviewGood.csv', batchRows=1, blockBytes=40))
+        bidIngest.writeSnapshot('test_bidReviewGood.csv.checkpoint', progress, iter(records))
+        sys.stdout = StringIO()
+        try:
+            bst = bidReview.loadBidsResumable('test_bidReviewGood.csv', checkpointSeconds=0)
+            self.assertIn(f'Resuming after {progress["rowsLoaded"]} bids', sys.stdout.getvalue())
+            self.assertIn('7 bids loaded\n1 malformed rows written to test_bidReviewGood_rejects.csv', sys.stdout.getvalue())
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertEqual([bid.bidId for bid in bst.inOrderKeys()], [1, 2, 3, 4, 5, 7, 8])
+        self.assertFalse(os.path.exists('test_bidReviewGood.csv.checkpoint'))
+        
+    # Test that loadBidsBulk loads every file in a directory, keeping the newest file's copy of a duplicate bid
+    def test_load_bids_bulk(self):
+        os.makedirs('test_bidReviewBulk', exist_ok=True)
+        self.addCleanup(shutil.rmtree, 'test_bidReviewBulk')
+        for fileName, rows in (('older.csv', [[3, 'Title3', 'Fund3', '$3'], [2, 'Title2', 'Fund2', '$2']]),
+                               ('newer.csv', [[2, 'Title2', 'Fund2', '$2,000.00'], [1, 'Title1', 'Fund1', '$1']])):
+            with open(os.path.join('test_bidReviewBulk', fileName), 'w', newline='') as csvfile:
+                testCsvWriter = csv.writer(csvfile)
+                testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+                testCsvWriter.writerows(rows)
+        os.utime(os.path.join('test_bidReviewBulk', 'older.csv'), (1_000_000, 1_000_000))
+        sys.stdout = StringIO()
+        try:
+            bst = bidReview.loadBidsBulk('test_bidReviewBulk', workers=1)
+            self.assertIn('2 files, 4 rows, 3 bids loaded', sys.stdout.getvalue())
+            first = bidReview.loadBidsBulk('test_bidReviewBulk/*.csv', policy='first', workers=1)
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertEqual([str(bid) for bid in bst.inOrderKeys()], ['1 | Title1 | Fund1 | 1.0', '2 | Title2 | Fund2 | 2000.0', '3 | Title3 | Fund3 | 3.0'])
+        self.assertEqual([bid.bidAmount for bid in first.inOrderKeys()], [1.0, 2.0, 3.0])
+        
+    # Test that rows appended to a followed file are inserted when applyFollowed is called
+    def test_follow_bids(self):
+        with open('test_bidReviewGood.csv', 'w', newline='') as csvfile:
+            testCsvWriter = csv.writer(csvfile)
+            testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+            testCsvWriter.writerow([2, 'Title2', 'Fund2', '$2'])
+            testCsvWriter.writerow([1, 'Title1', 'Fund1', '$1'])
+        sys.stdout = StringIO()
+        try:
+            follower = bidReview.followBids('test_bidReviewGood.csv')
+            self.addCleanup(follower.stop)
+            bst = bidReview.loadBids('test_bidReviewGood.csv', cached=False)
+            with open('test_bidReviewGood.csv', 'a', newline='') as csvfile:
+                csv.writer(csvfile).writerow([3, 'Title3', 'Fund3', '$3'])
+            deadline = time.monotonic() + 5
+            while not bidReview.applyFollowed(follower, bst) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertEqual([bid.bidId for bid in bst.inOrderKeys()], [1, 2, 3])
+        
+    # Test that applyDiff changes a loaded tree into what loading the corrected file gives
+    def test_apply_diff(self):
+        for fileName, rows in (('test_bidReviewGood.csv', [[2, 'Title2', 'Fund2', '$2'], [1, 'Title1', 'Fund1', '$1'], [3, 'Title3', 'Fund3', '$3']]),
+                               ('test_bidReviewCorrected.csv', [[4, 'Title4', 'Fund4', '$4'], [1, 'Title1', 'Fund1', '$1'], [3, 'Title3', 'Fund1', '$30']])):
+            with open(fileName, 'w', newline='') as csvfile:
+                testCsvWriter = csv.writer(csvfile)
+                testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+                testCsvWriter.writerows(rows)
+        self.addCleanup(os.remove, 'test_bidReviewCorrected.csv')
+        sys.stdout = StringIO()
+        try:
+            bst = bidReview.applyDiff('test_bidReviewGood.csv', 'test_bidReviewCorrected.csv', bidReview.loadBids('test_bidReviewGood.csv', cached=False))
+            self.assertIn('1 bids added, 1 changed, 1 removed', sys.stdout.getvalue())
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertEqual([str(bid) for bid in bst.inOrderKeys()], ['1 | Title1 | Fund1 | 1.0', '3 | Title3 | Fund1 | 30.0', '4 | Title4 | Fund4 | 4.0'])
+        
+    # Test that a sorted load inserts the middle bid first, so the tree comes out balanced
+    def test_load_bids_sorted(self):
+        with open('test_bidReviewGood.csv', 'w', newline='') as csvfile:
+            testCsvWriter = csv.writer(csvfile)
+            testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+            testCsvWriter.writerows([[auctionID, f'Title{auctionID}', 'Fund1', f'${auctionID}'] for auctionID in (5, 2, 7, 1, 4, 6, 3)])
+        sys.stdout = StringIO()
+        try:
+            bst = bidReview.loadBids('test_bidReviewGood.csv', cached=False, sortFirst=True)
+        finally:
+            sys.stdout = sys.__stdout__
+        self.assertEqual([bid.bidId for bid in bst.inOrderKeys()], [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(bst.root.key.bidId, 4)
+        
 if __name__ == '__main__':
     unittest.main(verbosity=2)
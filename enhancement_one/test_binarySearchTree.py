@@ -29,6 +29,12 @@ def isBinarySearchTree(node, leftNode=None, rightNode=None):
         # recursively check left and right nodes
         return isBinarySearchTree(node.leftNode, leftNode, node) and isBinarySearchTree(node.rightNode, node, rightNode)
 
+# Utility function to find the number of nodes on the longest path from the root
+def treeHeight(node):
+    if node is None:
+        return 0
+    return 1 + max(treeHeight(node.leftNode), treeHeight(node.rightNode))
+
 
 class TestBinarySearchTree(unittest.TestCase):
     # Build test BST
@@ -69,6 +75,18 @@ class TestBinarySearchTree(unittest.TestCase):
         self.assertTrue(self.bst.root.key == keys[0])
         self.assertTrue(isBinarySearchTree(self.bst.root))
         
+    # Test that sorted keys build a tree of the least possible height, merged with the keys already in it
+    def test_insert_sorted(self):
+        for count in range(0, 300):
+            tree = binarySearchTree.BinarySearchTree()
+            tree.insertSorted(iter(range(count)))
+            self.assertEqual(list(tree.inOrderKeys()), list(range(count)))
+            self.assertTrue(isBinarySearchTree(tree.root))
+            self.assertEqual(treeHeight(tree.root), count.bit_length())
+        self.bst.insertSorted([1, 3, 3, 11, 30])
+        self.assertEqual(list(self.bst.inOrderKeys()), sorted(set(keys) | {1, 11, 30}))
+        self.assertTrue(isBinarySearchTree(self.bst.root))
+        
     # Test that search works correctly
     def test_search(self):
         for key in keys:
@@ -114,5 +132,11 @@ class TestBinarySearchTree(unittest.TestCase):
         sys.stdout = sys.__stdout__
         self.assertEqual(result.getvalue().strip(), expected)
     
+    # Test in-order key generator
+    def test_in_order_keys(self):
+        self.assertEqual(list(self.bst.inOrderKeys()), sorted(set(keys)))
+        for low in range(-1, max(keys) + 2):
+            self.assertEqual(list(self.bst.inOrderKeys(low)), [key for key in sorted(set(keys)) if key >= low])
+    
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,533 @@
+#=======================================================================================
+# Name        : asyncBidDatabase.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Awaitable wrapper around BidDatabase for use inside asyncio services
+#=======================================================================================
+
+import asyncio
+import bidDatabase
+import concurrent.futures
+import contextlib
+import io
+import queue
+import sqlite3
+import threading
+import typing
+
+# Most queued writes the writer thread commits together in one transaction
+MAX_COALESCED_WRITES: int = 1000
+
+class AsyncBidDatabase:
+    """
+    Class for using a SQLite bid database from asyncio without blocking the event loop.
+    All writes go through one writer thread, which commits every write waiting in its
+    queue as a single transaction. Reads run on a pool of reader threads, each with its
+    own connection, and see every committed write thanks to WAL journaling
+
+    Attributes
+    ----------
+    writer: BidDatabase
+        The database used by the writer thread
+    readers: list[BidDatabase]
+        The database used by each reader thread
+    readerThreads: int
+        The number of reader threads
+    maxCoalescedWrites: int
+        Most writes committed together in one transaction
+    transactionCount: int
+        The number of transactions the writer thread has committed
+    writeCount: int
+        The number of writes those transactions held
+    """
+    def __init__(self, fileName: str, readerThreads: int = 4, maxCoalescedWrites: int = MAX_COALESCED_WRITES) -> None:
+        """
+        Initializer for the AsyncBidDatabase class. Connects the writer and every reader
+
+        Parameters
+        ----------
+        fileName: str
+            The relative path to the SQLite database to connect to. Must be a file since
+            the threads each need their own connection
+        readerThreads: int (optional)
+            The number of reader threads (default is 4)
+        maxCoalescedWrites: int (optional)
+            Most writes committed together in one transaction (default is MAX_COALESCED_WRITES)
+        """
+        if fileName == ':memory:':
+            raise ValueError('AsyncBidDatabase needs a database file, not :memory:')
+        self.maxCoalescedWrites: int = maxCoalescedWrites
+        self.readerThreads: int = readerThreads
+        self.transactionCount: int = 0
+        self.writeCount: int = 0
+        # Queue of (operation, description, future) writes, with None telling the writer thread to stop
+        self._writes: queue.SimpleQueue = queue.SimpleQueue()
+        self.readers: list[bidDatabase.BidDatabase] = []
+        self._readerLocal: threading.local = threading.local()
+        self._readerExecutor: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=readerThreads, thread_name_prefix='bidReader')
+        # Connect quietly so the writer and readers share one connection message
+        with contextlib.redirect_stdout(io.StringIO()):
+            connected: threading.Event = threading.Event()
+            self._writerThread: threading.Thread = threading.Thread(target=self._writeLoop, args=(fileName, connected),
+                                                                    name='bidWriter', daemon=True)
+            self._writerThread.start()
+            connected.wait()
+            self._onEachReader(lambda: self._openReader(fileName))
+        print(f'Connected to database with 1 writer and {readerThreads} readers successfully')
+
+    def _onEachReader(self, task: typing.Callable[[], typing.Any]) -> None:
+        """
+        Runs a task exactly once on every reader thread. Not meant to be called on it's own
+        """
+        # Holding every thread at the barrier stops one thread from picking up two of the tasks
+        barrier: threading.Barrier = threading.Barrier(self.readerThreads)
+
+        def _task() -> None:
+            barrier.wait()
+            task()
+
+        for future in [self._readerExecutor.submit(_task) for _ in range(self.readerThreads)]:
+            future.result()
+
+    def _openReader(self, fileName: str) -> None:
+        """
+        Connects the calling reader thread. Not meant to be called on it's own
+        """
+        self._readerLocal.database = bidDatabase.BidDatabase(fileName)
+        self.readers.append(self._readerLocal.database)
+
+    async def _read(self, task: typing.Callable[[bidDatabase.BidDatabase], typing.Any]) -> typing.Any:
+        """
+        Runs a task with a reader thread's database. Not meant to be called on it's own
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readerExecutor, lambda: task(self._readerLocal.database))
+
+    async def _write(self, operation: typing.Callable[[sqlite3.Cursor], int], description: str) -> int | None:
+        """
+        Queues a write for the writer thread and waits for its transaction to commit.
+        Not meant to be called on it's own
+
+        Parameters
+        ----------
+        operation: Callable[[sqlite3.Cursor], int]
+            Runs the write on the writer's cursor and returns the number of rows changed
+        description: str
+            What the write does, displayed if it fails
+
+        Returns
+        -------
+        int | None
+            The number of rows changed, or None if the write failed
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._writes.put((operation, description, future))
+        return await asyncio.wrap_future(future)
+
+    def _writeLoop(self, fileName: str, connected: threading.Event) -> None:
+        """
+        Body of the writer thread. Not meant to be called on it's own
+        """
+        self.writer: bidDatabase.BidDatabase = bidDatabase.BidDatabase(fileName)
+        # Under WAL, readers see the last commit without blocking the writer
+        self.writer.cursor.execute('PRAGMA journal_mode = WAL').fetchall()
+        connected.set()
+        stopping: bool = False
+        while not stopping:
+            item = self._writes.get()
+            if item is None:
+                break
+            batch: list[tuple] = [item]
+            # Everything else already queued joins the same transaction
+            while len(batch) < self.maxCoalescedWrites:
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commitBatch(batch)
+        self.writer.connection.close()
+
+    def _commitBatch(self, batch: list[tuple]) -> None:
+        """
+        Runs a batch of writes in one transaction, each inside its own savepoint so a
+        failed write is rolled back without losing the others. Database errors give the
+        write a result of None, as in BidDatabase, and any other error is raised to the
+        write's caller, so no error stops the writer thread. Not meant to be called on it's own
+        """
+        cursor: sqlite3.Cursor = self.writer.cursor
+        results: list[int | None | Exception] = []
+        try:
+            cursor.execute('BEGIN')
+            for operation, description, _ in batch:
+                cursor.execute('SAVEPOINT coalescedWrite')
+                try:
+                    results.append(max(operation(cursor), 0))
+                    cursor.execute('RELEASE coalescedWrite')
+                except Exception as error:
+                    cursor.execute('ROLLBACK TO coalescedWrite')
+                    cursor.execute('RELEASE coalescedWrite')
+                    print(f'Error encountered: {error}')
+                    print(f'    Encounted while performing: {description}')
+                    results.append(None if isinstance(error, sqlite3.Error) else error)
+            self.writer.connection.commit()
+        except Exception as error:
+            self.writer.connection.rollback()
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while committing {len(batch)} writes')
+            results = [None if isinstance(error, sqlite3.Error) else error] * len(batch)
+        self.transactionCount += 1
+        self.writeCount += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """
+        Commits any queued writes, then closes every connection and stops the threads
+        """
+        self._writes.put(None)
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._writerThread.join)
+        await loop.run_in_executor(None, self._onEachReader, lambda: self._readerLocal.database.connection.close())
+        self._readerExecutor.shutdown()
+
+    async def __aenter__(self) -> 'AsyncBidDatabase':
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    ############################
+    # Table based CRUD functions
+    ############################
+    async def createTable(self, tableName: str, tableCols: dict[str, str]) -> None:
+        """
+        Creates a table if it doesn't already exist
+
+        Parameters
+        ----------
+        tableName: str
+            Name of the table to create
+        tableCols: dict[str, str]
+            The names and attributes of the table to add, as for BidDatabase.createTable
+        """
+        queryString: str = f'CREATE TABLE IF NOT EXISTS {tableName} ({", ".join(f"{colName} {colProperty}" for colName, colProperty in tableCols.items())});'
+        await self._write(lambda cursor: cursor.execute(queryString).rowcount, queryString)
+
+    #############################
+    # Record based CRUD functions
+    #############################
+    async def createRecord(self, tableName: str, tableCols: tuple[str], record: tuple[typing.Any], ignoreDuplicates: bool = True) -> int | None:
+        """
+        Creates a singular record. Concurrent calls are committed together
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to add a record to
+        tableCols: tuple[str]
+            The columns to add values to
+        record: tuple[Any]
+            The values of the record to add. Must line up with the values in tableCols
+        ignoreDuplicates: bool (optional)
+            Defines what to do if duplicates are found (default is True):
+                True: Don't add record when the key is already in the table
+                False: Update the record if the key is already in the table
+
+        Returns
+        -------
+        int | None
+            The number of records added, or None if the insert failed
+        """
+        return await self.createRecords(tableName, tableCols, (record,), ignoreDuplicates)
+
+    async def createRecords(self,
+                            tableName: str,
+                            tableCols: tuple[str],
+                            records: typing.Iterable[tuple[typing.Any]],
+                            ignoreDuplicates: bool = True) -> int | None:
+        """
+        Creates multiple records in one write
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to add records to
+        tableCols: tuple[str]
+            The columns to add values to
+        records: Iterable[tuple[Any]]
+            The values of the records to add. Must line up with the values in tableCols.
+            Consumed on the writer thread
+        ignoreDuplicates: bool (optional)
+            Defines what to do if duplicates are found (default is True):
+                True: Don't add record when the key is already in the table
+                False: Update the record if the key is already in the table
+
+        Returns
+        -------
+        int | None
+            The number of records added, or None if the insert failed
+        """
+        queryString: str = (f'INSERT OR {"IGNORE" if ignoreDuplicates else "REPLACE"} INTO {tableName} ({", ".join(tableCols)}) '
+                            f'VALUES ({", ".join("?" * len(tableCols))})')
+
+        def _insert(cursor: sqlite3.Cursor) -> int:
+            with bidDatabase.recursiveTriggers(cursor, not ignoreDuplicates):
+                return cursor.executemany(queryString, records).rowcount
+
+        return await self._write(_insert, queryString)
+
+    async def loadRecords(self,
+                          tableName: str,
+                          tableCols: tuple[str],
+                          records: typing.Iterable[tuple[typing.Any]] | typing.AsyncIterable[tuple[typing.Any]],
+                          ignoreDuplicates: bool = True,
+                          batchRows: int = bidDatabase.EXPORT_BATCH_ROWS) -> int:
+        """
+        Bulk loads records a batch at a time, so only a couple of batches are in memory.
+        The next batch is gathered while the previous one is being written
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to add records to
+        tableCols: tuple[str]
+            The columns to add values to
+        records: Iterable[tuple[Any]] | AsyncIterable[tuple[Any]]
+            The values of the records to add. Must line up with the values in tableCols
+        ignoreDuplicates: bool (optional)
+            As for createRecords (default is True)
+        batchRows: int (optional)
+            Records inserted per write (default is EXPORT_BATCH_ROWS)
+
+        Returns
+        -------
+        int
+            The number of records added
+        """
+        async def _batches() -> typing.AsyncIterator[list[tuple]]:
+            batch: list[tuple] = []
+            if isinstance(records, typing.AsyncIterable):
+                async for record in records:
+                    batch.append(record)
+                    if len(batch) == batchRows:
+                        yield batch
+                        batch = []
+            else:
+                for record in records:
+                    batch.append(record)
+                    if len(batch) == batchRows:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+
+        added: int = 0
+        pending: asyncio.Task | None = None
+        async for batch in _batches():
+            write: asyncio.Task = asyncio.ensure_future(self.createRecords(tableName, tableCols, batch, ignoreDuplicates))
+            if pending is not None:
+                added += await pending or 0
+            pending = write
+        if pending is not None:
+            added += await pending or 0
+        print(f'{added} records loaded')
+        return added
+
+    async def readRecord(self, tableName: str, keyName: str, id: typing.Any) -> tuple | None:
+        """
+        Reads a singular record
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to search
+        keyName: str
+            The name of the column containing the keys
+        id: Any
+            The key to find
+
+        Returns
+        -------
+        tuple | None
+            The record found, or None if there isn't one
+        """
+        queryString: str = f'SELECT * FROM {tableName} WHERE {keyName} = ?'
+        records: list[tuple] | None = await self._read(lambda database: database._readQuery(queryString, parameters=(id,)))
+        return records[0] if records else None
+
+    async def readRecordsByKey(self, tableName: str, keyName: str, ids: typing.Iterable[typing.Any]) -> list[tuple | None]:
+        """
+        Reads many records in one trip to a reader thread, looking keys up a chunk at a time
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to search
+        keyName: str
+            The name of the column containing the keys
+        ids: Iterable[Any]
+            The keys to find
+
+        Returns
+        -------
+        list[tuple | None]
+            The record found for each key in the order given, or None where there isn't one
+        """
+        ids = list(ids)
+
+        def _lookup(database: bidDatabase.BidDatabase) -> list[tuple | None]:
+            found: dict[typing.Any, tuple] = {}
+            for start in range(0, len(ids), bidDatabase.BATCH_CHUNK_SIZE):
+                chunk: list[typing.Any] = ids[start:start + bidDatabase.BATCH_CHUNK_SIZE]
+                queryString: str = f'SELECT {keyName}, * FROM {tableName} WHERE {keyName} IN ({", ".join("?" * len(chunk))})'
+                for record in database._readQuery(queryString, parameters=chunk) or []:
+                    found[record[0]] = record[1:]
+            return [found.get(id) for id in ids]
+
+        return await self._read(_lookup)
+
+    async def readRange(self, tableName: str, keyName: str, low: typing.Any, high: typing.Any) -> list[tuple]:
+        """
+        Reads the records whose keys fall within a range, in key order
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to search
+        keyName: str
+            The name of the column containing the keys
+        low: Any
+            The smallest key to return
+        high: Any
+            The largest key to return
+
+        Returns
+        -------
+        list[tuple]
+            The records found
+        """
+        return await self._read(lambda database: database.readRange(tableName, keyName, low, high))
+
+    async def streamRecords(self,
+                            tableName: str = 'bids',
+                            keyName: str = 'auctionID',
+                            batchRows: int = bidDatabase.EXPORT_BATCH_ROWS) -> typing.AsyncIterator[tuple]:
+        """
+        Yields every record in key order for use with async for, reading one batch at a time
+
+        Parameters
+        ----------
+        tableName: str (optional)
+            The table to read (default is 'bids')
+        keyName: str (optional)
+            The key column to order by, which must be unique (default is 'auctionID')
+        batchRows: int (optional)
+            Records read per trip to a reader thread (default is EXPORT_BATCH_ROWS)
+
+        Yields
+        ------
+        tuple
+            Each record
+        """
+        # Each batch picks up after the last key seen, so no cursor is held open between batches
+        queryString: str = f'SELECT {keyName}, * FROM {tableName} ORDER BY {keyName} LIMIT ?'
+        nextString: str = f'SELECT {keyName}, * FROM {tableName} WHERE {keyName} > ? ORDER BY {keyName} LIMIT ?'
+        batch: list[tuple] | None = await self._read(lambda database: database._readQuery(queryString, parameters=(batchRows,)))
+        while batch:
+            for record in batch:
+                yield record[1:]
+            if len(batch) < batchRows:
+                break
+            lastKey: typing.Any = batch[-1][0]
+            batch = await self._read(lambda database: database._readQuery(nextString, parameters=(lastKey, batchRows)))
+
+    async def updateRecord(self, tableName: str, keyName: str, id: typing.Any, updates: dict[str, typing.Any]) -> int | None:
+        """
+        Update a specific record
+
+        Parameters
+        ----------
+        tableName:
+            The name of the table that contains the record to update
+        keyName: str
+            The name of the column containing the keys
+        id: Any
+            The key to find and update
+        updates: dict[str, Any]
+            The updated values. Must be a dictionary where the keys are the column names
+            and the values are the respective updates
+
+        Returns
+        -------
+        int | None
+            The number of records updated, or None if the update failed
+        """
+        queryString: str = f'UPDATE {tableName} SET {", ".join(f"{colName} = ?" for colName in updates)} WHERE {keyName} = ?'
+        parameters: tuple = tuple(updates.values()) + (id,)
+        return await self._write(lambda cursor: cursor.execute(queryString, parameters).rowcount, queryString)
+
+    async def deleteRecord(self, tableName: str, keyName: str, id: typing.Any) -> int | None:
+        """
+        Deletes a record from a table
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table that contains the record to delete
+        keyName: str
+            The name of the column containing the keys
+        id: Any
+            The key to find and delete
+
+        Returns
+        -------
+        int | None
+            The number of records deleted, or None if the delete failed
+        """
+        queryString: str = f'DELETE FROM {tableName} WHERE {keyName} = ?'
+        return await self._write(lambda cursor: cursor.execute(queryString, (id,)).rowcount, queryString)
+
+    async def deleteRecords(self, tableName: str, keyName: str, ids: typing.Iterable[typing.Any]) -> int | None:
+        """
+        Deletes many records in one write
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table that contains the records to delete
+        keyName: str
+            The name of the column containing the keys
+        ids: Iterable[Any]
+            The keys to find and delete. Consumed on the writer thread
+
+        Returns
+        -------
+        int | None
+            The number of records deleted, or None if the delete failed
+        """
+        queryString: str = f'DELETE FROM {tableName} WHERE {keyName} = ?'
+        return await self._write(lambda cursor: cursor.executemany(queryString, ((id,) for id in ids)).rowcount, queryString)
+
+    ############################
+    # Aggregation functions
+    ############################
+    async def aggregate(self,
+                        tableName: str,
+                        groupBy: tuple[str],
+                        metrics: dict[str, tuple[str, str]],
+                        where: str | None = None,
+                        parameters: tuple[typing.Any] = ()) -> list[tuple]:
+        """
+        Groups and aggregates records on a reader thread. Takes the same arguments and
+        returns the same rows as BidDatabase.aggregate
+        """
+        return await self._read(lambda database: database.aggregate(tableName, groupBy, metrics, where, parameters))
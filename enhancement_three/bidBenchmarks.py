@@ -0,0 +1,279 @@
+#=======================================================================================
+# Name        : bidBenchmarks.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Timing comparisons for the BidDatabase API on the eBid data set and on
+#               synthetic data sets of any size
+#=======================================================================================
+
+import bidDatabase
+import bidPipeline
+import bidReview
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import typing
+
+BID_COLS: dict[str, str] = {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                            'auctionTitle': 'TEXT NOT NULL',
+                            'fund': 'TEXT NOT NULL',
+                            'winningBid': 'FLOAT NOT NULL'}
+FUNDS: tuple[str] = ('General Fund', 'Enterprise', 'Special Revenue', 'Internal Service', 'Capital Projects')
+TITLES: tuple[str] = ('Table', 'Dell Laptop', 'Office Supplies', 'Chair', 'Ford Truck', 'HP Printer', 'Desk')
+
+def timed(label: str, function: typing.Callable, *args, **kwargs) -> typing.Any:
+    """
+    Runs a function once and prints how long it took
+
+    Parameters
+    ----------
+    label: str
+        Name to print beside the timing
+    function: Callable
+        The function to time
+
+    Returns
+    -------
+    Any
+        Whatever the function returned
+    """
+    start: float = time.perf_counter()
+    result = function(*args, **kwargs)
+    print(f'{label:<40} {time.perf_counter() - start:10.4f} s')
+    return result
+
+def quietly(function: typing.Callable, *args, **kwargs) -> typing.Any:
+    """
+    Runs a function with its status messages suppressed
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+def openDatabase(fileName: str, compact: bool = False) -> bidDatabase.BidDatabase:
+    """
+    Creates a fresh database containing an empty bids table
+
+    Parameters
+    ----------
+    fileName: str
+        The path of the database to (re)create
+    compact: bool (optional)
+        Create the compact schema instead of the plain bids table (default is False)
+
+    Returns
+    -------
+    BidDatabase
+        The connected database
+    """
+    if os.path.exists(fileName):
+        os.remove(fileName)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database = bidDatabase.BidDatabase(fileName)
+        if compact:
+            database.createCompactTable('bids')
+            database.createIndex('idx_bidsCompact_fund', 'bidsCompact', ('fundID',), coveringCols=('winningBidCents',))
+        else:
+            database.createTable('bids', BID_COLS)
+            database.createIndex('idx_bids_fund', 'bids', ('fund',), coveringCols=('winningBid',))
+    return database
+
+def loadCsv(database: bidDatabase.BidDatabase, csvPath: str) -> None:
+    """
+    Loads an eBid CSV export into the database without printing progress, parsing it
+    every time rather than reading the parse cache
+    """
+    quietly(bidReview.loadBids, csvPath, database, cached=False)
+
+def loadSynthetic(database: bidDatabase.BidDatabase, rowCount: int, batchSize: int = 100_000, compact: bool = False) -> None:
+    """
+    Fills the bids table with random bids in batches to keep memory bounded
+
+    Parameters
+    ----------
+    database: BidDatabase
+        The database to fill
+    rowCount: int
+        The number of bids to generate
+    batchSize: int (optional)
+        Number of rows generated and inserted at a time (default is 100,000)
+    compact: bool (optional)
+        Insert into the compact schema's storage table (default is False)
+    """
+    generator = random.Random(499)
+    for start in range(0, rowCount, batchSize):
+        batch = [(auctionID,
+                  generator.choice(TITLES),
+                  generator.choice(FUNDS),
+                  round(generator.uniform(1, 5000), 2)) for auctionID in range(start, min(start + batchSize, rowCount))]
+        if compact:
+            database.connection.executemany('INSERT INTO bidsCompact VALUES (?, ?, ?, ?)', database.encodeCompactRecords('bids', batch))
+        else:
+            database.connection.executemany('INSERT INTO bids VALUES (?, ?, ?, ?)', batch)
+    database.connection.commit()
+
+def clientSideFundTotals(database: bidDatabase.BidDatabase) -> list[tuple]:
+    """
+    Sums winningBid per fund in Python, the way reports were written before aggregate()
+    """
+    totals: dict[str, list] = {}
+    for _, _, fund, winningBid in database._readQuery('SELECT * FROM bids'):
+        total = totals.setdefault(fund, [0.0, 0])
+        total[0] += winningBid
+        total[1] += 1
+    return sorted((fund, total, count) for fund, (total, count) in totals.items())
+
+def serverSideFundTotals(database: bidDatabase.BidDatabase) -> list[tuple]:
+    """
+    Sums winningBid per fund inside SQLite
+    """
+    return database.aggregate('bids', ('fund',), {'total': ('SUM', 'winningBid'), 'bids': ('COUNT', '*')})
+
+def benchmarkAggregate(database: bidDatabase.BidDatabase) -> None:
+    """
+    Compares client side and server side per fund totals on a loaded database
+    """
+    client = timed('  client side GROUP BY (fetchall + loop)', clientSideFundTotals, database)
+    server = timed('  server side GROUP BY (aggregate)', serverSideFundTotals, database)
+    # Sums are accumulated in a different order so compare them with a tolerance
+    assert [row[0] for row in client] == [row[0] for row in server]
+    assert all(abs(c[1] - s[1]) < 0.01 * max(1, abs(c[1])) and c[2] == s[2] for c, s in zip(client, server))
+
+def fullScan(database: bidDatabase.BidDatabase) -> list[tuple]:
+    """
+    Reads every bid through the bids table or view, as readRecords does
+    """
+    return database._readQuery('SELECT * FROM bids')
+
+def amountScan(database: bidDatabase.BidDatabase) -> list[tuple]:
+    """
+    Reads every bid's ID and amount, which the compact view serves without its fund lookup
+    """
+    return database._readQuery('SELECT auctionID, winningBid FROM bids')
+
+def storageScan(database: bidDatabase.BidDatabase) -> list[tuple]:
+    """
+    Reads every row of the compact storage table as stored, without the view's fund lookup
+    and cents conversion
+    """
+    return database._readQuery('SELECT * FROM bidsCompact')
+
+def benchmarkCompact(fileName: str, rowCount: int) -> None:
+    """
+    Compares file size, load time and scan times of the plain and compact schemas.
+    The compact file is about half the size, but with the file cached its view scans are
+    no faster than the plain table's, and full scans are slower (about 0.038 s vs 0.023 s
+    at 20k rows), because every row looks up its fund and converts cents. The storage scan
+    shows the cost of reading bidsCompact directly
+
+    Parameters
+    ----------
+    fileName: str
+        The path of the scratch database
+    rowCount: int
+        The number of synthetic bids to load
+    """
+    print(f'Plain vs compact schema ({rowCount:,} rows)')
+    for compact in (False, True):
+        label: str = 'compact' if compact else 'plain'
+        database = openDatabase(fileName, compact)
+        timed(f'  {label} load', loadSynthetic, database, rowCount, compact=compact)
+        timed(f'  {label} full scan', fullScan, database)
+        timed(f'  {label} amount scan', amountScan, database)
+        if compact:
+            timed(f'  {label} storage scan', storageScan, database)
+        database.connection.close()
+        print(f'  {label + " file size":<38} {os.path.getsize(fileName) / 1_000_000:10.1f} MB')
+
+def singleDeletes(database: bidDatabase.BidDatabase, ids: range) -> None:
+    """
+    Deletes bids one call, and one commit, at a time
+    """
+    for auctionID in ids:
+        quietly(database.deleteRecord, 'bids', 'auctionID', auctionID)
+
+def benchmarkBatch(fileName: str, idCount: int, compareSingle: bool) -> None:
+    """
+    Times updateRecords and deleteRecords over idCount bids, and optionally the same
+    number of single row deleteRecord calls
+
+    Parameters
+    ----------
+    fileName: str
+        The path of the scratch database
+    idCount: int
+        The number of bids to update and delete
+    compareSingle: bool
+        Also time one deleteRecord call per bid. Too slow to be worth it above ~10k rows
+    """
+    print(f'Batch update/delete ({idCount:,} IDs)')
+    database = openDatabase(fileName)
+    loadSynthetic(database, idCount * 2)
+    timed('  updateRecords', quietly, database.updateRecords, 'bids', 'auctionID', ('auctionID', 'winningBid'),
+          ((auctionID, 1.0) for auctionID in range(idCount)))
+    timed('  deleteRecords', quietly, database.deleteRecords, 'bids', 'auctionID', range(idCount))
+    if compareSingle:
+        timed('  deleteRecord per ID', singleDeletes, database, range(idCount, idCount * 2))
+    database.connection.close()
+
+def writeSyntheticCsv(csvPath: str, rowCount: int) -> None:
+    """
+    Writes random bids as an eBid style CSV export, including the quoted columns
+    """
+    generator = random.Random(499)
+    with open(csvPath, 'w', newline='') as csvFile:
+        csvFile.write('Auction Title,Auction ID,Department ,CloseDate ,Winning Bid,InventoryID,VehicleID,ReceiptNumber ,Fund\n')
+        for auctionID in range(rowCount):
+            csvFile.write(f'{generator.choice(TITLES)},{auctionID},GENERAL SERVICES,12/1/2016,"${generator.uniform(1, 5000):,.2f} ",'
+                          f'"{auctionID},{auctionID + 1}",,3689973013,{generator.choice(FUNDS)}\n')
+
+def benchmarkPipeline(fileName: str, rowCount: int) -> None:
+    """
+    Compares loadBids with loadBidsParallel at increasing numbers of parser processes.
+    The parallel path is forced however small the file, to show where it starts paying off
+    (see bidPipeline.PARALLEL_MIN_BYTES)
+
+    Parameters
+    ----------
+    fileName: str
+        The path of the scratch database
+    rowCount: int
+        The number of synthetic bids in the CSV
+    """
+    csvPath: str = 'benchmark_bids.csv'
+    writeSyntheticCsv(csvPath, rowCount)
+    print(f'CSV load pipeline ({rowCount:,} rows, {os.path.getsize(csvPath) / 1_000_000:.1f} MB)')
+    database = openDatabase(fileName)
+    timed('  loadBids', loadCsv, database, csvPath)
+    database.connection.close()
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        database = openDatabase(fileName)
+        timed(f'  loadBidsParallel, {workers} workers', quietly, bidPipeline.loadBidsParallel, csvPath, database, workers=workers, parallelMinBytes=0)
+        database.connection.close()
+    os.remove(csvPath)
+
+if __name__ == '__main__':
+    # Usage: python bidBenchmarks.py [synthetic row count]
+    syntheticRows: int = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    benchmarkFile: str = 'benchmark_bidDatabase.sqlite'
+
+    print('eBid_Monthly_Sales_Randomly_Sorted.csv')
+    database = openDatabase(benchmarkFile)
+    timed('  load', loadCsv, database, 'eBid_Monthly_Sales_Randomly_Sorted.csv')
+    benchmarkAggregate(database)
+    database.connection.close()
+
+    print(f'Synthetic data set ({syntheticRows:,} rows)')
+    database = openDatabase(benchmarkFile)
+    timed('  load', loadSynthetic, database, syntheticRows)
+    benchmarkAggregate(database)
+    database.connection.close()
+
+    benchmarkCompact(benchmarkFile, min(syntheticRows, 1_000_000))
+    benchmarkBatch(benchmarkFile, 10_000, True)
+    benchmarkBatch(benchmarkFile, 1_000_000, False)
+    benchmarkPipeline(benchmarkFile, min(syntheticRows, 1_000_000))
+    os.remove(benchmarkFile)
@@ -6,9 +6,77 @@
 # Description : SQLite CRUD API used with bidReview.py
 #=======================================================================================
 
+import atexit
+import collections
+import contextlib
+import datetime
+import itertools
+import json
+import os
+import re
 import sqlite3
+import sys
+import threading
+import time
 import typing
 
+# bidIngest is shared by all three enhancements and lives in the ingest folder beside them
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ingest'))
+import bidIngest
+
+# Keys bound per IN (...) list by the batch functions. Stays under SQLite's historic 999 variable limit
+BATCH_CHUNK_SIZE: int = 900
+# Aggregate functions aggregate() is allowed to push into SQLite
+AGGREGATE_FUNCTIONS: tuple[str] = ('SUM', 'COUNT', 'AVG', 'MIN', 'MAX', 'TOTAL')
+# Pages copied per backup step when flushing an in memory database. Small steps let queries run in between
+FLUSH_PAGES_PER_STEP: int = 256
+# Seconds a flush waits before retrying a backup step that found the database busy
+FLUSH_STEP_SLEEP_SECONDS: float = 0.01
+# How often, in seconds, the background flush thread checks whether a flush is due
+FLUSH_POLL_SECONDS: float = 0.5
+# Rows fetched per batch when exporting
+EXPORT_BATCH_ROWS: int = 10_000
+# Rows ANALYZE samples per index during maintenance, keeping its cost bounded on large tables
+MAINTENANCE_ANALYSIS_LIMIT: int = 1000
+# Upper bounds, in milliseconds, of the query latency histogram buckets
+LATENCY_BUCKETS_MS: tuple[float] = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, float('inf'))
+# Statements kept per query for the slow query log. executemany runs one per row, so any
+# beyond these are only counted
+MAX_TRACED_STATEMENTS: int = 10
+# Storage columns of a compact table that hold a view column in another form
+COMPACT_COLUMNS: dict[str, str] = {'fund': 'fundID', 'winningBid': 'winningBidCents'}
+# Table holding the progress of interrupted CSV loads, keyed by the CSV's absolute path
+CHECKPOINT_TABLE: str = 'loadCheckpoints'
+
+@contextlib.contextmanager
+def recursiveTriggers(cursor: sqlite3.Cursor, enabled: bool = True) -> typing.Iterator[None]:
+    """
+    Turns on recursive triggers for the statements run inside the with block. INSERT OR
+    REPLACE only fires delete triggers with them on, which the full text search triggers
+    rely on to drop the replaced row, so REPLACE statements run inside this
+    
+    Parameters
+    ----------
+    cursor: sqlite3.Cursor
+        A cursor of the connection to turn them on for
+    enabled: bool (optional)
+        If False, leaves them off, for callers that only sometimes replace (default is True)
+    """
+    if not enabled:
+        yield
+        return
+    # Run on the connection so the cursor's row count is left for the caller
+    cursor.connection.execute('PRAGMA recursive_triggers = ON')
+    try:
+        yield
+    finally:
+        cursor.connection.execute('PRAGMA recursive_triggers = OFF')
+
+class _FlushDeferred(Exception):
+    """
+    Abandons a flush that a write transaction would block. Not meant to be used on it's own
+    """
+
 class BidDatabase:
     """
     Class for interacting with the SQLite database
@@ -19,8 +87,30 @@ class BidDatabase:
         The connection to the database
     cursor: sqlite3.Cursor
         A cursor used to interact with the database
+    tracing: bool
+        True while per query statistics are being recorded (see enableTracing)
+    cache: collections.OrderedDict | None
+        The readRecord cache in least recently used order, or None if caching is
+        disabled (see enableCache)
+    compactTables: dict[str, str]
+        Maps the storage table of each compact table to the view that reads it
+        (see createCompactTable)
+    fundIds: dict[str, dict[str, int]]
+        The cached fund to fund ID map of each compact table
+    backingFile: str | None
+        The file an in memory database is restored from and flushed to, or None when
+        connected to the file directly
+    flushCount: int
+        The number of flushes written to backingFile
+    maintenanceReports: list[dict[str, Any]]
+        One report per maintenance run (see enableMaintenance)
     """
-    def __init__(self, fileName: str) -> None:
+    def __init__(self,
+                 fileName: str,
+                 inMemory: bool = False,
+                 flushIntervalSeconds: float | None = 30.0,
+                 flushEveryWrites: int | None = 1000,
+                 checkSameThread: bool = True) -> None:
         """
         Initializer for the BidDatabase class. Creates a connection to the database
         
@@ -28,15 +118,142 @@ class BidDatabase:
         ----------
         fileName: str
             The relative path to the SQLite database to connect to
+        inMemory: bool (optional)
+            Copies the database into memory and works on the copy. Changes are flushed back
+            to fileName by a background thread, and on close or exit (default is False)
+        flushIntervalSeconds: float | None (optional)
+            With inMemory, flush changes this often. If None, there is no timed flush (default is 30.0)
+        flushEveryWrites: int | None (optional)
+            With inMemory, flush once this many rows have changed since the last flush.
+            If None, there is no write triggered flush (default is 1000)
+        checkSameThread: bool (optional)
+            Only let the thread that connected use the connection. An in memory database
+            always allows other threads, as its flush thread shares the connection (default is True)
         """
+        self.tracing: bool = False
+        self.cache: collections.OrderedDict | None = None
+        self.compactTables: dict[str, str] = {}
+        self.fundIds: dict[str, dict[str, int]] = {}
+        self.backingFile: str | None = fileName if inMemory else None
+        self.flushCount: int = 0
+        self.fileName: str = fileName
+        self.maintenanceReports: list[dict[str, typing.Any]] = []
+        self._maintenanceDue: threading.Event | None = None
         try:
-            self.connection: sqlite3.Connection = sqlite3.connect(fileName)
+            if inMemory:
+                # The flush thread shares the connection, so allow use from other threads
+                self.connection: sqlite3.Connection = sqlite3.connect(':memory:', check_same_thread=False)
+                diskConnection: sqlite3.Connection = sqlite3.connect(fileName)
+                diskConnection.backup(self.connection)
+                diskConnection.close()
+            else:
+                self.connection: sqlite3.Connection = sqlite3.connect(fileName, check_same_thread=checkSameThread)
             self.cursor: sqlite3.Cursor = self.connection.cursor()
+            if inMemory:
+                self._startFlushThread(flushIntervalSeconds, flushEveryWrites)
             print(f'Connected to database successfully')
         except sqlite3.Error as error:
             print(f'Error encountered: {error}')
+            
+    ############################
+    # In memory database functions
+    ############################
+    def _startFlushThread(self, flushIntervalSeconds: float | None, flushEveryWrites: int | None) -> None:
+        """
+        Starts the background thread that flushes an in memory database. Not meant to be called on it's own
+        """
+        self._flushLock: threading.Lock = threading.Lock()
+        self._flushedState: tuple[int, int] = self._changeState()
+        self._lastFlush: float = time.monotonic()
+        self._closing: threading.Event = threading.Event()
+        
+        def _flushLoop() -> None:
+            while not self._closing.wait(FLUSH_POLL_SECONDS):
+                changes: int = self.connection.total_changes - self._flushedState[0]
+                timerDue: bool = flushIntervalSeconds is not None and time.monotonic() - self._lastFlush >= flushIntervalSeconds
+                writesDue: bool = flushEveryWrites is not None and changes >= flushEveryWrites
+                if timerDue or writesDue:
+                    try:
+                        self.flush()
+                    except sqlite3.Error as error:
+                        print(f'Error encountered: {error}')
+                        print(f'    Encounted while flushing to: {self.backingFile}')
+                        
+        self._flushThread: threading.Thread = threading.Thread(target=_flushLoop, name='bidDatabaseFlush', daemon=True)
+        self._flushThread.start()
+        atexit.register(self.close)
+        
+    def _changeState(self) -> tuple[int, int]:
+        """
+        Returns the row change count and schema version, which together show whether
+        anything changed since the last flush. Not meant to be called on it's own
+        """
+        return (self.connection.total_changes, self.connection.execute('PRAGMA schema_version').fetchone()[0])
+        
+    def flush(self, pagesPerStep: int = FLUSH_PAGES_PER_STEP) -> bool:
+        """
+        Copies an in memory database back to its file using the SQLite backup API. The
+        copy is made a few pages at a time so other queries can run between steps. Does
+        nothing if the database is not in memory or nothing changed since the last flush.
+        A write transaction left open on the connection blocks the copy until it ends, so
+        the flush is put off while one is open and the flush thread tries again later
+        
+        Parameters
+        ----------
+        pagesPerStep: int (optional)
+            Pages copied per backup step (default is FLUSH_PAGES_PER_STEP)
+            
+        Returns
+        -------
+        bool
+            True if the database was written to its file
+        """
+        if self.backingFile is None:
+            return False
+        with self._flushLock:
+            state: tuple[int, int] = self._changeState()
+            if state == self._flushedState:
+                self._lastFlush = time.monotonic()
+                return False
+            if self.connection.in_transaction:
+                return False
+            
+            def _progress(status: int, remaining: int, total: int) -> None:
+                # Catches a transaction opened between steps. Abandoning the backup rolls the file back
+                if self.connection.in_transaction:
+                    raise _FlushDeferred()
+                    
+            diskConnection: sqlite3.Connection = sqlite3.connect(self.backingFile)
+            try:
+                self.connection.backup(diskConnection, pages=pagesPerStep, progress=_progress, sleep=FLUSH_STEP_SLEEP_SECONDS)
+            except _FlushDeferred:
+                return False
+            finally:
+                diskConnection.close()
+            self._flushedState = state
+            self._lastFlush = time.monotonic()
+            self.flushCount += 1
+            return True
+        
+    def close(self) -> None:
+        """
+        Closes the connection, stopping any maintenance. An in memory database is flushed to its file first
+        """
+        self.disableMaintenance()
+        if self.backingFile is not None:
+            if self._closing.is_set():
+                return
+            self._closing.set()
+            self._flushThread.join()
+            atexit.unregister(self.close)
+            # Closing would discard a transaction left open by an interrupted write anyway,
+            # and rolling it back first lets the committed changes be flushed
+            if self.connection.in_transaction:
+                self.connection.rollback()
+            self.flush()
+        self.connection.close()
         
-    def _runQuery(self, query: str, message: str | None = None) -> None:
+    def _runQuery(self, query: str, message: str | None = None, parameters: tuple[typing.Any] = (), many: bool = False) -> bool:
         """
         A helper function to run query strings. Not meant to be called on it's own
         
@@ -47,18 +264,53 @@ class BidDatabase:
         message: str | None (optional)
             Custom message to display upon successfully running the query string.
             If None, will not display a message (default is None)
+        parameters: tuple[Any] (optional)
+            Values bound to the '?' placeholders in the query string (default is ())
+        many: bool (optional)
+            Run the query once per tuple in parameters (default is False)
+            
+        Returns
+        -------
+        bool
+            True if the query ran and was committed
         """
         try:
-            self.cursor.execute(query)
+            startTime: int | None = self._startTrace()
+            if many:
+                self.cursor.executemany(query, parameters)
+            else:
+                self.cursor.execute(query, parameters)
             self.connection.commit()
+            self._noteWrites()
+            self._endTrace(query, startTime, max(self.cursor.rowcount, 0))
             if message:
                 print(message)
+            return True
         except sqlite3.Error as error:
             print(f'Error encountered: {error}')
             print(f'    Encounted while performing: {query}')
+            return False
 
             
-    def _readQuery(self, query: str, message: str | None = None) -> list[tuple]:
+    def _execute(self, query: str, parameters: typing.Any = (), many: bool = False) -> sqlite3.Cursor:
+        """
+        Runs one statement of a larger transaction on the cursor without committing,
+        recording it like _runQuery does while tracing. Not meant to be called on it's own
+        
+        Returns
+        -------
+        sqlite3.Cursor
+            The cursor, for fetching results
+        """
+        startTime: int | None = self._startTrace()
+        if many:
+            self.cursor.executemany(query, parameters)
+        else:
+            self.cursor.execute(query, parameters)
+        self._endTrace(query, startTime, max(self.cursor.rowcount, 0))
+        return self.cursor
+            
+    def _readQuery(self, query: str, message: str | None = None, parameters: tuple[typing.Any] = ()) -> list[tuple]:
         """
         A helper function to run read query strings. Not meant to be called on it's own
         
@@ -69,6 +321,8 @@ class BidDatabase:
         message: str | None (optional)
             Custom message to display upon successfully running the query string.
             If None, will not display a message (default is None)
+        parameters: tuple[Any] (optional)
+            Values bound to the '?' placeholders in the query string (default is ())
             
         Returns
         -------
@@ -77,8 +331,10 @@ class BidDatabase:
         """
         records: list[tuple] = None
         try:
-            self.cursor.execute(query)
+            startTime: int | None = self._startTrace()
+            self.cursor.execute(query, parameters)
             records: list[any] = self.cursor.fetchall()
+            self._endTrace(query, startTime, len(records))
             if message:
                 print(message)
             return records
@@ -86,6 +342,427 @@ class BidDatabase:
             print(f'Error encountered: {error}')
             print(f'    Encounted while performing: {query}')
     
+    ############################
+    # Maintenance functions
+    ############################
+    def enableMaintenance(self,
+                          intervalSeconds: float | None = 3600.0,
+                          everyMutations: int | None = 10_000,
+                          vacuumPagesPerStep: int = 100,
+                          rebuild: bool = False) -> None:
+        """
+        Starts a background thread that refreshes the query planner statistics with
+        ANALYZE and PRAGMA optimize, then returns free pages to the file system with
+        incremental_vacuum. Maintenance writes through its own connection, with the
+        database switched to WAL journaling until disableMaintenance so queries on this
+        connection keep running. Runs with no writes through this class since the last
+        one skip ANALYZE, so an idle run commits nothing. A run that does commit changes
+        PRAGMA data_version and so clears the record cache, like any other connection's
+        commit would. In memory databases can only be reached through this connection,
+        so they are refused rather than having maintenance commit or analyze in the
+        middle of a foreground transaction
+        
+        Parameters
+        ----------
+        intervalSeconds: float | None (optional)
+            Run maintenance this often. If None, there is no timed run (default is 3600.0)
+        everyMutations: int | None (optional)
+            Run maintenance once this many rows have changed through this class since the
+            last run. If None, there is no mutation triggered run (default is 10,000)
+        vacuumPagesPerStep: int (optional)
+            Pages freed per incremental_vacuum step. Each step holds the write lock only
+            briefly (default is 100)
+        rebuild: bool (optional)
+            Rebuild a database without incremental auto vacuum with VACUUM, once, on the
+            maintenance thread. The rebuild holds the write lock until it finishes, so
+            foreground writes wait for it. If False, such a database is analyzed but never
+            vacuumed (default is False)
+        """
+        if self.backingFile is not None or self.fileName == ':memory:':
+            print('Maintenance unavailable for in memory databases')
+            return
+        # incremental_vacuum needs auto_vacuum = INCREMENTAL, which can only be switched on
+        # before the first table is created without rebuilding the file with VACUUM
+        # Results are fetched so no statement is left open holding a lock the maintenance connection needs
+        self.cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        if self.cursor.execute('PRAGMA auto_vacuum').fetchall()[0][0] != 2 and not rebuild:
+            print('Incremental vacuum unavailable until the database is rebuilt with VACUUM')
+        self._journalMode: str = self.cursor.execute('PRAGMA journal_mode').fetchall()[0][0]
+        self.cursor.execute('PRAGMA journal_mode = WAL').fetchall()
+        self._maintenanceDue = threading.Event()
+        self._maintenanceStop: threading.Event = threading.Event()
+        self._changesAtMaintenance: int = self.connection.total_changes
+        self._maintenanceEveryMutations: int | None = everyMutations
+        # The first run always analyzes
+        self._writesSinceMaintenance: bool = True
+        
+        def _maintenanceLoop() -> None:
+            connection: sqlite3.Connection = sqlite3.connect(self.fileName, isolation_level=None)
+            if rebuild:
+                try:
+                    connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                    if connection.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                        connection.execute('VACUUM')
+                        print('Database rebuilt with VACUUM to enable incremental vacuum')
+                except sqlite3.Error as error:
+                    print(f'Error encountered: {error}')
+                    print(f'    Encounted while rebuilding: {self.fileName}')
+            while not self._maintenanceStop.is_set():
+                self._maintenanceDue.wait(intervalSeconds)
+                if self._maintenanceStop.is_set():
+                    break
+                self._maintenanceDue.clear()
+                analyze: bool = self._writesSinceMaintenance
+                self._writesSinceMaintenance = False
+                try:
+                    report: dict[str, typing.Any] = self._runMaintenance(connection, vacuumPagesPerStep, analyze)
+                    self.maintenanceReports.append(report)
+                    print(f'Maintenance reclaimed {report["pagesReclaimed"]} pages in {report["seconds"]:.3f} s')
+                except sqlite3.Error as error:
+                    print(f'Error encountered: {error}')
+                    print(f'    Encounted while running maintenance on: {self.fileName}')
+            connection.close()
+                
+        self._maintenanceThread: threading.Thread = threading.Thread(target=_maintenanceLoop, name='bidDatabaseMaintenance', daemon=True)
+        self._maintenanceThread.start()
+        
+    def disableMaintenance(self) -> None:
+        """
+        Stops the maintenance thread, waiting for a run in progress to finish, and
+        puts back the journal mode the database had before enableMaintenance
+        """
+        if self._maintenanceDue is None:
+            return
+        self._maintenanceStop.set()
+        self._maintenanceDue.set()
+        self._maintenanceThread.join()
+        self._maintenanceDue = None
+        try:
+            self.cursor.execute(f'PRAGMA journal_mode = {self._journalMode}').fetchall()
+        except sqlite3.Error as error:
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while restoring journal mode on: {self.fileName}')
+        
+    def requestMaintenance(self) -> None:
+        """
+        Asks the maintenance thread to run as soon as possible
+        """
+        if self._maintenanceDue is not None:
+            self._maintenanceDue.set()
+            
+    def _noteWrites(self) -> None:
+        """
+        Wakes the maintenance thread once enough rows have changed. Not meant to be called on it's own
+        """
+        if self._maintenanceDue is None:
+            return
+        self._writesSinceMaintenance = True
+        if self._maintenanceEveryMutations is None:
+            return
+        if self.connection.total_changes - self._changesAtMaintenance >= self._maintenanceEveryMutations:
+            self._changesAtMaintenance = self.connection.total_changes
+            self._maintenanceDue.set()
+            
+    @staticmethod
+    def _runMaintenance(connection: sqlite3.Connection, vacuumPagesPerStep: int, analyze: bool = True) -> dict[str, typing.Any]:
+        """
+        Runs one round of maintenance on a connection. Not meant to be called on it's own
+        
+        Returns
+        -------
+        dict[str, Any]
+            When the run started, whether it 'analyzed', the 'pagesBefore' and 'pagesAfter'
+            page counts, 'pagesReclaimed' and the 'seconds' it took
+        """
+        startTime: float = time.perf_counter()
+        startedAt: str = datetime.datetime.now().isoformat()
+        if analyze:
+            connection.execute(f'PRAGMA analysis_limit = {MAINTENANCE_ANALYSIS_LIMIT}')
+            connection.execute('ANALYZE')
+            connection.execute('PRAGMA optimize')
+        # Counted after ANALYZE, which can grow the file by creating its statistics tables
+        pagesBefore: int = connection.execute('PRAGMA page_count').fetchone()[0]
+        # Vacuum in small steps, each its own transaction, so foreground writers only wait for one step
+        while connection.execute('PRAGMA freelist_count').fetchone()[0] > 0:
+            connection.execute(f'PRAGMA incremental_vacuum({vacuumPagesPerStep})').fetchall()
+            if connection.in_transaction:
+                connection.commit()
+            if connection.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                break
+        pagesAfter: int = connection.execute('PRAGMA page_count').fetchone()[0]
+        return {'startedAt': startedAt,
+                'analyzed': analyze,
+                'pagesBefore': pagesBefore,
+                'pagesAfter': pagesAfter,
+                'pagesReclaimed': pagesBefore - pagesAfter,
+                'seconds': time.perf_counter() - startTime}
+    
+    ############################
+    # Query tracing functions
+    ############################
+    def enableTracing(self, slowQueryMs: float = 100.0, slowQueryLog: str | None = 'slowQueries.log', progressSteps: int = 1000) -> None:
+        """
+        Starts recording latency, row counts and SQLite virtual machine work for every
+        query run through _runQuery and _readQuery. Any previous statistics are cleared
+        
+        Parameters
+        ----------
+        slowQueryMs: float (optional)
+            Queries taking at least this many milliseconds are written to the slow query
+            log (default is 100.0)
+        slowQueryLog: str | None (optional)
+            The relative path of the slow query log. If None, slow queries are only
+            counted (default is 'slowQueries.log')
+        progressSteps: int (optional)
+            Number of virtual machine instructions between progress handler calls. Each
+            call counts as one unit of 'vmWork' in the statistics (default is 1000)
+        """
+        self.queryStats: dict[str, dict[str, typing.Any]] = {}
+        self.slowQueryCount: int = 0
+        self.slowQueryMs: float = slowQueryMs
+        self.slowQueryLog: str | None = slowQueryLog
+        self._tracedStatements: list[str] = []
+        self._tracedCount: int = 0
+        self._vmWork: int = 0
+        self.connection.set_trace_callback(self._traceStatement)
+        self.connection.set_progress_handler(self._countProgress, progressSteps)
+        self.tracing = True
+        
+    def disableTracing(self) -> None:
+        """
+        Stops recording query statistics. Statistics already recorded are kept
+        """
+        self.connection.set_trace_callback(None)
+        self.connection.set_progress_handler(None, 0)
+        self.tracing = False
+        if hasattr(self, '_tracedStatements'):
+            self._tracedStatements.clear()
+            self._tracedCount = 0
+        
+    def getQueryStats(self) -> dict[str, typing.Any]:
+        """
+        Returns the statistics recorded since tracing was enabled
+        
+        Returns
+        -------
+        dict[str, Any]
+            'statements' maps each normalized query (literals replaced with '?') to its
+            'calls', 'rows', 'totalMs', 'maxMs', 'vmWork' and a latency 'histogram' keyed
+            by bucket upper bound in milliseconds. 'slowQueries' counts logged slow queries
+        """
+        statements: dict[str, dict[str, typing.Any]] = {}
+        for statement, stats in getattr(self, 'queryStats', {}).items():
+            statements[statement] = dict(stats, histogram={f'<={bound}ms': count for bound, count in zip(LATENCY_BUCKETS_MS, stats['histogram'])})
+        return {'statements': statements, 'slowQueries': getattr(self, 'slowQueryCount', 0)}
+    
+    def dumpQueryStats(self, fileName: str) -> None:
+        """
+        Writes the recorded statistics to a JSON file
+        
+        Parameters
+        ----------
+        fileName: str
+            The relative path of the file to write
+        """
+        with open(fileName, 'w') as statsFile:
+            json.dump(self.getQueryStats(), statsFile, indent=2)
+        print('Query statistics saved')
+            
+    def _countProgress(self) -> int:
+        """
+        Progress handler counting units of virtual machine work. Not meant to be called on it's own
+        
+        Returns
+        -------
+        int
+            Always 0 so SQLite continues running the statement
+        """
+        self._vmWork += 1
+        return 0
+    
+    def _traceStatement(self, statement: str) -> None:
+        """
+        Trace callback receiving each statement SQLite runs, with its bound values
+        expanded. Keeps the first MAX_TRACED_STATEMENTS. Not meant to be called on it's own
+        """
+        self._tracedCount += 1
+        if len(self._tracedStatements) < MAX_TRACED_STATEMENTS:
+            self._tracedStatements.append(statement)
+    
+    def _startTrace(self) -> int | None:
+        """
+        Resets the per query trace state. Not meant to be called on it's own
+        
+        Returns
+        -------
+        int | None
+            The start time in nanoseconds, or None if tracing is disabled
+        """
+        if not self.tracing:
+            return None
+        self._tracedStatements.clear()
+        self._tracedCount = 0
+        self._vmWork = 0
+        return time.perf_counter_ns()
+        
+    def _endTrace(self, query: str, startTime: int | None, rowCount: int) -> None:
+        """
+        Records the statistics of a finished query. Not meant to be called on it's own
+        
+        Parameters
+        ----------
+        query: str
+            The query string that was run
+        startTime: int | None
+            The value returned by _startTrace
+        rowCount: int
+            The number of rows read or changed by the query
+        """
+        if startTime is None:
+            return
+        elapsedMs: float = (time.perf_counter_ns() - startTime) / 1_000_000
+        # Collapse literals and long VALUES lists so repeated queries share one entry
+        statement: str = re.sub(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\b\d+(?:\.\d+)?\b", '?', query)
+        statement = re.sub(r'(\([^()]*\))(?:\s*,\s*\([^()]*\))+', r'\1, ...', statement)
+        # Chunked IN lists vary in length, so collapse their placeholders too
+        statement = re.sub(r'\bIN\s*\(\?(?:\s*,\s*\?)*\)', 'IN (?, ...)', statement)
+        statement = ' '.join(statement.split())
+        stats = self.queryStats.setdefault(statement, {'calls': 0, 'rows': 0, 'totalMs': 0.0, 'maxMs': 0.0,
+                                                       'vmWork': 0, 'histogram': [0] * len(LATENCY_BUCKETS_MS)})
+        stats['calls'] += 1
+        stats['rows'] += rowCount
+        stats['totalMs'] += elapsedMs
+        stats['maxMs'] = max(stats['maxMs'], elapsedMs)
+        stats['vmWork'] += self._vmWork
+        stats['histogram'][next(bucket for bucket, bound in enumerate(LATENCY_BUCKETS_MS) if elapsedMs <= bound)] += 1
+        if elapsedMs >= self.slowQueryMs:
+            self.slowQueryCount += 1
+            if self.slowQueryLog:
+                # Log what SQLite actually ran, including trigger statements, rather than the query template
+                executed: str = ' | '.join(' '.join(traced.split()) for traced in self._tracedStatements) or query
+                if self._tracedCount > len(self._tracedStatements):
+                    executed += f' | ... {self._tracedCount - len(self._tracedStatements)} more statements'
+                with open(self.slowQueryLog, 'a') as logFile:
+                    logFile.write(f'{datetime.datetime.now().isoformat()} {elapsedMs:.3f}ms rows={rowCount} {executed}\n')
+        self._tracedStatements.clear()
+        self._tracedCount = 0
+    
+    ############################
+    # Record cache functions
+    ############################
+    def enableCache(self, maxEntries: int = 1024, ttlSeconds: float | None = None) -> None:
+        """
+        Starts caching the records found by readRecord. Writes made through this class
+        invalidate the affected entries, and writes made by other connections are
+        detected through PRAGMA data_version and clear the whole cache
+        
+        Parameters
+        ----------
+        maxEntries: int (optional)
+            The number of records to keep before evicting the least recently used one
+            (default is 1024)
+        ttlSeconds: float | None (optional)
+            How long an entry may be served before it is read again. If None, entries
+            only leave the cache through eviction or invalidation (default is None)
+        """
+        self.cache = collections.OrderedDict()
+        self.cacheMaxEntries: int = maxEntries
+        self.cacheTtlSeconds: float | None = ttlSeconds
+        self.cacheStats: dict[str, int] = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self._dataVersion: int = self.cursor.execute('PRAGMA data_version').fetchone()[0]
+        
+    def disableCache(self) -> None:
+        """
+        Stops caching records and discards the cached entries
+        """
+        self.cache = None
+        
+    def getCacheStats(self) -> dict[str, int]:
+        """
+        Returns the cache counters
+        
+        Returns
+        -------
+        dict[str, int]
+            The number of 'hits', 'misses', 'evictions' and 'invalidations' since the
+            cache was enabled, and the current number of entries as 'size'
+        """
+        return dict(getattr(self, 'cacheStats', {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}),
+                    size=len(self.cache) if self.cache is not None else 0)
+    
+    def _cacheGet(self, cacheKey: tuple) -> tuple | None:
+        """
+        Looks up a cached record. Not meant to be called on it's own
+        
+        Parameters
+        ----------
+        cacheKey: tuple
+            The (tableName, keyName, id) of the record
+            
+        Returns
+        -------
+        tuple | None
+            The cached record, or None on a miss
+        """
+        # Another connection committed since the last check, so any entry may be stale
+        dataVersion: int = self.cursor.execute('PRAGMA data_version').fetchone()[0]
+        if dataVersion != self._dataVersion:
+            self._dataVersion = dataVersion
+            self.cacheStats['invalidations'] += len(self.cache)
+            self.cache.clear()
+        entry = self.cache.get(cacheKey)
+        if entry is None or (entry[1] is not None and entry[1] < time.monotonic()):
+            self.cacheStats['misses'] += 1
+            return None
+        self.cache.move_to_end(cacheKey)
+        self.cacheStats['hits'] += 1
+        return entry[0]
+    
+    def _cachePut(self, cacheKey: tuple, record: tuple) -> None:
+        """
+        Adds a record to the cache, evicting the least recently used entry if full. Not meant to be called on it's own
+        
+        Parameters
+        ----------
+        cacheKey: tuple
+            The (tableName, keyName, id) of the record
+        record: tuple
+            The record to cache
+        """
+        expiresAt: float | None = time.monotonic() + self.cacheTtlSeconds if self.cacheTtlSeconds is not None else None
+        self.cache[cacheKey] = (record, expiresAt)
+        self.cache.move_to_end(cacheKey)
+        while len(self.cache) > self.cacheMaxEntries:
+            self.cache.popitem(last=False)
+            self.cacheStats['evictions'] += 1
+            
+    def _invalidateCache(self, tableName: str, keyName: str | None = None, ids: typing.Iterable | None = None) -> None:
+        """
+        Removes the cached records a write may have changed. Not meant to be called on it's own
+        
+        Parameters
+        ----------
+        tableName: str
+            The table that was written to
+        keyName: str | None (optional)
+            The column identifying the written records. If None, every entry for the
+            table is removed (default is None)
+        ids: Iterable | None (optional)
+            The values of keyName that were written (default is None)
+        """
+        if not self.cache:
+            return
+        ids = set(ids) if ids is not None else set()
+        # Writes to a compact storage table change what its view returns
+        if tableName in self.compactTables:
+            self._invalidateCache(self.compactTables[tableName], keyName, ids)
+        # Entries found through another column can't be matched to the written ids, so drop them too
+        staleKeys: list[tuple] = [cacheKey for cacheKey in self.cache
+                                  if cacheKey[0] == tableName and (keyName is None or cacheKey[1] != keyName or cacheKey[2] in ids)]
+        for cacheKey in staleKeys:
+            del self.cache[cacheKey]
+        self.cacheStats['invalidations'] += len(staleKeys)
+    
     ############################
     # Table based CRUD functions
     ############################        
@@ -128,6 +805,7 @@ class BidDatabase:
         """
         queryString: str = f'ALTER TABLE {oldTableName} RENAME TO {newTableName}'
         self._runQuery(queryString, 'Table renamed successfully')
+        self._invalidateCache(oldTableName)
     
     def addTableColumn(self, tableName: str, newColName: str, newColType: str) -> None:
         """
@@ -160,6 +838,7 @@ class BidDatabase:
         """
         queryString: str = f'ALTER TABLE {tableName} RENAME COLUMN {oldColName} TO {newColName}'
         self._runQuery(queryString, 'Column renamed successfully')
+        self._invalidateCache(tableName)
         
     def deleteTable(self, tableName: str) -> None:
         """
@@ -172,6 +851,289 @@ class BidDatabase:
         """
         queryString: str = f'DROP TABLE IF EXISTS {tableName}'
         self._runQuery(queryString, 'Table deleted successfully')
+        self._invalidateCache(tableName)
+    
+    ############################
+    # Index functions
+    ############################
+    def createIndex(self,
+                    indexName: str,
+                    tableName: str,
+                    indexCols: tuple[str],
+                    coveringCols: tuple[str] = (),
+                    unique: bool = False,
+                    where: str | None = None) -> None:
+        """
+        Creates an index on a table if it doesn't already exist
+        
+        Parameters
+        ----------
+        indexName: str
+            Name of the index to create
+        tableName: str
+            Name of the table to index
+        indexCols: tuple[str]
+            The columns to search on, in order
+        coveringCols: tuple[str] (optional)
+            Extra columns appended to the index so that queries reading only these
+            columns can be answered from the index without touching the table (default is ())
+        unique: bool (optional)
+            Creates a unique index if True (default is False)
+        where: str | None (optional)
+            Condition for a partial index, e.g. "fund = 'General Fund'". SQLite does not
+            allow bound parameters here. If None, every row is indexed (default is None)
+        """
+        columns: str = ', '.join(tuple(indexCols) + tuple(coveringCols))
+        queryString: str = f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS {indexName} ON {tableName} ({columns})'
+        if where:
+            queryString = f'{queryString} WHERE {where}'
+        self._runQuery(queryString, 'Index created successfully')
+        
+    def dropIndex(self, indexName: str) -> None:
+        """
+        Deletes an index from the database
+        
+        Parameters
+        ----------
+        indexName: str
+            The name of the index to delete
+        """
+        queryString: str = f'DROP INDEX IF EXISTS {indexName}'
+        self._runQuery(queryString, 'Index deleted successfully')
+        
+    def explain(self, query: str, parameters: tuple[typing.Any] = ()) -> list[str]:
+        """
+        Returns the query plan SQLite would use for a query without running it
+        
+        Parameters
+        ----------
+        query: str
+            The query string to explain
+        parameters: tuple[Any] (optional)
+            Values bound to the '?' placeholders in the query string (default is ())
+            
+        Returns
+        -------
+        list[str]
+            The detail column of EXPLAIN QUERY PLAN, one entry per step. A step reading
+            'SEARCH ... USING INDEX <name>' or 'USING COVERING INDEX <name>' hit an index,
+            while 'SCAN <table>' is a full table scan
+        """
+        plan = self._readQuery(f'EXPLAIN QUERY PLAN {query}', parameters=parameters)
+        return [step[3] for step in plan] if plan is not None else []
+    
+    ############################
+    # Full text search functions
+    ############################
+    def createSearchIndex(self, tableName: str, keyName: str, textCol: str) -> None:
+        """
+        Creates an FTS5 full text index over a text column, named <tableName>_fts, and
+        the triggers that keep it in sync with the table. Existing records are indexed
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to index
+        keyName: str
+            The INTEGER PRIMARY KEY column of the table
+        textCol: str
+            The text column to make searchable
+        """
+        searchTable: str = f'{tableName}_fts'
+        queryString: str = f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {searchTable} USING fts5({textCol}, content='{tableName}', content_rowid='{keyName}');
+            CREATE TRIGGER IF NOT EXISTS {searchTable}_insert AFTER INSERT ON {tableName} BEGIN
+                INSERT INTO {searchTable} (rowid, {textCol}) VALUES (new.{keyName}, new.{textCol});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {searchTable}_delete AFTER DELETE ON {tableName} BEGIN
+                INSERT INTO {searchTable} ({searchTable}, rowid, {textCol}) VALUES ('delete', old.{keyName}, old.{textCol});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {searchTable}_update AFTER UPDATE OF {keyName}, {textCol} ON {tableName}
+            WHEN old.{keyName} IS NOT new.{keyName} OR old.{textCol} IS NOT new.{textCol} BEGIN
+                INSERT INTO {searchTable} ({searchTable}, rowid, {textCol}) VALUES ('delete', old.{keyName}, old.{textCol});
+                INSERT INTO {searchTable} (rowid, {textCol}) VALUES (new.{keyName}, new.{textCol});
+            END;
+            INSERT INTO {searchTable} ({searchTable}) VALUES ('rebuild');"""
+        try:
+            self.cursor.executescript(queryString)
+            print('Search index created successfully')
+        except sqlite3.Error as error:
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while performing: {queryString}')
+        
+    def searchTitles(self, query: str, limit: int = 10, tableName: str = 'bids', keyName: str = 'auctionID') -> list[tuple]:
+        """
+        Finds the records whose indexed text contains every word in the query, best
+        matches first. Requires createSearchIndex to have been run on the table
+        
+        Parameters
+        ----------
+        query: str
+            The words to search for, e.g. 'dell laptop'. Matching is case insensitive
+        limit: int (optional)
+            The maximum number of records to return (default is 10)
+        tableName: str (optional)
+            The name of the indexed table, or of a compact table's view in which case
+            the index on its storage table is used (default is 'bids')
+        keyName: str (optional)
+            The name of the column the index was keyed on (default is 'auctionID')
+            
+        Returns
+        -------
+        list[tuple]
+            The matching records ranked by bm25 relevance
+        """
+        # Quote every word so user input is never parsed as FTS5 query syntax
+        matchString: str = ' '.join('"' + word.replace('"', '""') + '"' for word in query.split())
+        if not matchString:
+            return []
+        storageTable: str = self._storageTable(tableName)
+        searchTable: str = f'{storageTable}_fts'
+        queryString: str = (f'SELECT {tableName}.* FROM {searchTable} '
+                            f'JOIN {tableName} ON {tableName}.{keyName} = {searchTable}.rowid '
+                            f'WHERE {searchTable} MATCH ? ORDER BY {searchTable}.rank LIMIT ?')
+        return self._readQuery(queryString, parameters=(matchString, limit))
+    
+    ############################
+    # Compact storage functions
+    ############################
+    def createCompactTable(self, tableName: str = 'bids') -> None:
+        """
+        Creates the compact bid schema if it doesn't already exist. Bids are stored in a
+        WITHOUT ROWID table named <tableName>Compact with winning bids as INTEGER cents and
+        funds replaced by IDs from a <tableName>Funds lookup table. A view named tableName
+        joins them back into (auctionID, auctionTitle, fund, winningBid) records, and
+        INSTEAD OF triggers on the view keep the record based CRUD functions working, while
+        updateRecords, deleteRecords, mergeRecords and applyChanges given the view's name
+        write to <tableName>Compact directly so their counts and upserts work.
+        The view is recreated each time so databases made before it changed pick it up.
+        The schema trades scan speed for size: the file is about half as large, but scans
+        through the view are no faster than the plain table once the file is cached, and full
+        scans are slower since every row looks up its fund and converts cents to a float.
+        Read <tableName>Compact directly where fund IDs and cents will do
+        
+        Parameters
+        ----------
+        tableName: str (optional)
+            The name of the view to create (default is 'bids')
+        """
+        compactTable: str = f'{tableName}Compact'
+        fundTable: str = f'{tableName}Funds'
+        fundId: str = f'(SELECT fundID FROM {fundTable} WHERE fund = new.fund)'
+        # Fund names are looked up with a subquery rather than a join, so SQLite drops the
+        # lookup for queries that don't read fund and scans the table in auctionID order
+        # instead of picking the fund index to drive a join. The view has no ORDER BY, which
+        # would stop SQLite flattening it into the outer query
+        # Funds are added with NOT EXISTS rather than INSERT OR IGNORE because the view
+        # statement's OR REPLACE would override it and renumber an existing fund
+        addFund: str = f'INSERT INTO {fundTable} (fund) SELECT new.fund WHERE NOT EXISTS {fundId[:-1]});'
+        queryString: str = f"""
+            CREATE TABLE IF NOT EXISTS {fundTable} (fundID INTEGER PRIMARY KEY, fund TEXT NOT NULL UNIQUE);
+            CREATE TABLE IF NOT EXISTS {compactTable} (
+                auctionID INTEGER PRIMARY KEY NOT NULL,
+                auctionTitle TEXT NOT NULL,
+                fundID INTEGER NOT NULL REFERENCES {fundTable} (fundID),
+                winningBidCents INTEGER NOT NULL) WITHOUT ROWID;
+            DROP VIEW IF EXISTS {tableName};
+            CREATE VIEW {tableName} AS
+                SELECT auctionID, auctionTitle,
+                    (SELECT fund FROM {fundTable} WHERE {fundTable}.fundID = {compactTable}.fundID) AS fund,
+                    winningBidCents / 100.0 AS winningBid
+                FROM {compactTable};
+            CREATE TRIGGER IF NOT EXISTS {tableName}_insert INSTEAD OF INSERT ON {tableName} BEGIN
+                {addFund}
+                INSERT INTO {compactTable} VALUES (new.auctionID, new.auctionTitle, {fundId}, CAST(ROUND(new.winningBid * 100) AS INTEGER));
+            END;
+            CREATE TRIGGER IF NOT EXISTS {tableName}_update INSTEAD OF UPDATE ON {tableName} BEGIN
+                {addFund}
+                UPDATE {compactTable} SET auctionID = new.auctionID, auctionTitle = new.auctionTitle, fundID = {fundId},
+                    winningBidCents = CAST(ROUND(new.winningBid * 100) AS INTEGER) WHERE auctionID = old.auctionID;
+            END;
+            CREATE TRIGGER IF NOT EXISTS {tableName}_delete INSTEAD OF DELETE ON {tableName} BEGIN
+                DELETE FROM {compactTable} WHERE auctionID = old.auctionID;
+            END;"""
+        try:
+            self.cursor.executescript(queryString)
+            self.compactTables[compactTable] = tableName
+            self.fundIds[tableName] = {fund: fundID for fundID, fund in self.cursor.execute(f'SELECT fundID, fund FROM {fundTable}')}
+            print('Compact table created successfully')
+        except sqlite3.Error as error:
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while performing: {queryString}')
+            
+    def encodeCompactRecords(self, tableName: str, records: typing.Iterable[tuple]) -> list[tuple]:
+        """
+        Converts (auctionID, auctionTitle, fund, winningBid) records into the rows stored
+        by a compact table, adding any new funds to its lookup table. Requires
+        createCompactTable to have been run on this connection
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the compact table's view
+        records: Iterable[tuple]
+            The records to convert
+            
+        Returns
+        -------
+        list[tuple]
+            (auctionID, auctionTitle, fundID, winningBidCents) rows, ready to pass to
+            createRecords or mergeRecords for <tableName>Compact
+        """
+        return self._encodeCompactColumns(tableName, ('auctionID', 'auctionTitle', 'fund', 'winningBid'), records)
+    
+    def _encodeCompactColumns(self, tableName: str, tableCols: tuple[str], records: typing.Iterable[tuple]) -> list[tuple]:
+        """
+        Converts the fund and winningBid values of records with any columns into fund IDs
+        and cents, committing any new funds. Not meant to be called on it's own
+        """
+        fundIds: dict[str, int] = self.fundIds[tableName]
+        fundColumn: int | None = tableCols.index('fund') if 'fund' in tableCols else None
+        bidColumn: int | None = tableCols.index('winningBid') if 'winningBid' in tableCols else None
+        compactRecords: list[tuple] = []
+        for record in records:
+            record = list(record)
+            if fundColumn is not None:
+                fund: str = record[fundColumn]
+                fundID: int | None = fundIds.get(fund)
+                if fundID is None:
+                    # The view's triggers add funds without updating the cache, so the fund may already exist
+                    self.cursor.execute(f'INSERT OR IGNORE INTO {tableName}Funds (fund) VALUES (?)', (fund,))
+                    fundID = fundIds[fund] = self.cursor.execute(f'SELECT fundID FROM {tableName}Funds WHERE fund = ?', (fund,)).fetchone()[0]
+                record[fundColumn] = fundID
+            if bidColumn is not None and record[bidColumn] is not None:
+                record[bidColumn] = round(record[bidColumn] * 100)
+            compactRecords.append(tuple(record))
+        self.connection.commit()
+        return compactRecords
+    
+    def _compactBatch(self,
+                      tableName: str,
+                      tableCols: tuple[str] = (),
+                      records: typing.Iterable[tuple] = ()) -> tuple[str, tuple[str], typing.Iterable[tuple]]:
+        """
+        Points a batch write at a compact table's view to its storage table, encoding the
+        records on the way. Changes made by INSTEAD OF triggers aren't counted in rowcount and
+        a view can't be upserted, so the batch functions write to the storage table directly.
+        Tables that aren't compact views are returned unchanged. Not meant to be called on it's own
+        
+        Returns
+        -------
+        tuple[str, tuple[str], Iterable[tuple]]
+            The table, columns and records to write
+        """
+        storageTable: str = self._storageTable(tableName)
+        if storageTable == tableName:
+            return tableName, tableCols, records
+        storageCols: tuple[str] = tuple(COMPACT_COLUMNS.get(colName, colName) for colName in tableCols)
+        return storageTable, storageCols, self._encodeCompactColumns(tableName, tableCols, records)
+    
+    def _storageTable(self, tableName: str) -> str:
+        """
+        Finds the storage table behind a compact table's view, or returns tableName if it isn't one.
+        Not meant to be called on it's own
+        """
+        return next((compact for compact, view in self.compactTables.items() if view == tableName), tableName)
     
     #############################
     # Record based CRUD functions
@@ -194,15 +1156,20 @@ class BidDatabase:
                 False: Update the record if the key is already in the table
         """
         queryString: str = f'INSERT OR {"IGNORE" if ignoreDuplicates else "REPLACE"} INTO {tableName} {tableCols} VALUES {record};'
-        self._runQuery(queryString, 'Record added successfully')
+        with recursiveTriggers(self.cursor, not ignoreDuplicates):
+            self._runQuery(queryString, 'Record added successfully')
+        if not ignoreDuplicates:
+            self._invalidateReplaced(tableName, tableCols, (record,))
         
     def createRecords(self,
                       tableName: str,
                       tableCols: tuple[str],
                       records: tuple[tuple[typing.Any]] | list[tuple[typing.Any]],
-                      ignoreDuplicates: bool = True) -> None:
+                      ignoreDuplicates: bool = True,
+                      checkpoint: tuple[str, dict[str, typing.Any]] | None = None) -> int | None:
         """
-        Creates multiple records
+        Creates multiple records. Records for a compact table's view are encoded and
+        written to its storage table, so that the count covers them
         
         Parameters
         ----------
@@ -216,16 +1183,196 @@ class BidDatabase:
             Defines what to do if duplicates are found (default is True):
                 True: Don't add record when the key is already in the table
                 False: Update the record if the key is already in the table
+        checkpoint: tuple[str, dict[str, Any]] | None (optional)
+            A (source, progress) pair saved with saveCheckpoint in the same transaction as
+            the records, so both are committed or neither is (default is None)
+            
+        Returns
+        -------
+        int | None
+            The number of records added, not counting ignored duplicates, or None if the
+            records weren't added
         """
-        # Build the query string
-        queryHeader: str = f'INSERT OR {"IGNORE" if ignoreDuplicates else "REPLACE"} INTO {tableName} {tableCols} VALUES'
-        queryBody: str = None
-        for record in records:
-            queryBody = f'{queryBody}, {record}'
-        # Remove the initial 'None ,' from queryBody
-        queryBody = queryBody[6:]
-        queryString: str = queryHeader + queryBody
-        self._runQuery(queryString, 'Records added successfully')
+        tableName, tableCols, records = self._compactBatch(tableName, tableCols, records)
+        # Bind the values rather than building one VALUES list, which grew quadratically with the batch
+        queryString: str = (f'INSERT OR {"IGNORE" if ignoreDuplicates else "REPLACE"} INTO {tableName} ({", ".join(tableCols)}) '
+                            f'VALUES ({", ".join("?" * len(tableCols))})')
+        if checkpoint is not None:
+            self.saveCheckpoint(*checkpoint, commit=False)
+        with recursiveTriggers(self.cursor, not ignoreDuplicates):
+            added: bool = self._runQuery(queryString, 'Records added successfully', records, many=True)
+        # executemany's row count leaves out the ignored duplicates
+        addedCount: int | None = max(self.cursor.rowcount, 0) if added else None
+        if not added and self.connection.in_transaction:
+            # Don't let the checkpoint be committed by a later write
+            self.connection.rollback()
+        if not ignoreDuplicates:
+            self._invalidateReplaced(tableName, tableCols, records)
+        return addedCount
+            
+    def _invalidateReplaced(self, tableName: str, tableCols: tuple[str], records: typing.Iterable[tuple]) -> None:
+        """
+        Removes cached records that an INSERT OR REPLACE may have overwritten. Not meant to be called on it's own
+        
+        Parameters
+        ----------
+        tableName: str
+            The table that was written to
+        tableCols: tuple[str]
+            The columns that were written
+        records: Iterable[tuple]
+            The records that were written
+        """
+        if not self.cache:
+            return
+        # Entries read through a compact table's view are replaced by writes to its storage table
+        tableNames: set[str] = {tableName, self.compactTables.get(tableName)}
+        for keyName in {cacheKey[1] for cacheKey in self.cache if cacheKey[0] in tableNames}:
+            if keyName in tableCols:
+                keyColumn: int = tableCols.index(keyName)
+                self._invalidateCache(tableName, keyName, (record[keyColumn] for record in records))
+            else:
+                self._invalidateCache(tableName)
+        
+    def mergeRecords(self,
+                     tableName: str,
+                     keyName: str,
+                     tableCols: tuple[str],
+                     records: typing.Iterable[tuple[typing.Any]],
+                     checkpoint: tuple[str, dict[str, typing.Any]] | None = None) -> dict[str, int] | None:
+        """
+        Inserts new records and updates existing ones in place, leaving identical records
+        untouched. Unlike INSERT OR REPLACE, existing rows are never deleted and re-inserted.
+        The records are loaded into a TEMP staging table first and merged in one transaction
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to merge records into
+        keyName: str
+            The name of the primary key column. Must be one of tableCols
+        tableCols: tuple[str]
+            The columns to add values to
+        records: Iterable[tuple[Any]]
+            The values of the records to merge. Must line up with the values in tableCols.
+            If a key appears more than once the last record wins
+        checkpoint: tuple[str, dict[str, Any]] | None (optional)
+            A (source, progress) pair saved with saveCheckpoint in the same transaction as
+            the merge (default is None)
+            
+        Returns
+        -------
+        dict[str, int] | None
+            The number of records 'inserted', 'updated' and 'unchanged', or None if the
+            merge failed and was rolled back
+        """
+        tableName, tableCols, records = self._compactBatch(tableName, tableCols, records)
+        try:
+            inserted, updated, staged = self._mergeStaged(tableName, keyName, tableCols, records)
+            if checkpoint is not None:
+                self.saveCheckpoint(*checkpoint, commit=False)
+            self.connection.commit()
+            self._noteWrites()
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while merging records into: {tableName}')
+            return None
+        counts: dict[str, int] = {'inserted': inserted, 'updated': updated, 'unchanged': staged - inserted - updated}
+        print(f'Records merged: {counts["inserted"]} inserted, {counts["updated"]} updated, {counts["unchanged"]} unchanged')
+        return counts
+        
+    def _mergeStaged(self,
+                     tableName: str,
+                     keyName: str,
+                     tableCols: tuple[str],
+                     records: typing.Iterable[tuple[typing.Any]]) -> tuple[int, int, int]:
+        """
+        Upserts records through a TEMP staging table inside the current transaction, for
+        mergeRecords and applyChanges. Not meant to be called on it's own
+        
+        Returns
+        -------
+        tuple[int, int, int]
+            The number of records inserted, updated and staged
+        """
+        columns: str = ', '.join(tableCols)
+        valueCols: tuple[str] = tuple(colName for colName in tableCols if colName != keyName)
+        # Matches existing rows whose values differ from the staged record. IS NOT treats NULLs as equal
+        changed: str = ' OR '.join(f'{tableName}.{colName} IS NOT staged.{colName}' for colName in valueCols) or '0'
+        self._execute('DROP TABLE IF EXISTS temp.mergeStaging')
+        self._execute(f'CREATE TEMP TABLE mergeStaging AS SELECT {columns} FROM {tableName} LIMIT 0')
+        self._execute(f'CREATE UNIQUE INDEX temp.mergeStagingKey ON mergeStaging ({keyName})')
+        self._execute(f'INSERT OR REPLACE INTO mergeStaging ({columns}) VALUES ({", ".join("?" * len(tableCols))})', records, many=True)
+        # Count before merging, while the table still holds the old values
+        self._execute(f"""
+            SELECT COUNT(*) - COUNT({tableName}.{keyName}),
+                   COALESCE(SUM({tableName}.{keyName} IS NOT NULL AND ({changed})), 0)
+            FROM mergeStaging AS staged LEFT JOIN {tableName} ON {tableName}.{keyName} = staged.{keyName}""")
+        inserted, updated = self.cursor.fetchone()
+        staged: int = self._execute('SELECT COUNT(*) FROM mergeStaging').fetchone()[0]
+        updates: str = ', '.join(f'{colName} = excluded.{colName}' for colName in valueCols)
+        # "WHERE true" stops SQLite parsing ON CONFLICT as a join constraint
+        queryString: str = f'INSERT INTO {tableName} ({columns}) SELECT {columns} FROM mergeStaging WHERE true ON CONFLICT({keyName}) '
+        if updates:
+            queryString += f'DO UPDATE SET {updates} WHERE {changed.replace("staged.", "excluded.")}'
+        else:
+            queryString += 'DO NOTHING'
+        self._execute(queryString)
+        if self.cache:
+            self._invalidateCache(tableName, keyName, (row[0] for row in self._execute(f'SELECT {keyName} FROM mergeStaging').fetchall()))
+        self._execute('DROP TABLE temp.mergeStaging')
+        return inserted, updated, staged
+        
+    def saveCheckpoint(self, source: str, progress: dict[str, typing.Any], commit: bool = True) -> None:
+        """
+        Saves the progress of a CSV load, replacing what was saved before for the same file
+        
+        Parameters
+        ----------
+        source: str
+            The absolute path of the CSV file being loaded
+        progress: dict[str, Any]
+            The progress, as yielded by bidIngest.readBatchesResumable
+        commit: bool (optional)
+            Commit straight away. If False, the progress is committed with the rest of the
+            current transaction (default is True)
+        """
+        self._execute(f'CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (source TEXT PRIMARY KEY NOT NULL, progress TEXT NOT NULL)')
+        self._execute(f'INSERT OR REPLACE INTO {CHECKPOINT_TABLE} (source, progress) VALUES (?, ?)', (source, json.dumps(progress)))
+        if commit:
+            self.connection.commit()
+            
+    def readCheckpoint(self, source: str) -> dict[str, typing.Any] | None:
+        """
+        Reads the progress saved for a CSV load
+        
+        Parameters
+        ----------
+        source: str
+            The absolute path of the CSV file
+            
+        Returns
+        -------
+        dict[str, Any] | None
+            The progress, or None if none was saved
+        """
+        if not self._readQuery("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", None, (CHECKPOINT_TABLE,)):
+            return None
+        found: list[tuple] = self._readQuery(f'SELECT progress FROM {CHECKPOINT_TABLE} WHERE source = ?', None, (source,))
+        return json.loads(found[0][0]) if found else None
+        
+    def deleteCheckpoint(self, source: str) -> None:
+        """
+        Deletes the progress saved for a CSV load, once it has finished
+        
+        Parameters
+        ----------
+        source: str
+            The absolute path of the CSV file
+        """
+        if self.readCheckpoint(source) is not None:
+            self._runQuery(f'DELETE FROM {CHECKPOINT_TABLE} WHERE source = ?', None, (source,))
         
     def readRecords(self, tableName: str) -> None:
         """
@@ -241,9 +1388,9 @@ class BidDatabase:
         for record in records:
             print(record)
         
-    def readRecord(self, tableName: str, keyName: str, id: typing.Any) -> None:
+    def readRecord(self, tableName: str, keyName: str, id: typing.Any) -> tuple:
         """
-        Reads and displays a singular record
+        Reads and displays a singular record. Served from the cache when enabled
         
         Parameters
         ----------
@@ -253,11 +1400,48 @@ class BidDatabase:
             The name of the column containing the keys
         id: Any
             The key to find and display
+            
+        Returns
+        -------
+        tuple
+            The record found
         """
+        if self.cache is not None:
+            cached: tuple | None = self._cacheGet((tableName, keyName, id))
+            if cached is not None:
+                print('Record found')
+                print(cached)
+                return cached
         queryString: str = f'SELECT * FROM {tableName} WHERE {keyName} = {id}'
         record = self._readQuery(queryString, 'Record found')
         # Display the first record in the tuple. Removes the brackets from the display
         print(record[0])
+        if self.cache is not None:
+            self._cachePut((tableName, keyName, id), record[0])
+        return record[0]
+        
+    def readRange(self, tableName: str, keyName: str, low: typing.Any, high: typing.Any) -> list[tuple]:
+        """
+        Reads the records whose keys fall within a range, in key order
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to search
+        keyName: str
+            The name of the column containing the keys
+        low: Any
+            The smallest key to return
+        high: Any
+            The largest key to return
+            
+        Returns
+        -------
+        list[tuple]
+            The records found
+        """
+        queryString: str = f'SELECT * FROM {tableName} WHERE {keyName} BETWEEN ? AND ? ORDER BY {keyName}'
+        return self._readQuery(queryString, parameters=(low, high))
         
     def updateRecord(self, tableName: str, keyName: str, id: int, updates: dict[str, typing.Any]) -> None:
         """
@@ -285,6 +1469,7 @@ class BidDatabase:
         queryBody = queryBody[6:]
         queryString: str = queryHeader + queryBody + queryFooter
         self._runQuery(queryString, 'Record updated')
+        self._invalidateCache(tableName, keyName, (id, updates.get(keyName, id)))
         
     def deleteRecord(self, tableName: str, keyName: str, id: int) -> None:
         """
@@ -300,4 +1485,282 @@ class BidDatabase:
             The key to find and delete
         """
         queryString: str = f'DELETE FROM {tableName} WHERE {keyName} = {id}'
-        self._runQuery(queryString, 'Record deleted')
\ No newline at end of file
+        self._runQuery(queryString, 'Record deleted')
+        self._invalidateCache(tableName, keyName, (id,))
+        
+    def updateRecords(self,
+                      tableName: str,
+                      keyName: str,
+                      tableCols: tuple[str],
+                      records: typing.Iterable[tuple[typing.Any]]) -> int | None:
+        """
+        Updates many records in a single transaction
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the table that contains the records to update
+        keyName: str
+            The name of the column containing the keys. Must be one of tableCols
+        tableCols: tuple[str]
+            The columns in each record. Every column other than keyName is updated
+        records: Iterable[tuple[Any]]
+            The updated records. Must line up with the values in tableCols
+            
+        Returns
+        -------
+        int | None
+            The number of records updated, or None if the update failed and was rolled back
+        """
+        tableName, tableCols, records = self._compactBatch(tableName, tableCols, records)
+        keyColumn: int = tableCols.index(keyName)
+        updates: str = ', '.join(f'{colName} = ?' for colName in tableCols if colName != keyName)
+        queryString: str = f'UPDATE {tableName} SET {updates} WHERE {keyName} = ?'
+        ids: list[typing.Any] = []
+        
+        def _parameters() -> typing.Iterator[tuple]:
+            # Move the key to the end to line up with the WHERE placeholder
+            for record in records:
+                ids.append(record[keyColumn])
+                yield record[:keyColumn] + record[keyColumn + 1:] + (record[keyColumn],)
+                
+        try:
+            updated: int = self._execute(queryString, _parameters(), many=True).rowcount
+            self.connection.commit()
+            self._noteWrites()
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while performing: {queryString}')
+            return None
+        finally:
+            self._invalidateCache(tableName, keyName, ids)
+        print(f'{updated} records updated')
+        return updated
+        
+    def deleteRecords(self, tableName: str, keyName: str, ids: typing.Iterable[typing.Any]) -> int | None:
+        """
+        Deletes many records in a single transaction
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the table that contains the records to delete
+        keyName: str
+            The name of the column containing the keys
+        ids: Iterable[Any]
+            The keys to find and delete
+            
+        Returns
+        -------
+        int | None
+            The number of records deleted, or None if the delete failed and was rolled back
+        """
+        ids = list(ids)
+        tableName = self._storageTable(tableName)
+        deleted: int = 0
+        try:
+            # Chunked IN lists keep every key a bound parameter without exceeding the variable limit
+            for start in range(0, len(ids), BATCH_CHUNK_SIZE):
+                chunk: list[typing.Any] = ids[start:start + BATCH_CHUNK_SIZE]
+                deleted += self._execute(f'DELETE FROM {tableName} WHERE {keyName} IN ({", ".join("?" * len(chunk))})', chunk).rowcount
+            self.connection.commit()
+            self._noteWrites()
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while deleting records from: {tableName}')
+            return None
+        finally:
+            self._invalidateCache(tableName, keyName, ids)
+        print(f'{deleted} records deleted')
+        return deleted
+        
+    def applyChanges(self,
+                     tableName: str,
+                     keyName: str,
+                     tableCols: tuple[str],
+                     inserts: typing.Iterable[tuple[typing.Any]] = (),
+                     updates: typing.Iterable[tuple[typing.Any]] = (),
+                     deletes: typing.Iterable[typing.Any] = ()) -> dict[str, int] | None:
+        """
+        Applies a change set, such as one from bidIngest.diffBatches, in a single transaction.
+        Inserts and updates are merged the way mergeRecords merges them, so existing rows are
+        updated in place rather than deleted and inserted again
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to change
+        keyName: str
+            The name of the primary key column. Must be one of tableCols
+        tableCols: tuple[str]
+            The columns in each inserted or updated record
+        inserts: Iterable[tuple[Any]] (optional)
+            New records. Must line up with the values in tableCols. A record whose key is
+            already in the table updates it (default is ())
+        updates: Iterable[tuple[Any]] (optional)
+            Changed records. Must line up with the values in tableCols (default is ())
+        deletes: Iterable[Any] (optional)
+            The keys of the records to delete (default is ())
+            
+        Returns
+        -------
+        dict[str, int] | None
+            The number of records 'inserted', 'updated' and 'deleted', or None if the
+            change set failed and was rolled back
+        """
+        _, _, inserts = self._compactBatch(tableName, tableCols, inserts)
+        tableName, tableCols, updates = self._compactBatch(tableName, tableCols, updates)
+        keyColumn: int = tableCols.index(keyName)
+        inserts, updates, deletes = list(inserts), list(updates), list(deletes)
+        try:
+            inserted, updated, _ = self._mergeStaged(tableName, keyName, tableCols, itertools.chain(inserts, updates))
+            deleted: int = 0
+            for start in range(0, len(deletes), BATCH_CHUNK_SIZE):
+                chunk: list[typing.Any] = deletes[start:start + BATCH_CHUNK_SIZE]
+                deleted += self._execute(f'DELETE FROM {tableName} WHERE {keyName} IN ({", ".join("?" * len(chunk))})', chunk).rowcount
+            self.connection.commit()
+            self._noteWrites()
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while applying changes to: {tableName}')
+            return None
+        finally:
+            self._invalidateCache(tableName, keyName, itertools.chain((record[keyColumn] for record in inserts + updates), deletes))
+        counts: dict[str, int] = {'inserted': inserted, 'updated': updated, 'deleted': deleted}
+        print(f'Changes applied: {counts["inserted"]} inserted, {counts["updated"]} updated, {counts["deleted"]} deleted')
+        return counts
+        
+    ############################
+    # Export functions
+    ############################
+    def _exportRecords(self, tableName: str, keyName: str) -> tuple[tuple[str], typing.Iterator[tuple]]:
+        """
+        Reads a table in key order, fetching a batch of rows at a time. Not meant to be called on it's own
+        
+        Returns
+        -------
+        tuple[tuple[str], Iterator[tuple]]
+            The column names and the rows
+        """
+        # A separate cursor keeps self.cursor free while the export is streaming
+        exportCursor: sqlite3.Cursor = self.connection.cursor()
+        exportCursor.execute(f'SELECT * FROM {tableName} ORDER BY {keyName}')
+        columns: tuple[str] = tuple(column[0] for column in exportCursor.description)
+        
+        def _rows() -> typing.Iterator[tuple]:
+            while batch := exportCursor.fetchmany(EXPORT_BATCH_ROWS):
+                yield from batch
+            exportCursor.close()
+            
+        return columns, _rows()
+        
+    def exportCsv(self, path: str, tableName: str = 'bids', keyName: str = 'auctionID') -> int | None:
+        """
+        Streams a table to a CSV file in key order, with a header row of column names.
+        Only one batch of rows is held in memory at a time
+        
+        Parameters
+        ----------
+        path: str
+            The relative path of the file to write. Ending it in .gz, .bz2 or .xz
+            compresses the file on the fly
+        tableName: str (optional)
+            The table to export (default is 'bids')
+        keyName: str (optional)
+            The column to order the export by (default is 'auctionID')
+            
+        Returns
+        -------
+        int | None
+            The number of records exported, or None if the export failed
+        """
+        try:
+            columns, records = self._exportRecords(tableName, keyName)
+            exported: int = bidIngest.exportCsv(records, path, columns)
+        except sqlite3.Error as error:
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while exporting: {tableName}')
+            return None
+        print(f'{exported} records exported')
+        return exported
+        
+    def exportJsonl(self, path: str, tableName: str = 'bids', keyName: str = 'auctionID') -> int | None:
+        """
+        Streams a table to a JSON Lines file in key order, one object per record keyed
+        by column name. Only one batch of rows is held in memory at a time
+        
+        Parameters
+        ----------
+        path: str
+            The relative path of the file to write. Ending it in .gz, .bz2 or .xz
+            compresses the file on the fly
+        tableName: str (optional)
+            The table to export (default is 'bids')
+        keyName: str (optional)
+            The column to order the export by (default is 'auctionID')
+            
+        Returns
+        -------
+        int | None
+            The number of records exported, or None if the export failed
+        """
+        try:
+            columns, records = self._exportRecords(tableName, keyName)
+            exported: int = bidIngest.exportJsonl(records, path, columns)
+        except sqlite3.Error as error:
+            print(f'Error encountered: {error}')
+            print(f'    Encounted while exporting: {tableName}')
+            return None
+        print(f'{exported} records exported')
+        return exported
+        
+    ############################
+    # Aggregation functions
+    ############################
+    def aggregate(self,
+                  tableName: str,
+                  groupBy: tuple[str],
+                  metrics: dict[str, tuple[str, str]],
+                  where: str | None = None,
+                  parameters: tuple[typing.Any] = ()) -> list[tuple]:
+        """
+        Groups and aggregates records inside SQLite so only the summary rows are returned
+        
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to aggregate
+        groupBy: tuple[str]
+            The columns to group by. An empty tuple aggregates the whole table into one row
+        metrics: dict[str, tuple[str, str]]
+            The aggregates to compute. Must be a dictionary where the keys are the result
+            names and the values are (function, column) pairs, where function is one of
+            AGGREGATE_FUNCTIONS
+                E.g., {'total': ('SUM', 'winningBid'),
+                    'bids': ('COUNT', '*')}
+        where: str | None (optional)
+            Condition applied before grouping, using '?' placeholders for any values.
+            If None, every record is included (default is None)
+        parameters: tuple[Any] (optional)
+            Values bound to the '?' placeholders in where (default is ())
+            
+        Returns
+        -------
+        list[tuple]
+            One tuple per group holding the groupBy values followed by the metrics in order,
+            sorted by the groupBy columns
+        """
+        selectCols: list[str] = list(groupBy)
+        for metricName, (function, colName) in metrics.items():
+            if function.upper() not in AGGREGATE_FUNCTIONS:
+                raise ValueError(f'Unsupported aggregate function: {function}')
+            selectCols.append(f'{function.upper()}({colName}) AS {metricName}')
+        queryString: str = f'SELECT {", ".join(selectCols)} FROM {tableName}'
+        if where:
+            queryString = f'{queryString} WHERE {where}'
+        if groupBy:
+            queryString = f'{queryString} GROUP BY {", ".join(groupBy)} ORDER BY {", ".join(groupBy)}'
+        return self._readQuery(queryString, parameters=parameters)
@@ -0,0 +1,158 @@
+#=======================================================================================
+# Name        : bidLoadClient.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Load generator for bidServer.py. Measures requests per second and
+#               latency percentiles of get requests on localhost
+#=======================================================================================
+
+import asyncio
+import bidServer
+import collections
+import json
+import random
+import sys
+import time
+import typing
+
+def percentile(sortedValues: list[float], fraction: float) -> float:
+    """
+    Finds a percentile of already sorted values using the nearest rank
+
+    Parameters
+    ----------
+    sortedValues: list[float]
+        The values, smallest first
+    fraction: float
+        The percentile wanted, between 0 and 1
+
+    Returns
+    -------
+    float
+        The value at that percentile, or 0.0 if there are no values
+    """
+    if not sortedValues:
+        return 0.0
+    return sortedValues[min(len(sortedValues) - 1, int(fraction * len(sortedValues)))]
+
+async def runConnection(host: str,
+                        port: int,
+                        keys: list[int],
+                        deadline: float,
+                        pipelineDepth: int,
+                        idsPerRequest: int,
+                        latencies: list[float]) -> None:
+    """
+    Sends get requests over one connection until the deadline, keeping pipelineDepth
+    requests in flight, and records each request's latency in seconds
+
+    Parameters
+    ----------
+    host: str
+        The server's address
+    port: int
+        The server's port
+    keys: list[int]
+        The auction IDs to pick lookups from
+    deadline: float
+        time.perf_counter() value at which to stop sending
+    pipelineDepth: int
+        Requests sent before waiting for the first response
+    idsPerRequest: int
+        Auction IDs looked up per request
+    latencies: list[float]
+        Where latencies are appended
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=bidServer.MAX_LINE_BYTES)
+    generator: random.Random = random.Random()
+    # Send times of the requests in flight, oldest first, since responses come back in order
+    sentTimes: collections.deque[float] = collections.deque()
+    requestId: int = 0
+
+    def _send() -> None:
+        nonlocal requestId
+        requestId += 1
+        request: dict[str, typing.Any] = {'id': requestId, 'op': 'get', 'ids': generator.choices(keys, k=idsPerRequest)}
+        writer.write(json.dumps(request).encode() + b'\n')
+        sentTimes.append(time.perf_counter())
+
+    for _ in range(pipelineDepth):
+        _send()
+    while sentTimes:
+        line: bytes = await reader.readline()
+        if not line:
+            break
+        latencies.append(time.perf_counter() - sentTimes.popleft())
+        if time.perf_counter() < deadline:
+            _send()
+            await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+async def runLoad(host: str = '127.0.0.1',
+                  port: int = bidServer.DEFAULT_PORT,
+                  keys: list[int] | None = None,
+                  seconds: float = 10.0,
+                  connections: int = 8,
+                  pipelineDepth: int = 16,
+                  idsPerRequest: int = 1) -> dict[str, float]:
+    """
+    Runs the load test and prints its results
+
+    Parameters
+    ----------
+    host: str (optional)
+        The server's address (default is '127.0.0.1')
+    port: int (optional)
+        The server's port (default is DEFAULT_PORT)
+    keys: list[int] | None (optional)
+        The auction IDs to look up. If None, they are read from the server with a range
+        request (default is None)
+    seconds: float (optional)
+        How long to send requests for (default is 10.0)
+    connections: int (optional)
+        The number of concurrent connections (default is 8)
+    pipelineDepth: int (optional)
+        Requests each connection keeps in flight (default is 16)
+    idsPerRequest: int (optional)
+        Auction IDs looked up per request (default is 1)
+
+    Returns
+    -------
+    dict[str, float]
+        'requests', 'requestsPerSecond', 'lookupsPerSecond' and the 'p50', 'p99', 'p999'
+        and 'max' latencies in milliseconds
+    """
+    if keys is None:
+        reader, writer = await asyncio.open_connection(host, port, limit=bidServer.MAX_LINE_BYTES)
+        writer.write(json.dumps({'id': 0, 'op': 'range', 'low': 0, 'high': 2 ** 62}).encode() + b'\n')
+        keys = [record[0] for record in json.loads(await reader.readline())['result']]
+        writer.close()
+    if not keys:
+        raise ValueError('The server holds no bids to look up')
+    latencies: list[float] = []
+    startTime: float = time.perf_counter()
+    await asyncio.gather(*(runConnection(host, port, keys, startTime + seconds, pipelineDepth, idsPerRequest, latencies)
+                           for _ in range(connections)))
+    elapsed: float = time.perf_counter() - startTime
+    latencies.sort()
+    results: dict[str, float] = {'requests': len(latencies),
+                                 'requestsPerSecond': len(latencies) / elapsed,
+                                 'lookupsPerSecond': len(latencies) * idsPerRequest / elapsed,
+                                 'p50': percentile(latencies, 0.50) * 1000,
+                                 'p99': percentile(latencies, 0.99) * 1000,
+                                 'p999': percentile(latencies, 0.999) * 1000,
+                                 'max': (latencies[-1] if latencies else 0.0) * 1000}
+    print(f'{results["requests"]:,} requests in {elapsed:.2f} s over {connections} connections, pipeline depth {pipelineDepth}')
+    print(f'  {results["requestsPerSecond"]:,.0f} requests/s, {results["lookupsPerSecond"]:,.0f} lookups/s')
+    print(f'  latency p50 {results["p50"]:.3f} ms, p99 {results["p99"]:.3f} ms, '
+          f'p99.9 {results["p999"]:.3f} ms, max {results["max"]:.3f} ms')
+    return results
+
+if __name__ == '__main__':
+    # Usage: python bidLoadClient.py [port] [seconds] [connections] [pipeline depth] [IDs per request]
+    arguments: list[int] = [int(argument) for argument in sys.argv[1:]]
+    defaults: list[int] = [bidServer.DEFAULT_PORT, 10, 8, 16, 1]
+    port, seconds, connections, pipelineDepth, idsPerRequest = arguments + defaults[len(arguments):]
+    asyncio.run(runLoad(port=port, seconds=seconds, connections=connections, pipelineDepth=pipelineDepth, idsPerRequest=idsPerRequest))
@@ -0,0 +1,164 @@
+#=======================================================================================
+# Name        : bidPipeline.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Loads large eBid CSV exports using parser processes on byte ranges of
+#               the file and a single writer thread draining a bounded queue into the
+#               database
+#=======================================================================================
+
+import bidDatabase
+import os
+import queue
+import sys
+import threading
+import typing
+
+# bidIngest is shared by all three enhancements and lives in the ingest folder beside them
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ingest'))
+import bidIngest
+
+# Files smaller than this are loaded without parser processes, which cost more to start than
+# they save. Two workers broke even with loadBids at about 14 MB of the synthetic benchmark CSV
+PARALLEL_MIN_BYTES: int = 16 << 20
+
+def ingestParallel(csvPath: str,
+                   consume: typing.Callable[[list[tuple[typing.Any]]], typing.Any],
+                   workers: int | None = None,
+                   chunkBytes: int = bidIngest.CHUNK_BYTES,
+                   maxQueuedBatches: int = bidIngest.MAX_QUEUED_BATCHES) -> int:
+    """
+    Parses a CSV file in parser processes and hands the batches, in file order, to consume
+    on a dedicated writer thread. Parsing pauses whenever maxQueuedBatches are waiting for
+    the writer, so memory stays at a few chunks however large the file is. An error raised
+    by consume stops the parsers and is raised here once the writer has stopped
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of CSV file to load
+    consume: Callable[[list[tuple[Any]]], Any]
+        Called with each batch of (auctionID, auctionTitle, fund, winningBid) records
+    workers: int | None (optional)
+        Number of parser processes. If None, one per CPU (default is None)
+    chunkBytes: int (optional)
+        Bytes parsed per batch (default is bidIngest.CHUNK_BYTES)
+    maxQueuedBatches: int (optional)
+        Parsed batches allowed to wait for consume (default is bidIngest.MAX_QUEUED_BATCHES)
+
+    Returns
+    -------
+    int
+        The number of records parsed
+    """
+    # Queue of batches for the writer thread, with None telling it to stop
+    writes: queue.Queue = queue.Queue(maxsize=maxQueuedBatches)
+    failures: list[Exception] = []
+
+    def _writeLoop() -> None:
+        # Keeps draining after a failure so the calling thread is never left blocked on the queue
+        while (batch := writes.get()) is not None:
+            if failures:
+                continue
+            try:
+                consume(batch)
+            except Exception as error:
+                failures.append(error)
+
+    writer: threading.Thread = threading.Thread(target=_writeLoop, name='bidPipelineWriter', daemon=True)
+    writer.start()
+    parsed: int = 0
+    batches: typing.Generator = bidIngest.readBatchesParallel(csvPath, workers, chunkBytes, maxQueuedBatches)
+    try:
+        for batch in batches:
+            if failures:
+                break
+            writes.put(batch)
+            parsed += len(batch)
+    finally:
+        # Closing the generator stops the parser processes
+        batches.close()
+        writes.put(None)
+        writer.join()
+    if failures:
+        raise failures[0]
+    return parsed
+
+def loadBidsParallel(csvPath: str,
+                     database: bidDatabase.BidDatabase,
+                     ignoreDuplicates: bool = True,
+                     compact: bool = False,
+                     workers: int | None = None,
+                     parallelMinBytes: int = PARALLEL_MIN_BYTES) -> None:
+    """
+    Loads bid data from a csv to the SQLite database using parser processes and one writer
+    thread, committing one transaction per batch. Takes the same arguments as bidReview.loadBids.
+    Reports the records actually added, not counting any already in the database. Files
+    smaller than parallelMinBytes, and databases only reachable through the caller's
+    connection, are loaded on the calling thread instead
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of CSV file to load
+    database: BidDatabase
+        The database to load into. The writer thread gets its own connection to the file,
+        except for an in memory database, whose connection already allows other threads
+    ignoreDuplicates: bool (optional)
+        Flag to ignore duplicates in database if True. If False, bids already in the
+        database are updated with any changed values (default is True)
+    compact: bool (optional)
+        Flag to load into the compact schema created by createCompactTable('bids')
+        instead of the plain bids table (default is False)
+    workers: int | None (optional)
+        Number of parser processes. If None, one per CPU (default is None)
+    parallelMinBytes: int (optional)
+        Files smaller than this are parsed on the calling thread (default is PARALLEL_MIN_BYTES)
+    """
+    tableName: str = 'bidsCompact' if compact else 'bids'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fundID', 'winningBidCents') if compact else ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    counts: dict[str, int] = {'inserted': 0, 'updated': 0}
+    writer: bidDatabase.BidDatabase = database
+
+    def _write(records: list[tuple[typing.Any]]) -> None:
+        if not records:
+            return
+        if compact:
+            records = writer.encodeCompactRecords('bids', records)
+        if ignoreDuplicates:
+            added: int | None = writer.createRecords(tableName, tableCols, records, ignoreDuplicates)
+            counts['inserted'] += added or 0
+        else:
+            merged: dict[str, int] | None = writer.mergeRecords(tableName, 'auctionID', tableCols, records)
+            if merged is not None:
+                counts['inserted'] += merged['inserted']
+                counts['updated'] += merged['updated']
+
+    print('Loading CSV file:', csvPath)
+    try:
+        if os.path.getsize(csvPath) < parallelMinBytes or (database.backingFile is None and database.fileName == ':memory:'):
+            # Starting the parser processes costs more than they save on small files
+            parsed: int = 0
+            for records in bidIngest.readBatches(csvPath):
+                _write(records)
+                parsed += len(records)
+        else:
+            if database.backingFile is None:
+                writer = bidDatabase.BidDatabase(database.fileName, checkSameThread=False)
+                # Share the compact table registrations so new fund IDs reach the caller's cache
+                writer.compactTables, writer.fundIds = database.compactTables, database.fundIds
+            try:
+                parsed = ingestParallel(csvPath, _write, workers)
+            finally:
+                if writer is not database:
+                    writer.close()
+        print(f'{counts["inserted"]} records loaded')
+        if counts['updated']:
+            print(f'{counts["updated"]} records updated')
+        if parsed > counts['inserted'] + counts['updated']:
+            print(f'{parsed - counts["inserted"] - counts["updated"]} of {parsed} records parsed were unchanged or not loaded')
+    except Exception as error:
+        print("Error loading file")
+        print(f"Error type: {type(error)}")
+        print(f"Error message: {error}")
@@ -10,59 +10,294 @@
 
 import typing
 import bidDatabase
-import csv
+import bidPipeline
 import datetime
+import itertools
+import os
+import sys
+import time
 
-class FileFormatError(Exception):
+# bidIngest is shared by all three enhancements and lives in the ingest folder beside them
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ingest'))
+import bidIngest
+
+# Kept here for code that catches bidReview.FileFormatError
+FileFormatError = bidIngest.FileFormatError
+   
+def loadBids(csvPath: str | typing.TextIO, database: bidDatabase.BidDatabase, ignoreDuplicates: bool = True, compact: bool = False, cached: bool = True, sortFirst: bool = False) -> None:
     """
-    Custom exception for handling incorrectly formatted file
+    Loads bid data from a csv to the SQLite database, committing one batch at a time so
+    memory use doesn't grow with the file
+    
+    Parameters
+    ----------
+    csvPath: str | TextIO
+        Relative path of CSV file to load, which may be compressed as .gz, .bz2 or .xz,
+        or a file already open in text mode
+    ignoreDuplicates: bool
+        Flag to ignore duplicates in database if True. If False, bids already in the
+        database are updated with any changed values (default is True)
+    compact: bool
+        Flag to load into the compact schema created by createCompactTable('bids')
+        instead of the plain bids table (default is False)
+    cached: bool
+        Flag to reuse the parsed columns cached by an earlier load of the same, unchanged
+        file, and cache them if there aren't any (default is True)
+    sortFirst: bool
+        Flag to load in auction ID order, sorting the file on disk if it is bigger than
+        memory. Rows then only ever go at the end of the table's B-tree (default is False)
     """
-   
-def loadBids(csvPath: str, database: bidDatabase.BidDatabase, ignoreDuplicates: bool = True) -> None:
+    print('Loading CSV file:', getattr(csvPath, 'name', csvPath))
+    tableName: str = 'bids'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    if compact:
+        # Write straight to the storage table using the cached fund IDs instead of the view's triggers
+        tableName = 'bidsCompact'
+        tableCols = ('auctionID', 'auctionTitle', 'fundID', 'winningBidCents')
+    try:
+        if sortFirst:
+            batches = bidIngest.readBatchesSorted(csvPath)
+        else:
+            batches = bidIngest.readBatchesCached(csvPath) if cached and isinstance(csvPath, str) else bidIngest.readBatches(csvPath)
+        for records in batches:
+            if compact:
+                records = database.encodeCompactRecords('bids', records)
+            if ignoreDuplicates:
+                database.createRecords(tableName, tableCols, records, ignoreDuplicates)
+            else:
+                # Update changed bids in place rather than INSERT OR REPLACE's delete and re-insert
+                database.mergeRecords(tableName, 'auctionID', tableCols, records)
+    except Exception as error:
+        print("Error loading file")
+        print(f"Error type: {type(error)}")
+        print(f"Error message: {error}")
+    
+def loadBidsResumable(csvPath: str,
+                      database: bidDatabase.BidDatabase,
+                      ignoreDuplicates: bool = True,
+                      compact: bool = False,
+                      rejectPath: str | None = None) -> None:
     """
-    Loads bid data from a csv to the SQLite database
+    Loads bid data from a csv like loadBids, but saves how far through the file it has got
+    in the same transaction as each batch. Running it again after an interruption carries
+    on from the first batch not committed. Malformed rows are written to a reject file
+    instead of stopping the load
     
     Parameters
     ----------
     csvPath: str
         Relative path of CSV file to load
+    database: BidDatabase
+        The database to load into. The progress is kept in its loadCheckpoints table
     ignoreDuplicates: bool
-        Flag to ignore duplicates in database if True (default is True)
+        Flag to ignore duplicates in database if True. If False, bids already in the
+        database are updated with any changed values (default is True)
+    compact: bool
+        Flag to load into the compact schema created by createCompactTable('bids')
+        instead of the plain bids table (default is False)
+    rejectPath: str | None
+        Relative path of the file malformed rows are written to. If None, the CSV's name
+        with _rejects added (default is None)
     """
     print('Loading CSV file:', csvPath)
+    source: str = os.path.abspath(csvPath)
+    rejectPath = rejectPath or bidIngest.rejectsPath(csvPath)
+    tableName: str = 'bidsCompact' if compact else 'bids'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fundID', 'winningBidCents') if compact else ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    progress: dict[str, typing.Any] | None = database.readCheckpoint(source)
+    if progress is not None and not bidIngest.checkpointMatches(csvPath, progress):
+        print('File has changed since the interrupted load, so loading it from the start')
+        progress = None
+    elif progress is not None:
+        print(f'Resuming after {progress["rowsLoaded"]} records')
     try:
-        with open(csvPath) as csvFile:
-            # detects csv dialect and presence of header
-            dialect = csv.Sniffer().sniff(csvFile.read(1024))
-            csvFile.seek(0)
-            headerPresent = csv.Sniffer().has_header(csvFile.read(1024))
-            csvFile.seek(0)
-            csvReader = csv.reader(csvFile, dialect)
-            # check for presence of header
-            if not headerPresent:
-                raise FileFormatError("No header found in CSV file")
+        for records, progress in bidIngest.readBatchesResumable(csvPath, progress, rejectPath):
+            if compact:
+                records = database.encodeCompactRecords('bids', records)
+            if ignoreDuplicates:
+                loaded: bool = database.createRecords(tableName, tableCols, records, ignoreDuplicates, (source, progress)) is not None
             else:
-                records: list[tuple[typing.Any]] = list()
-                for rowNumber, row in enumerate(csvReader):
-                    # Find important columns
-                    if rowNumber == 0:
-                        bidIdColumn = row.index('Auction ID')
-                        titleColumn = row.index('Auction Title')
-                        fundColumn = row.index('Fund')
-                        bidAmountColumn = row.index('Winning Bid')
-                    else:
-                        # Create list of records to add. Strip entries of "'" and strip initial $ sign from currency and convert to float to prevent errors
-                        record: tuple[typing.Any] = (int(row[bidIdColumn]),
-                                                     row[titleColumn].replace("'", ''),
-                                                     row[fundColumn].replace("'", ''),
-                                                     float((row[bidAmountColumn][1:]).replace(',','')))
-                        records.append(record)
-                database.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'), records, ignoreDuplicates)
+                loaded = database.mergeRecords(tableName, 'auctionID', tableCols, records, (source, progress)) is not None
+            if not loaded:
+                print('Load stopped. Run it again to carry on from the last batch committed')
+                return
+        database.deleteCheckpoint(source)
+        if progress is not None:
+            print(f'{progress["rowsLoaded"]} records loaded')
+            if progress['rowsRejected']:
+                print(f'{progress["rowsRejected"]} malformed rows written to {rejectPath}')
     except Exception as error:
         print("Error loading file")
         print(f"Error type: {type(error)}")
         print(f"Error message: {error}")
     
+def loadBidsBulk(pattern: str,
+                 database: bidDatabase.BidDatabase,
+                 ignoreDuplicates: bool = True,
+                 compact: bool = False,
+                 policy: str = 'latest',
+                 workers: int | None = None) -> None:
+    """
+    Loads every CSV file in a directory, or matching a glob pattern, to the SQLite database
+    in one pass. The files are parsed at the same time, one per process, into temporary run
+    files sorted by auction ID, which are merged into a single stream with one bid per ID
+    and written a batch at a time, so memory doesn't depend on the size of the files. The
+    rows and megabytes per second of each file and of the whole load are printed
+    
+    Parameters
+    ----------
+    pattern: str
+        A directory, whose .csv files are loaded, or a glob pattern such as 'eBid_*.csv'
+    database: BidDatabase
+        The database to load into
+    ignoreDuplicates: bool
+        Flag to ignore bids already in the database if True. If False, they are updated
+        with any changed values (default is True)
+    compact: bool
+        Flag to load into the compact schema created by createCompactTable('bids')
+        instead of the plain bids table (default is False)
+    policy: str
+        Which copy of an auction ID found in several files is loaded. 'latest' keeps the
+        one from the file modified last, 'first' the one from the file modified first
+        (default is 'latest')
+    workers: int | None
+        Number of parser processes. If None, one per CPU (default is None)
+    """
+    print('Loading CSV files:', pattern)
+    tableName: str = 'bidsCompact' if compact else 'bids'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fundID', 'winningBidCents') if compact else ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    try:
+        startTime: float = time.perf_counter()
+        paths: list[str] = bidIngest.expandSources(pattern)
+        if not paths:
+            raise FileNotFoundError(f'No CSV files found for {pattern}')
+        stats: list[dict[str, typing.Any]] = []
+        merged: typing.Iterator[tuple] = bidIngest.mergeFiles(paths, policy, workers, stats=stats)
+        loaded: int = 0
+        while records := list(itertools.islice(merged, bidIngest.BATCH_ROWS)):
+            loaded += len(records)
+            if compact:
+                records = database.encodeCompactRecords('bids', records)
+            if ignoreDuplicates:
+                database.createRecords(tableName, tableCols, records, ignoreDuplicates)
+            else:
+                database.mergeRecords(tableName, 'auctionID', tableCols, records)
+        bidIngest.reportThroughput(stats, loaded, time.perf_counter() - startTime)
+    except Exception as error:
+        print("Error loading file")
+        print(f"Error type: {type(error)}")
+        print(f"Error message: {error}")
+    
+def applyDiff(oldPath: str, newPath: str, database: bidDatabase.BidDatabase, compact: bool = False) -> None:
+    """
+    Brings the database up to date with a corrected export of a file loaded before, adding,
+    changing and deleting only the bids that differ between them. Both files are read in
+    auction ID order a batch at a time, so memory doesn't depend on their size, and each
+    change set is applied in its own transaction
+    
+    Parameters
+    ----------
+    oldPath: str
+        Relative path of the CSV file loaded before
+    newPath: str
+        Relative path of the corrected CSV file
+    database: BidDatabase
+        The database holding the bids of oldPath
+    compact: bool
+        Flag to change the compact schema created by createCompactTable('bids') instead
+        of the plain bids table (default is False)
+    """
+    print(f'Applying changes from {oldPath} to {newPath}')
+    tableName: str = 'bidsCompact' if compact else 'bids'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fundID', 'winningBidCents') if compact else ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    try:
+        for changeSet in bidIngest.diffBatches(oldPath, newPath):
+            inserts: list[tuple] = changeSet['insert']
+            updates: list[tuple] = changeSet['update']
+            if compact:
+                inserts = database.encodeCompactRecords('bids', inserts)
+                updates = database.encodeCompactRecords('bids', updates)
+            if database.applyChanges(tableName, 'auctionID', tableCols, inserts, updates, (record[0] for record in changeSet['delete'])) is None:
+                print('Stopped applying changes. Load the corrected file in full to finish')
+                return
+    except Exception as error:
+        print("Error loading file")
+        print(f"Error type: {type(error)}")
+        print(f"Error message: {error}")
+    
+def followBids(csvPath: str, follower: bidIngest.BidFollower | None = None) -> bidIngest.BidFollower | None:
+    """
+    Starts following a CSV file for bids appended to it, in place of any file followed
+    before. Start it before loading the file so no row appended during the load is missed.
+    Rows read by both are written twice, which leaves the same bids in the database
+    
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file to follow
+    follower: BidFollower | None
+        The follower of the file followed before, which is stopped (default is None)
+        
+    Returns
+    -------
+    BidFollower | None
+        The new follower, or None if the file can't be followed
+    """
+    if follower is not None:
+        follower.stop()
+    try:
+        follower = bidIngest.BidFollower(csvPath)
+        print('Following CSV file:', csvPath)
+        return follower
+    except Exception as error:
+        print(f'Error encountered: {error}')
+        print(f'    Encounted while following {csvPath}')
+        return None
+
+def applyFollowed(follower: bidIngest.BidFollower, database: bidDatabase.BidDatabase, ignoreDuplicates: bool = True, compact: bool = False) -> int:
+    """
+    Writes the bids appended to a followed file since the last call, in one transaction.
+    Called before every menu choice, so each answer includes the rows appended up to a
+    poll interval before. The follower's thread only reads the file, since the database
+    connection belongs to this thread
+    
+    Parameters
+    ----------
+    follower: BidFollower
+        The follower of the file
+    database: BidDatabase
+        The database to write to
+    ignoreDuplicates: bool
+        Flag to ignore duplicates in database if True. If False, bids already in the
+        database are updated with any changed values (default is True)
+    compact: bool
+        Flag to write to the compact schema created by createCompactTable('bids')
+        instead of the plain bids table (default is False)
+        
+    Returns
+    -------
+    int
+        The number of bids read
+    """
+    try:
+        records: list[tuple] = follower.pending()
+    except Exception as error:
+        print(f'Error encountered: {error}')
+        print(f'    Encounted while following {follower.csvPath}')
+        return 0
+    if not records:
+        return 0
+    tableName: str = 'bidsCompact' if compact else 'bids'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fundID', 'winningBidCents') if compact else ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    print(f'{len(records)} appended bids read from {follower.csvPath}')
+    if compact:
+        records = database.encodeCompactRecords('bids', records)
+    if ignoreDuplicates:
+        database.createRecords(tableName, tableCols, records, ignoreDuplicates)
+    else:
+        database.mergeRecords(tableName, 'auctionID', tableCols, records)
+    return len(records)
+    
 def displayMainMenu() -> int:
     """
     Displays the main menu and returns the user's choice
@@ -79,10 +314,13 @@ def displayMainMenu() -> int:
         print("  2. Display All Bids")
         print("  3. Find Bid")
         print("  4. Remove Bid")
+        print("  5. Search Bid Titles")
+        print("  6. Apply Corrected Export")
+        print("  7. Export Bids")
         print("  9. Exit")
         choice = input("Enter choice: ")
         
-        if choice in ["1", "2", "3", "4", "9"]:
+        if choice in ["1", "2", "3", "4", "5", "6", "7", "9"]:
             return int(choice)
         else:
             print("Invalid choice. Please try again")
@@ -112,18 +350,55 @@ def displayLoadMenu() -> int:
             choice = "0"
     
 if __name__ == '__main__':
-    database: bidDatabase.BidDatabase = bidDatabase.BidDatabase('bidDatabase.sqlite')
-    database.createTable('bids',
-                         {   'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
-                             'auctionTitle': 'TEXT NOT NULL',
-                             'fund': 'TEXT NOT NULL',
-                             'winningBid': 'FLOAT NOT NULL'})
+    # Run with --compact to use the compact schema, kept in its own database file,
+    # and with --memory to work on an in memory copy that is flushed back to disk.
+    # Maintenance is enabled before the tables are created so new files get incremental vacuum.
+    # Run with --parallel to parse loaded files in one process per CPU, or with --resume
+    # to save progress as files load so an interrupted load can carry on
+    compact: bool = '--compact' in sys.argv[1:]
+    inMemory: bool = '--memory' in sys.argv[1:]
+    parallel: bool = '--parallel' in sys.argv[1:]
+    resume: bool = '--resume' in sys.argv[1:]
+    # Entering a directory or glob pattern to load loads every file it names. Duplicate
+    # auction IDs keep the copy from the newest file, or the oldest when run with --first-wins
+    policy: str = 'first' if '--first-wins' in sys.argv[1:] else 'latest'
+    # Run with --follow to keep loading rows appended to the last file loaded, handling
+    # duplicates the way that load did
+    follow: bool = '--follow' in sys.argv[1:]
+    follower: bidIngest.BidFollower | None = None
+    followIgnoresDuplicates: bool = True
+    # Run with --sorted to load files in auction ID order, sorting them on disk first when
+    # they are bigger than memory
+    presort: bool = '--sorted' in sys.argv[1:]
+    if compact:
+        database: bidDatabase.BidDatabase = bidDatabase.BidDatabase('bidDatabaseCompact.sqlite', inMemory)
+        if not inMemory:
+            database.enableMaintenance()
+        database.createCompactTable('bids')
+        database.createIndex('idx_bidsCompact_fund', 'bidsCompact', ('fundID',), coveringCols=('winningBidCents',))
+        database.createSearchIndex('bidsCompact', 'auctionID', 'auctionTitle')
+    else:
+        database: bidDatabase.BidDatabase = bidDatabase.BidDatabase('bidDatabase.sqlite', inMemory)
+        if not inMemory:
+            database.enableMaintenance()
+        database.createTable('bids',
+                             {   'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                 'auctionTitle': 'TEXT NOT NULL',
+                                 'fund': 'TEXT NOT NULL',
+                                 'winningBid': 'FLOAT NOT NULL'})
+        # Per fund reports only read fund and winningBid, so cover both in the index
+        database.createIndex('idx_bids_fund', 'bids', ('fund',), coveringCols=('winningBid',))
+        database.createSearchIndex('bids', 'auctionID', 'auctionTitle')
+    # Find Bid tends to look up the same few hundred auctions repeatedly
+    database.enableCache(maxEntries=512)
     choice: int = 0
     time1: datetime.datetime = None
     time2: datetime.datetime = None
     while (choice != 9):
         try:
             choice = displayMainMenu()
+            if follower is not None:
+                applyFollowed(follower, database, followIgnoresDuplicates, compact)
         
             match choice:
                 # Load file
@@ -132,7 +407,17 @@ if __name__ == '__main__':
                     if loadChoice in [1, 2]:
                         csvFile: str = input("Enter name of file to load: ")
                         time1 = datetime.datetime.now()
-                        loadBids(csvFile, database, True if loadChoice == 1 else False)
+                        if follow and not bidIngest.isBulkSource(csvFile):
+                            follower = followBids(csvFile, follower)
+                            followIgnoresDuplicates = loadChoice == 1
+                        if bidIngest.isBulkSource(csvFile):
+                            loadBidsBulk(csvFile, database, True if loadChoice == 1 else False, compact, policy)
+                        elif parallel:
+                            bidPipeline.loadBidsParallel(csvFile, database, True if loadChoice == 1 else False, compact)
+                        elif resume:
+                            loadBidsResumable(csvFile, database, True if loadChoice == 1 else False, compact)
+                        else:
+                            loadBids(csvFile, database, True if loadChoice == 1 else False, compact, sortFirst=presort)
                         time2 = datetime.datetime.now()
                         print (f'Total load time: {time2 - time1}')
                     # Choice 3: Cancel and return to main
@@ -158,7 +443,36 @@ if __name__ == '__main__':
                     database.deleteRecord('bids', 'auctionID', searchedBid)
                     time2 = datetime.datetime.now()
                     print (f'Total removal time: {time2 - time1}')
+                # Search bid titles
+                case 5:
+                    searchedTitle: str = input("Please enter words to search titles for: ")
+                    time1 = datetime.datetime.now()
+                    for record in database.searchTitles(searchedTitle, 20):
+                        print(record)
+                    time2 = datetime.datetime.now()
+                    print (f'Total search time: {time2 - time1}')
+                # Apply only the differences between a loaded export and its correction
+                case 6:
+                    oldFile: str = input("Enter name of file originally loaded: ")
+                    newFile: str = input("Enter name of corrected file: ")
+                    time1 = datetime.datetime.now()
+                    applyDiff(oldFile, newFile, database, compact)
+                    time2 = datetime.datetime.now()
+                    print (f'Total update time: {time2 - time1}')
+                # Write the bids out in auction ID order, as JSON Lines when the name ends in .jsonl
+                case 7:
+                    exportFile: str = input("Enter name of file to export to: ")
+                    time1 = datetime.datetime.now()
+                    if bidIngest.isJsonl(exportFile):
+                        database.exportJsonl(exportFile)
+                    else:
+                        database.exportCsv(exportFile)
+                    time2 = datetime.datetime.now()
+                    print (f'Total export time: {time2 - time1}')
         except Exception as error:
             print(f'Error encountered: {error}')
+    if follower is not None:
+        follower.stop()
+    database.close()
     print("Good bye")
             
\ No newline at end of file
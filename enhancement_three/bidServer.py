@@ -0,0 +1,476 @@
+#=======================================================================================
+# Name        : bidServer.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Serves bids over TCP using line delimited JSON, backed by either the
+#               SQLite database or the red black tree from enhancement two
+#=======================================================================================
+
+import asyncBidDatabase
+import asyncio
+import bidDatabase
+import concurrent.futures
+import json
+import os
+import sys
+import typing
+
+# bidIngest is shared by all three enhancements and lives in the ingest folder beside them
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ingest'))
+import bidIngest
+
+# Columns of a bid, in record order, and the only names requests may refer to
+BID_COLS: tuple[str] = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+# Longest request line accepted, large enough for a load of several thousand records
+MAX_LINE_BYTES: int = 16 << 20
+DEFAULT_PORT: int = 8765
+
+class RequestError(Exception):
+    """
+    Custom exception for requests the server can't carry out
+    """
+
+def readBids(csvPath: str) -> list[tuple[typing.Any]]:
+    """
+    Reads every bid in an eBid CSV export
+    """
+    return [record for batch in bidIngest.readBatches(csvPath) for record in batch]
+
+def checkAggregate(groupBy: typing.Any, metrics: typing.Any) -> tuple[tuple[str], dict[str, tuple[str, str]]]:
+    """
+    Checks an aggregate request only names bid columns and supported functions, since the
+    names end up in SQL
+
+    Returns
+    -------
+    tuple[tuple[str], dict[str, tuple[str, str]]]
+        The groupBy columns and metrics, ready for BidDatabase.aggregate
+    """
+    groupBy = tuple(groupBy or ())
+    for colName in groupBy:
+        if colName not in BID_COLS:
+            raise RequestError(f'Unknown column: {colName}')
+    if not isinstance(metrics, dict) or not metrics:
+        raise RequestError('metrics must map result names to [function, column] pairs')
+    checked: dict[str, tuple[str, str]] = {}
+    for metricName, metric in metrics.items():
+        if not str(metricName).isidentifier() or not isinstance(metric, list) or len(metric) != 2:
+            raise RequestError(f'Bad metric: {metricName}')
+        function, colName = str(metric[0]).upper(), metric[1]
+        if function not in bidDatabase.AGGREGATE_FUNCTIONS:
+            raise RequestError(f'Unsupported aggregate function: {function}')
+        if colName not in BID_COLS and not (function == 'COUNT' and colName == '*'):
+            raise RequestError(f'Unknown column: {colName}')
+        checked[metricName] = (function, colName)
+    return groupBy, checked
+
+class DatabaseBackend:
+    """
+    Serves requests from the SQLite database through AsyncBidDatabase, so concurrent
+    writes from every client are committed together
+
+    Attributes
+    ----------
+    database: AsyncBidDatabase
+        The database holding the bids table
+    """
+    def __init__(self, fileName: str = 'bidDatabase.sqlite') -> None:
+        """
+        Initializer for the DatabaseBackend class. Creates the bids table if needed
+
+        Parameters
+        ----------
+        fileName: str (optional)
+            The relative path to the SQLite database (default is 'bidDatabase.sqlite')
+        """
+        self.database: asyncBidDatabase.AsyncBidDatabase = asyncBidDatabase.AsyncBidDatabase(fileName)
+        self._ready: asyncio.Task | None = None
+
+    async def _table(self) -> None:
+        """
+        Creates the bids table on first use. Not meant to be called on it's own
+        """
+        if self._ready is None:
+            self._ready = asyncio.ensure_future(self.database.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                                                                   'auctionTitle': 'TEXT NOT NULL',
+                                                                                   'fund': 'TEXT NOT NULL',
+                                                                                   'winningBid': 'FLOAT NOT NULL'}))
+        await self._ready
+
+    async def get(self, ids: list[int]) -> list[tuple | None]:
+        await self._table()
+        return await self.database.readRecordsByKey('bids', 'auctionID', ids)
+
+    async def range(self, low: int, high: int) -> list[tuple]:
+        await self._table()
+        return await self.database.readRange('bids', 'auctionID', low, high)
+
+    async def remove(self, ids: list[int]) -> int:
+        await self._table()
+        return await self.database.deleteRecords('bids', 'auctionID', ids) or 0
+
+    async def load(self, records: list[tuple]) -> int:
+        await self._table()
+        return await self.database.loadRecords('bids', BID_COLS, records)
+
+    async def aggregate(self, groupBy: tuple[str], metrics: dict[str, tuple[str, str]]) -> list[tuple]:
+        await self._table()
+        return await self.database.aggregate('bids', groupBy, metrics)
+
+    async def close(self) -> None:
+        await self.database.close()
+
+class TreeBid:
+    """
+    Bid record stored as a red black tree key, ordered by auctionID
+
+    Attributes
+    ----------
+    bidId: int
+        Unique identifier for the bid
+    record: tuple | None
+        The whole bid, or None for keys only used to search
+    """
+    __slots__ = ('bidId', 'record')
+
+    def __init__(self, bidId: int, record: tuple | None = None) -> None:
+        self.bidId: int = bidId
+        self.record: tuple | None = record
+
+    def __eq__(self, other: 'TreeBid') -> bool:
+        return isinstance(other, TreeBid) and self.bidId == other.bidId
+
+    def __lt__(self, other: 'TreeBid') -> bool:
+        return self.bidId < other.bidId
+
+class TreeBackend:
+    """
+    Serves requests from an in memory red black tree. The tree isn't thread safe, so every
+    request runs on the same single worker thread, keeping the event loop free during loads
+
+    Attributes
+    ----------
+    tree: RedBlackTree
+        The tree of TreeBid keys. Any tree with insert, search, remove and an inOrderKeys
+        taking a starting key works
+    """
+    def __init__(self, tree: typing.Any) -> None:
+        """
+        Initializer for the TreeBackend class
+
+        Parameters
+        ----------
+        tree: RedBlackTree
+            An empty tree to hold the bids
+        """
+        self.tree: typing.Any = tree
+        self._executor: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='bidTree')
+
+    async def _run(self, function: typing.Callable, *args) -> typing.Any:
+        """
+        Runs a function on the tree's worker thread. Not meant to be called on it's own
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _search(self, bidId: int) -> tuple | None:
+        """
+        Finds one bid. Not meant to be called on it's own
+        """
+        # The tree's search fails on an empty tree instead of returning None
+        if self.tree.root is None:
+            return None
+        node = self.tree.search(TreeBid(bidId))
+        return node.key.record if node is not None else None
+
+    def _range(self, low: int, high: int) -> list[tuple]:
+        """
+        Walks the tree in order from low up to high. Not meant to be called on it's own
+        """
+        records: list[tuple] = []
+        for key in self.tree.inOrderKeys(TreeBid(low)):
+            if key.bidId > high:
+                break
+            records.append(key.record)
+        return records
+
+    def _remove(self, ids: list[int]) -> int:
+        """
+        Removes bids, counting those that were there. Not meant to be called on it's own
+        """
+        removed: int = 0
+        for bidId in ids:
+            if self._search(bidId) is not None:
+                self.tree.remove(TreeBid(bidId))
+                removed += 1
+        return removed
+
+    def _load(self, records: list[tuple]) -> int:
+        """
+        Inserts bids, skipping keys already in the tree. Not meant to be called on it's own
+        """
+        added: int = 0
+        for record in records:
+            if self._search(record[0]) is None:
+                self.tree.insert(TreeBid(record[0], tuple(record)))
+                added += 1
+        print(f'{added} records loaded')
+        return added
+
+    def _aggregate(self, groupBy: tuple[str], metrics: dict[str, tuple[str, str]]) -> list[tuple]:
+        """
+        Groups and aggregates every bid with the same results as BidDatabase.aggregate.
+        Not meant to be called on it's own
+        """
+        groupColumns: list[int] = [BID_COLS.index(colName) for colName in groupBy]
+        groups: dict[tuple, list[list]] = {}
+        for key in self.tree.inOrderKeys():
+            values: list[list] = groups.setdefault(tuple(key.record[column] for column in groupColumns), [[] for _ in metrics])
+            for metricValues, (function, colName) in zip(values, metrics.values()):
+                metricValues.append(1 if colName == '*' else key.record[BID_COLS.index(colName)])
+        if not groupBy and not groups:
+            groups[()] = [[] for _ in metrics]
+        rows: list[tuple] = []
+        for group in sorted(groups):
+            results: list[typing.Any] = []
+            for metricValues, (function, _) in zip(groups[group], metrics.values()):
+                match function:
+                    case 'COUNT':
+                        results.append(len(metricValues))
+                    case 'SUM':
+                        results.append(sum(metricValues) if metricValues else None)
+                    case 'TOTAL':
+                        results.append(float(sum(metricValues)))
+                    case 'AVG':
+                        results.append(sum(metricValues) / len(metricValues) if metricValues else None)
+                    case 'MIN':
+                        results.append(min(metricValues, default=None))
+                    case 'MAX':
+                        results.append(max(metricValues, default=None))
+            rows.append(group + tuple(results))
+        return rows
+
+    async def get(self, ids: list[int]) -> list[tuple | None]:
+        return await self._run(lambda: [self._search(bidId) for bidId in ids])
+
+    async def range(self, low: int, high: int) -> list[tuple]:
+        return await self._run(self._range, low, high)
+
+    async def remove(self, ids: list[int]) -> int:
+        return await self._run(self._remove, ids)
+
+    async def load(self, records: list[tuple]) -> int:
+        return await self._run(self._load, records)
+
+    async def aggregate(self, groupBy: tuple[str], metrics: dict[str, tuple[str, str]]) -> list[tuple]:
+        return await self._run(self._aggregate, groupBy, metrics)
+
+    async def close(self) -> None:
+        self._executor.shutdown()
+
+class BidServer:
+    """
+    Line delimited JSON server for bids. Each request is one JSON object on its own line,
+    and each gets one response line, in the order the requests were sent. Clients may
+    send more requests before earlier responses arrive
+
+    Requests:
+        {"id": 1, "op": "get", "ids": [10, 11]}                 -> list of records or null
+        {"id": 2, "op": "range", "low": 10, "high": 20}         -> list of records
+        {"id": 3, "op": "remove", "ids": [10]}                  -> number removed
+        {"id": 4, "op": "load", "records": [[...], ...]}        -> number added
+        {"id": 5, "op": "load", "path": "bids.csv"}             -> number added, for files
+                                                                   inside the data directory
+        {"id": 6, "op": "aggregate", "groupBy": ["fund"],
+         "metrics": {"total": ["SUM", "winningBid"]}}           -> list of rows
+    Responses are {"id": ..., "ok": true, "result": ...} or {"id": ..., "ok": false, "error": "..."}
+
+    Attributes
+    ----------
+    backend: DatabaseBackend | TreeBackend
+        Where the bids are kept
+    requestCount: int
+        The number of requests answered
+    dataDirectory: str | None
+        The only directory load requests may name files in. If None, loading by path is refused
+    """
+    def __init__(self, backend: DatabaseBackend | TreeBackend, dataDirectory: str | None = None) -> None:
+        """
+        Initializer for the BidServer class
+
+        Parameters
+        ----------
+        backend: DatabaseBackend | TreeBackend
+            Where the bids are kept
+        dataDirectory: str | None (optional)
+            The only directory load requests may name files in. If None, loading by path
+            is refused (default is None)
+        """
+        self.backend: DatabaseBackend | TreeBackend = backend
+        self.dataDirectory: str | None = os.path.realpath(dataDirectory) if dataDirectory is not None else None
+        self.requestCount: int = 0
+        self.server: asyncio.Server | None = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT) -> int:
+        """
+        Starts listening for clients
+
+        Parameters
+        ----------
+        host: str (optional)
+            The address to listen on (default is '127.0.0.1')
+        port: int (optional)
+            The port to listen on. 0 picks a free port (default is DEFAULT_PORT)
+
+        Returns
+        -------
+        int
+            The port listened on
+        """
+        self.server = await asyncio.start_server(self._serveClient, host, port, limit=MAX_LINE_BYTES)
+        port = self.server.sockets[0].getsockname()[1]
+        print(f'Serving bids on {host}:{port}')
+        return port
+
+    async def stop(self) -> None:
+        """
+        Stops listening and closes the backend
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        await self.backend.close()
+
+    async def _serveClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers one client's requests in order until it disconnects. Not meant to be called on it's own
+        """
+        try:
+            while True:
+                line: bytes = await reader.readline()
+                if not line:
+                    break
+                writer.write(await self.handleRequest(line))
+                # Only waits once the socket's buffer fills, so pipelined responses go out together
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as error:
+            print(f'Error encountered: {error}')
+            print('    Encounted while serving a client')
+        finally:
+            writer.close()
+
+    async def handleRequest(self, line: bytes) -> bytes:
+        """
+        Carries out one request
+
+        Parameters
+        ----------
+        line: bytes
+            The request's JSON line
+
+        Returns
+        -------
+        bytes
+            The response's JSON line
+        """
+        requestId: typing.Any = None
+        try:
+            request: typing.Any = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError('Requests must be JSON objects')
+            requestId = request.get('id')
+            result: typing.Any = await self._dispatch(request)
+            response: dict[str, typing.Any] = {'id': requestId, 'ok': True, 'result': result}
+        except (RequestError, ValueError, TypeError, KeyError, OSError) as error:
+            response = {'id': requestId, 'ok': False, 'error': f'{type(error).__name__}: {error}'}
+        self.requestCount += 1
+        return json.dumps(response).encode() + b'\n'
+
+    async def _dispatch(self, request: dict[str, typing.Any]) -> typing.Any:
+        """
+        Passes a request on to the backend. Not meant to be called on it's own
+        """
+        match request.get('op'):
+            case 'get':
+                return await self.backend.get([int(bidId) for bidId in request['ids']])
+            case 'range':
+                return await self.backend.range(int(request['low']), int(request['high']))
+            case 'remove':
+                return await self.backend.remove([int(bidId) for bidId in request['ids']])
+            case 'load':
+                if 'path' in request:
+                    # Parse on a worker thread so a large file doesn't stall other clients
+                    records: list[tuple] = await asyncio.get_running_loop().run_in_executor(None, readBids, self._dataPath(request['path']))
+                else:
+                    records = [tuple(record) for record in request['records']]
+                    if any(len(record) != len(BID_COLS) for record in records):
+                        raise RequestError(f'Records must hold {", ".join(BID_COLS)}')
+                return await self.backend.load(records)
+            case 'aggregate':
+                return await self.backend.aggregate(*checkAggregate(request.get('groupBy'), request.get('metrics')))
+            case op:
+                raise RequestError(f'Unknown op: {op}')
+
+    def _dataPath(self, path: typing.Any) -> str:
+        """
+        Resolves a load request's path, refusing any outside the data directory. Not meant to be called on it's own
+        """
+        if self.dataDirectory is None:
+            raise RequestError('Loading by path is disabled')
+        if not isinstance(path, str):
+            raise RequestError('Paths must be strings')
+        # Resolved first so neither '..' nor a symbolic link can lead out of the directory
+        fullPath: str = os.path.realpath(os.path.join(self.dataDirectory, path))
+        if os.path.commonpath((fullPath, self.dataDirectory)) != self.dataDirectory:
+            raise RequestError(f'Path is outside the data directory: {path}')
+        return fullPath
+
+def openTreeBackend() -> TreeBackend:
+    """
+    Creates a TreeBackend around enhancement two's red black tree
+
+    Returns
+    -------
+    TreeBackend
+        The backend, holding an empty tree
+    """
+    # The tree lives in the enhancement two folder beside this one
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'enhancement_two'))
+    import qbr_dataStructures
+    return TreeBackend(qbr_dataStructures.RedBlackTree())
+
+async def serve(backendName: str, port: int, csvPath: str | None, dataDirectory: str | None = None) -> None:
+    """
+    Runs the server until interrupted
+
+    Parameters
+    ----------
+    backendName: str
+        'tree' for the red black tree, or 'database' for the SQLite database
+    port: int
+        The port to listen on
+    csvPath: str | None
+        A CSV file to load before serving, if any
+    dataDirectory: str | None (optional)
+        The only directory clients may load files from by path. If None, they can only
+        send records (default is None)
+    """
+    backend: DatabaseBackend | TreeBackend = openTreeBackend() if backendName == 'tree' else DatabaseBackend()
+    server: BidServer = BidServer(backend, dataDirectory)
+    if csvPath:
+        await backend.load(readBids(csvPath))
+    await server.start(port=port)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.stop()
+
+if __name__ == '__main__':
+    # Usage: python bidServer.py [tree|database] [port] [csv file to load] [directory clients may load from]
+    backendName: str = sys.argv[1] if len(sys.argv) > 1 else 'database'
+    port: int = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT
+    csvPath: str | None = sys.argv[3] if len(sys.argv) > 3 else None
+    dataDirectory: str | None = sys.argv[4] if len(sys.argv) > 4 else None
+    try:
+        asyncio.run(serve(backendName, port, csvPath, dataDirectory))
+    except KeyboardInterrupt:
+        print("Good bye")
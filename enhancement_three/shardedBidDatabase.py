@@ -0,0 +1,519 @@
+#=======================================================================================
+# Name        : shardedBidDatabase.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Partitions bids across several SQLite files, each behind a BidDatabase,
+#               with the same CRUD functions as BidDatabase
+#=======================================================================================
+
+import bidDatabase
+import bisect
+import concurrent.futures
+import contextlib
+import heapq
+import io
+import sqlite3
+import typing
+import zlib
+
+class ShardedBidDatabase:
+    """
+    Class for interacting with bids split across several SQLite databases. Every shard
+    has its own connection, owned by a single worker thread, so queries against
+    different shards run in parallel
+
+    Attributes
+    ----------
+    shards: list[BidDatabase]
+        The database of each shard
+    executors: list[concurrent.futures.ThreadPoolExecutor]
+        The worker thread of each shard. A shard's connection is only used from its thread
+    keyName: str
+        The column records are partitioned on
+    boundaries: list[Any] | None
+        The first key held by each shard after the first when partitioning by range,
+        or None when partitioning by hash
+    """
+    def __init__(self, fileNames: list[str], keyName: str = 'auctionID', boundaries: list[typing.Any] | None = None) -> None:
+        """
+        Initializer for the ShardedBidDatabase class. Connects to every shard
+
+        Parameters
+        ----------
+        fileNames: list[str]
+            The relative paths of the SQLite databases to use as shards
+        keyName: str (optional)
+            The column records are partitioned on (default is 'auctionID')
+        boundaries: list[Any] | None (optional)
+            Sorted keys splitting the shards by range. Shard i holds keys from
+            boundaries[i - 1] up to but not including boundaries[i]. Must have one fewer
+            entry than fileNames. If None, keys are partitioned by hash (default is None)
+        """
+        if boundaries is not None and (len(boundaries) != len(fileNames) - 1 or boundaries != sorted(boundaries)):
+            raise ValueError('boundaries must be sorted and have one fewer entry than fileNames')
+        self.keyName: str = keyName
+        self.boundaries: list[typing.Any] | None = boundaries
+        self.executors: list[concurrent.futures.ThreadPoolExecutor] = [
+            concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'shard{shardIndex}') for shardIndex in range(len(fileNames))]
+        self.shards: list[bidDatabase.BidDatabase] = []
+        for executor, fileName in zip(self.executors, fileNames):
+            # Connect one shard at a time so their connection messages can be collapsed into one
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.shards.append(executor.submit(bidDatabase.BidDatabase, fileName).result())
+        print(f'Connected to {len(self.shards)} database shards successfully')
+
+    def shardFor(self, key: typing.Any) -> int:
+        """
+        Finds the shard a key belongs to
+
+        Parameters
+        ----------
+        key: Any
+            The key to place
+
+        Returns
+        -------
+        int
+            The index of the shard holding the key
+        """
+        if self.boundaries is not None:
+            return bisect.bisect_right(self.boundaries, key)
+        # Python's hash() of strings changes between runs, so use a stable hash for non integers
+        if isinstance(key, int):
+            return key % len(self.shards)
+        return zlib.crc32(str(key).encode()) % len(self.shards)
+
+    def _shardsForRange(self, low: typing.Any, high: typing.Any) -> list[int]:
+        """
+        Finds the shards that may hold keys within a range. Not meant to be called on it's own
+        """
+        if self.boundaries is None:
+            return list(range(len(self.shards)))
+        return list(range(self.shardFor(low), self.shardFor(high) + 1))
+
+    def _fanOut(self, task: typing.Callable[[int], typing.Any], shardIndexes: typing.Iterable[int] | None = None) -> list[typing.Any] | None:
+        """
+        Runs a task on each shard's worker thread at the same time. Not meant to be called on it's own
+
+        Parameters
+        ----------
+        task: Callable[[int], Any]
+            The function to run, called with the index of the shard
+        shardIndexes: Iterable[int] | None (optional)
+            The shards to run the task on. If None, runs on every shard (default is None)
+
+        Returns
+        -------
+        list[Any] | None
+            The result from each shard in shard order, or None if any shard failed
+        """
+        if shardIndexes is None:
+            shardIndexes = range(len(self.shards))
+        futures: list[concurrent.futures.Future] = [self.executors[shardIndex].submit(task, shardIndex) for shardIndex in shardIndexes]
+        results: list[typing.Any] = []
+        error: sqlite3.Error | None = None
+        for future in futures:
+            try:
+                results.append(future.result())
+            except sqlite3.Error as shardError:
+                error = shardError
+        if error is not None:
+            print(f'Error encountered: {error}')
+            return None
+        return results
+
+    def _read(self, shardIndex: int, query: str, parameters: typing.Any = ()) -> list[tuple]:
+        """
+        Runs a read on one shard. Must run on the shard's worker thread. Not meant to be called on it's own
+        """
+        return self.shards[shardIndex].cursor.execute(query, parameters).fetchall()
+
+    def _changeShards(self,
+                      change: typing.Callable[[int], typing.Any],
+                      message: str,
+                      shardIndexes: typing.Iterable[int] | None = None) -> list[typing.Any] | None:
+        """
+        Runs a change on each shard inside a transaction, committing only once it has
+        worked on all of them so a shard that fails leaves every shard unchanged. A shard
+        whose commit itself fails can still leave the others committed. Not meant to be
+        called on it's own
+
+        Parameters
+        ----------
+        change: Callable[[int], Any]
+            Makes the change on the cursor of the shard it's called with, without committing
+        message: str
+            Message to display once every shard has committed
+        shardIndexes: Iterable[int] | None (optional)
+            The shards to change. If None, changes every shard (default is None)
+
+        Returns
+        -------
+        list[Any] | None
+            The result from each shard in shard order, or None if any shard failed
+        """
+        shardIndexes = list(range(len(self.shards)) if shardIndexes is None else shardIndexes)
+
+        def _change(shardIndex: int) -> typing.Any:
+            # sqlite3 doesn't open a transaction for schema changes on its own
+            self.shards[shardIndex].cursor.execute('BEGIN')
+            return change(shardIndex)
+
+        results: list[typing.Any] | None = self._fanOut(_change, shardIndexes)
+        if results is None:
+            self._fanOut(lambda shardIndex: self.shards[shardIndex].connection.rollback(), shardIndexes)
+            return None
+        if self._fanOut(lambda shardIndex: self.shards[shardIndex].connection.commit(), shardIndexes) is None:
+            return None
+        print(message)
+        return results
+
+    def _alterEveryShard(self, queryString: str, message: str) -> bool:
+        """
+        Runs a schema change on every shard, committing only once it has worked on all of
+        them. Not meant to be called on it's own
+
+        Returns
+        -------
+        bool
+            True if every shard was changed
+        """
+        return self._changeShards(lambda shardIndex: self.shards[shardIndex].cursor.execute(queryString), message) is not None
+
+    def close(self) -> None:
+        """
+        Closes every shard's connection and stops the worker threads
+        """
+        self._fanOut(lambda shardIndex: self.shards[shardIndex].connection.close())
+        for executor in self.executors:
+            executor.shutdown()
+
+    ############################
+    # Table based CRUD functions
+    ############################
+    def createTable(self, tableName: str, tableCols: dict[str, str]) -> None:
+        """
+        Creates a table in every shard if it doesn't already exist
+
+        Parameters
+        ----------
+        tableName: str
+            Name of the table to create
+        tableCols: dict[str, str]
+            The names and attributes of the table to add, as for BidDatabase.createTable
+        """
+        queryString: str = f'CREATE TABLE IF NOT EXISTS {tableName} ({", ".join(f"{colName} {colProperty}" for colName, colProperty in tableCols.items())});'
+        self._alterEveryShard(queryString, 'Table created successfully')
+
+    def updateTableName(self, oldTableName: str, newTableName: str) -> None:
+        """
+        Updates a table's name in every shard
+
+        Parameters
+        ----------
+        oldTableName: str
+            The name of the table to rename
+        newTableName: str
+            The table's new name
+        """
+        queryString: str = f'ALTER TABLE {oldTableName} RENAME TO {newTableName}'
+        self._alterEveryShard(queryString, 'Table renamed successfully')
+
+    def addTableColumn(self, tableName: str, newColName: str, newColType: str) -> None:
+        """
+        Adds a column to the table in every shard
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to add a column to
+        newColName: str
+            The name of the column to add
+        newColType: str
+            The attributes of the new column
+        """
+        queryString: str = f'ALTER TABLE {tableName} ADD COLUMN {newColName} {newColType}'
+        self._alterEveryShard(queryString, 'New column added successfully')
+
+    def updateTableColumnName(self, tableName: str, oldColName: str, newColName: str) -> None:
+        """
+        Updates a column name in every shard. The partitioning column can't be renamed
+        since records are placed by it
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table that contains the column to update
+        oldColName: str
+            The name of the column to rename
+        newColName: str
+            The column's new name
+        """
+        if oldColName == self.keyName:
+            raise ValueError(f'Cannot rename the partitioning column {self.keyName}')
+        queryString: str = f'ALTER TABLE {tableName} RENAME COLUMN {oldColName} TO {newColName}'
+        self._alterEveryShard(queryString, 'Column renamed successfully')
+
+    def deleteTable(self, tableName: str) -> None:
+        """
+        Deletes a table from every shard
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to delete
+        """
+        queryString: str = f'DROP TABLE IF EXISTS {tableName}'
+        self._alterEveryShard(queryString, 'Table deleted successfully')
+
+    #############################
+    # Record based CRUD functions
+    #############################
+    def createRecord(self, tableName: str, tableCols: tuple[str], record: tuple[typing.Any], ignoreDuplicates: bool = True) -> None:
+        """
+        Creates a singular record in the shard its key belongs to
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to add a record to
+        tableCols: tuple[str]
+            The columns to add values to. Must include keyName
+        record: tuple[Any]
+            The values of the record to add. Must line up with the values in tableCols
+        ignoreDuplicates: bool (optional)
+            Defines what to do if duplicates are found (default is True):
+                True: Don't add record when the key is already in the table
+                False: Update the record if the key is already in the table
+        """
+        self.createRecords(tableName, tableCols, (record,), ignoreDuplicates, 'Record added successfully')
+
+    def createRecords(self,
+                      tableName: str,
+                      tableCols: tuple[str],
+                      records: typing.Iterable[tuple[typing.Any]],
+                      ignoreDuplicates: bool = True,
+                      message: str = 'Records added successfully') -> None:
+        """
+        Creates multiple records, loading every shard's share in parallel. The records are
+        committed on every shard or none of them, so a failed load can be run again as is
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to add records to
+        tableCols: tuple[str]
+            The columns to add values to. Must include keyName
+        records: Iterable[tuple[Any]]
+            The values of the records to add. Must line up with the values in tableCols
+        ignoreDuplicates: bool (optional)
+            Defines what to do if duplicates are found (default is True):
+                True: Don't add record when the key is already in the table
+                False: Update the record if the key is already in the table
+        message: str (optional)
+            Message to display once every shard is loaded (default is 'Records added successfully')
+        """
+        keyColumn: int = tableCols.index(self.keyName)
+        partitions: dict[int, list[tuple]] = {}
+        for record in records:
+            partitions.setdefault(self.shardFor(record[keyColumn]), []).append(record)
+        queryString: str = (f'INSERT OR {"IGNORE" if ignoreDuplicates else "REPLACE"} INTO {tableName} ({", ".join(tableCols)}) '
+                            f'VALUES ({", ".join("?" * len(tableCols))})')
+
+        def _insert(shardIndex: int) -> int:
+            with bidDatabase.recursiveTriggers(self.shards[shardIndex].cursor, not ignoreDuplicates):
+                return self.shards[shardIndex].cursor.executemany(queryString, partitions[shardIndex]).rowcount
+
+        self._changeShards(_insert, message, partitions)
+
+    def readRecords(self, tableName: str) -> None:
+        """
+        Reads and displays all the records in a specific table, in key order across shards
+
+        Parameters
+        ----------
+        tableName: str
+            The table whose records will be displayed
+        """
+        # Prefix each record with its key so the sorted shard results can be merged without knowing the key's position
+        queryString: str = f'SELECT {self.keyName}, * FROM {tableName} ORDER BY {self.keyName}'
+        results = self._fanOut(lambda shardIndex: self._read(shardIndex, queryString))
+        if results is None:
+            return
+        print('Records found')
+        for record in heapq.merge(*results, key=lambda record: record[0]):
+            print(record[1:])
+
+    def readRecord(self, tableName: str, keyName: str, id: typing.Any) -> tuple | None:
+        """
+        Reads and displays a singular record. Only the owning shard is searched when
+        keyName is the partitioning column. Like BidDatabase.readRecord, a key that isn't
+        found raises IndexError
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to search
+        keyName: str
+            The name of the column containing the keys
+        id: Any
+            The key to find and display
+
+        Returns
+        -------
+        tuple | None
+            The record found, or None if a shard that may hold it failed
+        """
+        queryString: str = f'SELECT * FROM {tableName} WHERE {keyName} = ?'
+        shardIndexes: list[int] | None = [self.shardFor(id)] if keyName == self.keyName else None
+        results = self._fanOut(lambda shardIndex: self._read(shardIndex, queryString, (id,)), shardIndexes)
+        if results is None:
+            # Not knowing whether the failed shard held the key, don't report it as missing
+            print(f'    Encounted while reading {keyName} {id} from: {tableName}')
+            return None
+        records: list[tuple] = [record for shardRecords in results for record in shardRecords]
+        print('Record found')
+        print(records[0])
+        return records[0]
+
+    def readRange(self, tableName: str, keyName: str, low: typing.Any, high: typing.Any) -> list[tuple]:
+        """
+        Reads the records whose keys fall within a range, in key order across shards.
+        With range partitioning only the overlapping shards are searched
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to search
+        keyName: str
+            The name of the column containing the keys
+        low: Any
+            The smallest key to return
+        high: Any
+            The largest key to return
+
+        Returns
+        -------
+        list[tuple]
+            The records found
+        """
+        queryString: str = f'SELECT {keyName}, * FROM {tableName} WHERE {keyName} BETWEEN ? AND ? ORDER BY {keyName}'
+        shardIndexes: list[int] | None = self._shardsForRange(low, high) if keyName == self.keyName else None
+        results = self._fanOut(lambda shardIndex: self._read(shardIndex, queryString, (low, high)), shardIndexes)
+        if results is None:
+            return []
+        return [record[1:] for record in heapq.merge(*results, key=lambda record: record[0])]
+
+    def updateRecord(self, tableName: str, keyName: str, id: typing.Any, updates: dict[str, typing.Any]) -> None:
+        """
+        Update a specific record
+
+        Parameters
+        ----------
+        tableName:
+            The name of the table that contains the record to update
+        keyName: str
+            The name of the column containing the keys
+        id: Any
+            The key to find and update
+        updates: dict[str, Any]
+            The updated values. Must be a dictionary where the keys are the column names
+            and the values are the respective updates. The partitioning column can't be
+            changed since that would move the record to another shard
+        """
+        if self.keyName in updates:
+            raise ValueError(f'Cannot update the partitioning column {self.keyName}')
+        queryString: str = f'UPDATE {tableName} SET {", ".join(f"{colName} = ?" for colName in updates)} WHERE {keyName} = ?'
+        parameters: tuple = tuple(updates.values()) + (id,)
+        shardIndexes: list[int] | None = [self.shardFor(id)] if keyName == self.keyName else None
+        self._changeShards(lambda shardIndex: self.shards[shardIndex].cursor.execute(queryString, parameters), 'Record updated', shardIndexes)
+
+    def deleteRecord(self, tableName: str, keyName: str, id: typing.Any) -> None:
+        """
+        Deletes a record from a table
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table that contains the record to delete
+        keyName: str
+            The name of the column containing the keys
+        id: Any
+            The key to find and delete
+        """
+        queryString: str = f'DELETE FROM {tableName} WHERE {keyName} = ?'
+        shardIndexes: list[int] | None = [self.shardFor(id)] if keyName == self.keyName else None
+        self._changeShards(lambda shardIndex: self.shards[shardIndex].cursor.execute(queryString, (id,)), 'Record deleted', shardIndexes)
+
+    ############################
+    # Aggregation functions
+    ############################
+    def aggregate(self,
+                  tableName: str,
+                  groupBy: tuple[str],
+                  metrics: dict[str, tuple[str, str]],
+                  where: str | None = None,
+                  parameters: tuple[typing.Any] = ()) -> list[tuple]:
+        """
+        Aggregates every shard in parallel and combines the partial results. Takes the
+        same arguments and returns the same rows as BidDatabase.aggregate
+
+        Parameters
+        ----------
+        tableName: str
+            The name of the table to aggregate
+        groupBy: tuple[str]
+            The columns to group by. An empty tuple aggregates the whole table into one row
+        metrics: dict[str, tuple[str, str]]
+            The aggregates to compute, as (function, column) pairs keyed by result name
+        where: str | None (optional)
+            Condition applied before grouping, using '?' placeholders for any values (default is None)
+        parameters: tuple[Any] (optional)
+            Values bound to the '?' placeholders in where (default is ())
+
+        Returns
+        -------
+        list[tuple]
+            One tuple per group holding the groupBy values followed by the metrics in order,
+            sorted by the groupBy columns
+        """
+        # AVG can't be combined from shard averages, so each shard returns a total and a count instead
+        partialMetrics: dict[str, tuple[str, str]] = {}
+        for metricName, (function, colName) in metrics.items():
+            function = function.upper()
+            if function not in bidDatabase.AGGREGATE_FUNCTIONS:
+                raise ValueError(f'Unsupported aggregate function: {function}')
+            if function == 'AVG':
+                partialMetrics[f'{metricName}Total'] = ('TOTAL', colName)
+                partialMetrics[f'{metricName}Count'] = ('COUNT', colName)
+            else:
+                partialMetrics[metricName] = (function, colName)
+        results = self._fanOut(lambda shardIndex: self.shards[shardIndex].aggregate(tableName, groupBy, partialMetrics, where, parameters))
+        if results is None or None in results:
+            return []
+        groups: dict[tuple, dict[str, typing.Any]] = {}
+        for row in (row for shardRows in results for row in shardRows):
+            partials: dict[str, typing.Any] = groups.setdefault(row[:len(groupBy)], {})
+            for metricName, value in zip(partialMetrics, row[len(groupBy):]):
+                partials.setdefault(metricName, []).append(value)
+        combined: list[tuple] = []
+        for groupKey, partials in groups.items():
+            values: list[typing.Any] = []
+            for metricName, (function, _) in metrics.items():
+                function = function.upper()
+                if function == 'AVG':
+                    count: int = sum(partials[f'{metricName}Count'])
+                    values.append(sum(partials[f'{metricName}Total']) / count if count else None)
+                    continue
+                # SUM, MIN and MAX are NULL on a shard with no matching rows
+                shardValues: list[typing.Any] = [value for value in partials[metricName] if value is not None]
+                if function in ('COUNT', 'TOTAL'):
+                    values.append(sum(shardValues))
+                elif not shardValues:
+                    values.append(None)
+                else:
+                    values.append({'SUM': sum, 'MIN': min, 'MAX': max}[function](shardValues))
+            combined.append(groupKey + tuple(values))
+        # SQLite sorts NULL groups first
+        return sorted(combined, key=lambda row: tuple((value is not None, value) for value in row[:len(groupBy)]))
@@ -12,6 +12,12 @@ import os
 import io
 import sys
 import sqlite3
+import threading
+import time
+import csv
+import gzip
+import json
+import tempfile
 
 class TestBidDatabase(unittest.TestCase):
     databaseName: str = 'test_bidDatabase.sqlite'
@@ -26,15 +32,14 @@ class TestBidDatabase(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         
-        # Remove test database from prior testing to start fresh
-        if os.path.exists(cls.databaseName):
-            os.remove(cls.databaseName)
+        # Keep the test database out of the source directory
+        cls.scratchDirectory = tempfile.TemporaryDirectory()
 
         # Redirect output for database creation
         sys.stdout = cls.databaseCreationMessage
         
         #create fresh database for testing
-        cls.testDatabase = bidDatabase.BidDatabase(cls.databaseName)
+        cls.testDatabase = bidDatabase.BidDatabase(os.path.join(cls.scratchDirectory.name, cls.databaseName))
         cls.cursor = cls.testDatabase.connection.cursor()
         
     def setUp(self):
@@ -46,6 +51,8 @@ class TestBidDatabase(unittest.TestCase):
     def tearDownClass(cls):
         # Redirect output to default
         sys.stdout = sys.__stdout__
+        cls.testDatabase.close()
+        cls.scratchDirectory.cleanup()
     
     # Test database creation
     def test_create_database(self):
@@ -129,8 +136,8 @@ class TestBidDatabase(unittest.TestCase):
         
     # Test multiple record creation with duplicates found
     def test_create_records_duplicates(self):
-        self.testDatabase.createRecords(self.tableName, ('id', 'col1', 'col2', 'col3'), ((3, '3000', 3, 'test3.3'),(4, 'test4.1', 4, 'test4.3')), True)
-        self.testDatabase.createRecords(self.tableName, ('id', 'col1', 'col2', 'col3'), ((3, 'test3.1', 3000, 'test3.3'),(5, 'test5.1', 5, 'test5.3')), False)
+        self.assertEqual(self.testDatabase.createRecords(self.tableName, ('id', 'col1', 'col2', 'col3'), ((3, '3000', 3, 'test3.3'),(4, 'test4.1', 4, 'test4.3')), True), 1)
+        self.assertEqual(self.testDatabase.createRecords(self.tableName, ('id', 'col1', 'col2', 'col3'), ((3, 'test3.1', 3000, 'test3.3'),(5, 'test5.1', 5, 'test5.3')), False), 2)
         self.assertEqual(self.expectedOutput.getvalue().strip(), 'Records added successfully\nRecords added successfully')
         
     # Test reading all records
@@ -155,6 +162,514 @@ class TestBidDatabase(unittest.TestCase):
         self.testDatabase.readRecords(self.tableName)
         self.assertEqual(self.expectedOutput.getvalue().strip(), f"Record deleted\nRecords found\n(1, 'test1.1', 1000, 'test1.3')\n(2, 'test2.1', 2, 'test2.3')\n(3, 'test3.1', 3000, 'test3.3')\n(5, 'test5.1', 5, 'test5.3')")
 
+class BidDatabaseTestCase(unittest.TestCase):
+    """
+    Shared setup for the tests on a bids table. Each test captures output in expectedOutput and
+    gets a fresh testDatabase, with any files kept in a temporary directory
+    """
+    databaseName: str = ':memory:'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    records: tuple[tuple] = ()
+    compact: bool = False
+    
+    def setUp(self):
+        self.expectedOutput = io.StringIO()
+        sys.stdout = self.expectedOutput
+        self.scratchDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.scratchDirectory.cleanup)
+        if self.databaseName != ':memory:':
+            self.databaseName = self.scratchFile(self.databaseName)
+        self.testDatabase = self.createDatabase()
+        self.addCleanup(self.testDatabase.close)
+        
+    def tearDown(self):
+        sys.stdout = sys.__stdout__
+        
+    def scratchFile(self, fileName: str) -> str:
+        return os.path.join(self.scratchDirectory.name, fileName)
+        
+    def createDatabase(self) -> bidDatabase.BidDatabase:
+        testDatabase = bidDatabase.BidDatabase(self.databaseName)
+        if self.compact:
+            testDatabase.createCompactTable('bids')
+        else:
+            testDatabase.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                              'auctionTitle': 'TEXT NOT NULL',
+                                              'fund': 'TEXT NOT NULL',
+                                              'winningBid': 'FLOAT NOT NULL'})
+        if self.records:
+            testDatabase.createRecords('bids', self.tableCols, self.records)
+        return testDatabase
+
+class TestBidDatabaseIndexes(BidDatabaseTestCase):
+        
+    # Test that a lookup by fund is a table scan until an index exists
+    def test_create_index(self):
+        query: str = 'SELECT winningBid FROM bids WHERE fund = ?'
+        self.assertTrue(self.testDatabase.explain(query, ('General Fund',))[0].startswith('SCAN bids'))
+        self.testDatabase.createIndex('idx_bids_fund', 'bids', ('fund',), coveringCols=('winningBid',))
+        self.assertIn('Index created successfully', self.expectedOutput.getvalue())
+        self.assertIn('USING COVERING INDEX idx_bids_fund', self.testDatabase.explain(query, ('General Fund',))[0])
+        
+    # Test that a partial index is only used by queries matching its condition
+    def test_create_partial_index(self):
+        self.testDatabase.createIndex('idx_bids_bigWins', 'bids', ('winningBid',), where='winningBid >= 1000')
+        self.assertIn('idx_bids_bigWins', self.testDatabase.explain('SELECT * FROM bids WHERE winningBid >= 1000 AND winningBid < 2000')[0])
+        self.assertNotIn('idx_bids_bigWins', self.testDatabase.explain('SELECT * FROM bids WHERE winningBid < 10')[0])
+        
+    # Test deleting an index
+    def test_drop_index(self):
+        self.testDatabase.createIndex('idx_bids_title', 'bids', ('auctionTitle',))
+        self.testDatabase.dropIndex('idx_bids_title')
+        self.assertIn('Index deleted successfully', self.expectedOutput.getvalue())
+        self.assertTrue(self.testDatabase.explain('SELECT * FROM bids WHERE auctionTitle = ?', ('Table',))[0].startswith('SCAN bids'))
+
+class TestBidDatabaseAggregate(BidDatabaseTestCase):
+    records: tuple[tuple] = ((1, 'Table', 'General Fund', 6.0),
+                             (2, 'Dell Laptop', 'General Fund', 118.5),
+                             (3, 'Truck', 'Enterprise', 2000.0),
+                             (4, 'Chair', 'Enterprise', 4.0))
+        
+    # Test totals and counts per fund
+    def test_aggregate_by_fund(self):
+        results = self.testDatabase.aggregate('bids', ('fund',), {'total': ('SUM', 'winningBid'),
+                                                                  'bids': ('COUNT', '*'),
+                                                                  'largest': ('MAX', 'winningBid')})
+        self.assertEqual(results, [('Enterprise', 2004.0, 2, 2000.0), ('General Fund', 124.5, 2, 118.5)])
+        
+    # Test aggregating the whole table with a bound where condition
+    def test_aggregate_where(self):
+        results = self.testDatabase.aggregate('bids', (), {'bids': ('COUNT', '*')}, 'winningBid >= ?', (100,))
+        self.assertEqual(results, [(2,)])
+        
+    # Test that only whitelisted aggregate functions are accepted
+    def test_aggregate_invalid_function(self):
+        with self.assertRaises(ValueError):
+            self.testDatabase.aggregate('bids', ('fund',), {'x': ('LOWER', 'fund')})
+
+class TestBidDatabaseSearch(BidDatabaseTestCase):
+    records: tuple[tuple] = ((1, 'Table', 'General Fund', 6.0),
+                             (2, 'Dell Laptop', 'General Fund', 118.5))
+    
+    def createDatabase(self):
+        testDatabase = super().createDatabase()
+        testDatabase.createSearchIndex('bids', 'auctionID', 'auctionTitle')
+        return testDatabase
+        
+    # Test that records present before the index was created are searchable
+    def test_search_existing_records(self):
+        self.assertIn('Search index created successfully', self.expectedOutput.getvalue())
+        self.assertEqual(self.testDatabase.searchTitles('dell LAPTOP'), [(2, 'Dell Laptop', 'General Fund', 118.5)])
+        self.assertEqual(self.testDatabase.searchTitles('dell chair'), [])
+        
+    # Test that inserts, replaces, updates and deletes keep the index in sync
+    def test_search_stays_in_sync(self):
+        self.testDatabase.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                        ((3, 'Dell Monitor', 'Enterprise', 20.0),
+                                         (2, 'HP Laptop', 'General Fund', 90.0)), False)
+        self.assertEqual([record[0] for record in self.testDatabase.searchTitles('dell')], [3])
+        # Recursive triggers are only on for the replace itself
+        self.assertEqual(self.testDatabase.cursor.execute('PRAGMA recursive_triggers').fetchone(), (0,))
+        self.testDatabase.updateRecord('bids', 'auctionID', 1, {'auctionTitle': 'Laptop Table'})
+        self.assertEqual(sorted(record[0] for record in self.testDatabase.searchTitles('laptop')), [1, 2])
+        self.testDatabase.deleteRecord('bids', 'auctionID', 2)
+        self.assertEqual([record[0] for record in self.testDatabase.searchTitles('laptop')], [1])
+        
+    # Test that FTS5 query syntax in user input is treated as plain words
+    def test_search_special_characters(self):
+        self.assertEqual(self.testDatabase.searchTitles('"dell" -laptop OR'), [])
+        self.assertEqual(self.testDatabase.searchTitles('   '), [])
+
+class TestBidDatabaseMerge(BidDatabaseTestCase):
+    records: tuple[tuple] = ((1, 'Table', 'General Fund', 6.0),
+                             (2, 'Dell Laptop', 'General Fund', 118.5))
+        
+    # Test that new, changed and identical records are counted and merged
+    def test_merge_records(self):
+        counts = self.testDatabase.mergeRecords('bids', 'auctionID', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                                [(1, 'Table', 'General Fund', 6.0),
+                                                 (2, 'Dell Laptop', 'General Fund', 99.0),
+                                                 (3, 'Chair', 'Enterprise', 4.0)])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'unchanged': 1})
+        self.assertIn('Records merged: 1 inserted, 1 updated, 1 unchanged', self.expectedOutput.getvalue())
+        self.testDatabase.readRecords('bids')
+        self.assertTrue(self.expectedOutput.getvalue().strip().endswith(
+            "(1, 'Table', 'General Fund', 6.0)\n(2, 'Dell Laptop', 'General Fund', 99.0)\n(3, 'Chair', 'Enterprise', 4.0)"))
+        
+    # Test that unchanged records are not rewritten and keep their rowid in place
+    def test_merge_records_unchanged_untouched(self):
+        self.testDatabase.connection.execute('CREATE TABLE changes (auctionID INTEGER)')
+        self.testDatabase.connection.execute('CREATE TRIGGER logUpdates AFTER UPDATE ON bids BEGIN INSERT INTO changes VALUES (new.auctionID); END')
+        self.testDatabase.connection.execute('CREATE TRIGGER logDeletes AFTER DELETE ON bids BEGIN INSERT INTO changes VALUES (-old.auctionID); END')
+        self.testDatabase.mergeRecords('bids', 'auctionID', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                       [(1, 'Table', 'General Fund', 6.0), (2, 'Dell Laptop', 'Enterprise', 118.5)])
+        self.assertEqual(self.testDatabase.connection.execute('SELECT * FROM changes').fetchall(), [(2,)])
+        
+    # Test that the last record for a repeated key wins
+    def test_merge_records_repeated_key(self):
+        counts = self.testDatabase.mergeRecords('bids', 'auctionID', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                                [(5, 'Desk', 'Enterprise', 1.0), (5, 'Desk', 'Enterprise', 2.0)])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 0, 'unchanged': 0})
+        self.assertEqual(self.testDatabase.connection.execute('SELECT winningBid FROM bids WHERE auctionID = 5').fetchone(), (2.0,))
+
+class TestBidDatabaseTracing(BidDatabaseTestCase):
+    slowQueryLog: str = 'test_slowQueries.log'
+    
+    def setUp(self):
+        super().setUp()
+        self.slowQueryLog = self.scratchFile(self.slowQueryLog)
+        
+    # Test that repeated queries with different literals share one statistics entry
+    def test_tracing_stats(self):
+        self.testDatabase.enableTracing(slowQueryLog=None)
+        self.testDatabase.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                        ((1, 'Table', 'General Fund', 6.0), (2, 'Chair', 'Enterprise', 4.0)))
+        self.testDatabase.readRecord('bids', 'auctionID', 1)
+        self.testDatabase.readRecord('bids', 'auctionID', 2)
+        statements = self.testDatabase.getQueryStats()['statements']
+        self.assertEqual(statements['SELECT * FROM bids WHERE auctionID = ?']['calls'], 2)
+        self.assertEqual(statements['SELECT * FROM bids WHERE auctionID = ?']['rows'], 2)
+        self.assertEqual(sum(statements['SELECT * FROM bids WHERE auctionID = ?']['histogram'].values()), 2)
+        self.assertEqual(statements['INSERT OR IGNORE INTO bids (auctionID, auctionTitle, fund, winningBid) VALUES (?, ?, ?, ?)']['rows'], 2)
+        
+    # Test that queries over the threshold are written to the slow query log
+    def test_slow_query_log(self):
+        self.testDatabase.enableTracing(slowQueryMs=0, slowQueryLog=self.slowQueryLog)
+        self.testDatabase.aggregate('bids', (), {'bids': ('COUNT', '*')}, 'winningBid > ?', (5,))
+        self.assertEqual(self.testDatabase.getQueryStats()['slowQueries'], 1)
+        with open(self.slowQueryLog) as logFile:
+            self.assertIn('WHERE winningBid > 5', logFile.read())
+            
+    # Test that a bulk insert logs a bounded number of the statements it ran, and none are kept after it
+    def test_slow_query_log_bulk(self):
+        self.testDatabase.enableTracing(slowQueryMs=0, slowQueryLog=self.slowQueryLog)
+        self.testDatabase.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                        [(auctionID, 'Table', 'General Fund', 6.0) for auctionID in range(5000)])
+        with open(self.slowQueryLog) as logFile:
+            logged = logFile.read()
+        self.assertLessEqual(logged.count('INSERT OR IGNORE INTO bids'), bidDatabase.MAX_TRACED_STATEMENTS)
+        self.assertRegex(logged, r'\.\.\. \d+ more statements')
+        self.assertEqual(self.testDatabase._tracedStatements, [])
+        self.testDatabase.cursor.executemany('UPDATE bids SET winningBid = ? WHERE auctionID = ?', [(1.0, auctionID) for auctionID in range(5000)])
+        self.assertLessEqual(len(self.testDatabase._tracedStatements), bidDatabase.MAX_TRACED_STATEMENTS)
+            
+    # Test that every statement of the batch write functions is recorded, with chunked IN lists sharing an entry
+    def test_tracing_batch_writes(self):
+        self.testDatabase.enableTracing(slowQueryLog=None)
+        tableCols = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+        self.testDatabase.mergeRecords('bids', 'auctionID', tableCols, [(auctionID, 'Table', 'General Fund', 6.0) for auctionID in range(1000)])
+        self.testDatabase.updateRecords('bids', 'auctionID', ('auctionID', 'winningBid'), [(1, 7.0), (2, 8.0)])
+        self.testDatabase.deleteRecords('bids', 'auctionID', range(950))
+        self.testDatabase.applyChanges('bids', 'auctionID', tableCols, updates=[(990, 'Chair', 'Enterprise', 1.0)], deletes=[999])
+        statements = self.testDatabase.getQueryStats()['statements']
+        self.assertEqual(statements['INSERT OR REPLACE INTO mergeStaging (auctionID, auctionTitle, fund, winningBid) VALUES (?, ?, ?, ?)']['rows'], 1001)
+        self.assertEqual(statements['UPDATE bids SET winningBid = ? WHERE auctionID = ?']['rows'], 2)
+        self.assertEqual(statements['DELETE FROM bids WHERE auctionID IN (?, ...)']['calls'], 3)
+        self.assertEqual(statements['DELETE FROM bids WHERE auctionID IN (?, ...)']['rows'], 951)
+        self.assertIn('DROP TABLE temp.mergeStaging', statements)
+        
+    # Test that nothing is recorded once tracing is disabled
+    def test_disable_tracing(self):
+        self.testDatabase.enableTracing(slowQueryLog=None)
+        self.testDatabase.disableTracing()
+        self.testDatabase.readRecords('bids')
+        self.assertEqual(self.testDatabase.getQueryStats(), {'statements': {}, 'slowQueries': 0})
+
+class TestBidDatabaseCache(BidDatabaseTestCase):
+    databaseName: str = 'test_bidDatabaseCache.sqlite'
+    records: tuple[tuple] = ((1, 'Table', 'General Fund', 6.0),
+                             (2, 'Dell Laptop', 'General Fund', 118.5),
+                             (3, 'Chair', 'Enterprise', 4.0))
+    
+    def createDatabase(self):
+        testDatabase = super().createDatabase()
+        testDatabase.enableCache(maxEntries=2)
+        return testDatabase
+        
+    # Test hits, misses and least recently used eviction
+    def test_cache_hits_and_evictions(self):
+        self.testDatabase.readRecord('bids', 'auctionID', 1)
+        self.testDatabase.readRecord('bids', 'auctionID', 2)
+        self.assertEqual(self.testDatabase.readRecord('bids', 'auctionID', 1), (1, 'Table', 'General Fund', 6.0))
+        self.testDatabase.readRecord('bids', 'auctionID', 3)
+        self.assertEqual(self.testDatabase.getCacheStats(), {'hits': 1, 'misses': 3, 'evictions': 1, 'invalidations': 0, 'size': 2})
+        self.assertIn(('bids', 'auctionID', 1), self.testDatabase.cache)
+        self.assertNotIn(('bids', 'auctionID', 2), self.testDatabase.cache)
+        
+    # Test that writes through this connection only invalidate the records they touch
+    def test_cache_invalidation(self):
+        self.testDatabase.readRecord('bids', 'auctionID', 1)
+        self.testDatabase.readRecord('bids', 'auctionID', 2)
+        self.testDatabase.updateRecord('bids', 'auctionID', 1, {'winningBid': 10.0})
+        self.assertEqual(list(self.testDatabase.cache), [('bids', 'auctionID', 2)])
+        self.assertEqual(self.testDatabase.readRecord('bids', 'auctionID', 1), (1, 'Table', 'General Fund', 10.0))
+        self.testDatabase.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'), ((2, 'HP Laptop', 'General Fund', 1.0),), False)
+        self.assertEqual(self.testDatabase.readRecord('bids', 'auctionID', 2), (2, 'HP Laptop', 'General Fund', 1.0))
+        self.testDatabase.deleteRecord('bids', 'auctionID', 2)
+        self.assertNotIn(('bids', 'auctionID', 2), self.testDatabase.cache)
+        
+    # Test that a commit from another connection clears the cache
+    def test_cache_other_connection(self):
+        self.testDatabase.readRecord('bids', 'auctionID', 3)
+        otherConnection = sqlite3.connect(self.databaseName)
+        otherConnection.execute('UPDATE bids SET winningBid = 40.0 WHERE auctionID = 3')
+        otherConnection.commit()
+        otherConnection.close()
+        self.assertEqual(self.testDatabase.readRecord('bids', 'auctionID', 3), (3, 'Chair', 'Enterprise', 40.0))
+        self.assertEqual(self.testDatabase.getCacheStats()['hits'], 0)
+
+class TestBidDatabaseBatch(BidDatabaseTestCase):
+    records: list[tuple] = [(auctionID, f'Title{auctionID}', 'General Fund', float(auctionID)) for auctionID in range(1, 2001)]
+        
+    # Test deleting more keys than fit in one IN list, including missing keys
+    def test_delete_records(self):
+        self.assertEqual(self.testDatabase.deleteRecords('bids', 'auctionID', range(1, 1501)), 1500)
+        self.assertEqual(self.testDatabase.deleteRecords('bids', 'auctionID', [1, 2000, 5000]), 1)
+        self.assertIn('1500 records deleted\n1 records deleted', self.expectedOutput.getvalue())
+        self.assertEqual(self.testDatabase.aggregate('bids', (), {'bids': ('COUNT', '*')}), [(499,)])
+        
+    # Test updating many records with the key in any column position
+    def test_update_records(self):
+        updated = self.testDatabase.updateRecords('bids', 'auctionID', ('winningBid', 'auctionID'),
+                                                  ((0.0, auctionID) for auctionID in range(1, 1001)))
+        self.assertEqual(updated, 1000)
+        self.assertEqual(self.testDatabase.aggregate('bids', (), {'zero': ('COUNT', '*')}, 'winningBid = 0'), [(1000,)])
+        
+    # Test that a failed batch is rolled back as a whole
+    def test_update_records_rollback(self):
+        updated = self.testDatabase.updateRecords('bids', 'auctionID', ('auctionID', 'fund'), [(1, 'Enterprise'), (2, None)])
+        self.assertIsNone(updated)
+        self.assertEqual(self.testDatabase.aggregate('bids', (), {'bids': ('COUNT', '*')}, 'fund = ?', ('Enterprise',)), [(0,)])
+
+    # Test that a change set is applied in one transaction, and rolled back as a whole if any part fails
+    def test_apply_changes(self):
+        tableCols = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+        # An insert whose key is already there updates the row in place
+        counts = self.testDatabase.applyChanges('bids', 'auctionID', tableCols, inserts=[(3000, 'New', 'Enterprise', 1.0), (1500, 'Moved', 'Enterprise', 2.0)],
+                                                updates=[(5, 'Title5', 'Enterprise', 50.0)], deletes=range(1, 1001))
+        self.assertEqual(counts, {'inserted': 1, 'updated': 2, 'deleted': 1000})
+        self.assertIn('Changes applied: 1 inserted, 2 updated, 1000 deleted', self.expectedOutput.getvalue())
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT * FROM bids WHERE auctionID = 1500').fetchone(), (1500, 'Moved', 'Enterprise', 2.0))
+        self.assertEqual(self.testDatabase.aggregate('bids', (), {'bids': ('COUNT', '*')}), [(1001,)])
+        self.assertIsNone(self.testDatabase.applyChanges('bids', 'auctionID', tableCols, inserts=[(3001, 'New', 'Enterprise', 1.0)],
+                                                         updates=[(1001, None, 'Enterprise', 1.0)]))
+        self.assertEqual(self.testDatabase.aggregate('bids', (), {'bids': ('COUNT', '*')}), [(1001,)])
+        
+class TestBidDatabaseCompact(BidDatabaseTestCase):
+    compact: bool = True
+    records: tuple[tuple] = ((2, 'Dell Laptop', 'General Fund', 118.5),
+                             (1, 'Table', 'Enterprise', 6.0))
+        
+    # Test that the view returns the same records as the plain schema
+    def test_compact_read(self):
+        self.assertIn('Compact table created successfully', self.expectedOutput.getvalue())
+        self.testDatabase.readRecords('bids')
+        self.assertTrue(self.expectedOutput.getvalue().strip().endswith("Records found\n(1, 'Table', 'Enterprise', 6.0)\n(2, 'Dell Laptop', 'General Fund', 118.5)"))
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT * FROM bidsCompact WHERE auctionID = 2').fetchone(), (2, 'Dell Laptop', 1, 11850))
+        
+    # Test that replacing, updating and deleting through the view keep fund IDs stable
+    def test_compact_write_through_view(self):
+        self.testDatabase.createRecords('bids', self.tableCols, ((2, 'HP Laptop', 'Enterprise', 1.01),), False)
+        self.testDatabase.updateRecord('bids', 'auctionID', 1, {'fund': 'Special Revenue'})
+        self.testDatabase.deleteRecord('bids', 'auctionID', 2)
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT * FROM bidsFunds').fetchall(),
+                         [(1, 'General Fund'), (2, 'Enterprise'), (3, 'Special Revenue')])
+        self.assertEqual(self.testDatabase.readRecord('bids', 'auctionID', 1), (1, 'Table', 'Special Revenue', 6.0))
+        
+    # Test that scans skip the fund lookup when they don't read fund, and the view is sorted without being told to
+    def test_compact_scan_plan(self):
+        plan = self.testDatabase.cursor.execute('EXPLAIN QUERY PLAN SELECT auctionID, winningBid FROM bids').fetchall()
+        self.assertEqual([row[3] for row in plan], ['SCAN bidsCompact'])
+        plan = self.testDatabase.cursor.execute('EXPLAIN QUERY PLAN SELECT * FROM bids ORDER BY auctionID').fetchall()
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', [row[3] for row in plan])
+        
+    # Test that batch updates and deletes through the view are applied to the storage table and counted
+    def test_compact_batch_update_delete(self):
+        self.assertEqual(self.testDatabase.updateRecords('bids', 'auctionID', ('auctionID', 'fund', 'winningBid'),
+                                                         [(1, 'Special Revenue', 7.25), (2, 'General Fund', 120.0), (3, 'Enterprise', 1.0)]), 2)
+        self.assertEqual(self.testDatabase.readRecord('bids', 'auctionID', 1), (1, 'Table', 'Special Revenue', 7.25))
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT winningBidCents FROM bidsCompact WHERE auctionID = 2').fetchone(), (12000,))
+        self.assertEqual(self.testDatabase.deleteRecords('bids', 'auctionID', [2, 3]), 1)
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT auctionID FROM bidsCompact').fetchall(), [(1,)])
+        
+    # Test that merging and applying changes through the view upsert the storage table
+    def test_compact_batch_merge(self):
+        counts = self.testDatabase.mergeRecords('bids', 'auctionID', self.tableCols, [(1, 'Table', 'Enterprise', 6.0),
+                                                                                      (2, 'Dell Laptop', 'Enterprise', 118.5),
+                                                                                      (3, 'Chair', 'Capital Projects', 4.1)])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'unchanged': 1})
+        self.assertEqual(self.testDatabase.readRecord('bids', 'auctionID', 3), (3, 'Chair', 'Capital Projects', 4.1))
+        counts = self.testDatabase.applyChanges('bids', 'auctionID', self.tableCols, inserts=[(4, 'Desk', 'Enterprise', 0.3)],
+                                                updates=[(3, 'Chair', 'Capital Projects', 4.5)], deletes=[1])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'deleted': 1})
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT * FROM bids').fetchall(),
+                         [(2, 'Dell Laptop', 'Enterprise', 118.5), (3, 'Chair', 'Capital Projects', 4.5), (4, 'Desk', 'Enterprise', 0.3)])
+        
+    # Test that encoded records reuse cached fund IDs and add new ones
+    def test_encode_compact_records(self):
+        self.testDatabase.createCompactTable('bids')
+        encoded = self.testDatabase.encodeCompactRecords('bids', [(3, 'Chair', 'Enterprise', 4.1), (4, 'Desk', 'Capital Projects', 0.3)])
+        self.assertEqual(encoded, [(3, 'Chair', 2, 410), (4, 'Desk', 3, 30)])
+        self.assertEqual(self.testDatabase.fundIds['bids'], {'General Fund': 1, 'Enterprise': 2, 'Capital Projects': 3})
+
+class TestBidDatabaseInMemory(BidDatabaseTestCase):
+    databaseName: str = 'test_bidDatabaseMemory.sqlite'
+    records: tuple[tuple] = ((1, 'Table', 'General Fund', 6.0),)
+    
+    def createDatabase(self):
+        # Each test opens its own in memory database on the prepared file
+        diskDatabase = super().createDatabase()
+        diskDatabase.close()
+        return diskDatabase
+            
+    def readDisk(self):
+        with sqlite3.connect(self.databaseName) as connection:
+            return connection.execute('SELECT * FROM bids').fetchall()
+        
+    # Test that the file is restored into memory and only written back on flush
+    def test_restore_and_flush(self):
+        memoryDatabase = bidDatabase.BidDatabase(self.databaseName, inMemory=True, flushIntervalSeconds=None, flushEveryWrites=None)
+        self.assertEqual(memoryDatabase.readRecord('bids', 'auctionID', 1), (1, 'Table', 'General Fund', 6.0))
+        memoryDatabase.createRecord('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'), (2, 'Chair', 'Enterprise', 4.0))
+        self.assertEqual(len(self.readDisk()), 1)
+        self.assertTrue(memoryDatabase.flush(pagesPerStep=1))
+        self.assertFalse(memoryDatabase.flush())
+        self.assertEqual(len(self.readDisk()), 2)
+        memoryDatabase.deleteRecord('bids', 'auctionID', 1)
+        memoryDatabase.close()
+        self.assertEqual(self.readDisk(), [(2, 'Chair', 'Enterprise', 4.0)])
+        self.assertEqual(memoryDatabase.flushCount, 2)
+        
+    # Test that the background thread flushes once enough rows have changed
+    def test_flush_after_writes(self):
+        memoryDatabase = bidDatabase.BidDatabase(self.databaseName, inMemory=True, flushIntervalSeconds=None, flushEveryWrites=2)
+        self.addCleanup(memoryDatabase.close)
+        memoryDatabase.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                     ((2, 'Chair', 'Enterprise', 4.0), (3, 'Desk', 'Enterprise', 5.0)))
+        deadline: float = time.monotonic() + 5
+        while memoryDatabase.flushCount == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(self.readDisk()), 3)
+
+    # Test that a transaction left open puts off flushes instead of hanging, and close only writes what was committed
+    def test_flush_open_transaction(self):
+        memoryDatabase = bidDatabase.BidDatabase(self.databaseName, inMemory=True, flushIntervalSeconds=None, flushEveryWrites=1)
+        memoryDatabase.createRecord('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'), (2, 'Chair', 'Enterprise', 4.0))
+        memoryDatabase.cursor.execute("INSERT INTO bids VALUES (3, 'Desk', 'Enterprise', 5.0)")
+        self.assertTrue(memoryDatabase.connection.in_transaction)
+        finished = threading.Event()
+        def _flushAndClose():
+            self.assertFalse(memoryDatabase.flush())
+            memoryDatabase.close()
+            finished.set()
+        threading.Thread(target=_flushAndClose, daemon=True).start()
+        self.assertTrue(finished.wait(10))
+        self.assertEqual([record[0] for record in self.readDisk()], [1, 2])
+
+class TestBidDatabaseMaintenance(BidDatabaseTestCase):
+    databaseName: str = 'test_bidDatabaseMaintenance.sqlite'
+    
+    def createDatabase(self):
+        return bidDatabase.BidDatabase(self.databaseName)
+                
+    def waitForReports(self, count):
+        deadline: float = time.monotonic() + 5
+        while len(self.testDatabase.maintenanceReports) < count and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(self.testDatabase.maintenanceReports), count)
+        
+    # Test that maintenance runs after enough writes and gives deleted pages back
+    def test_maintenance_after_writes(self):
+        self.testDatabase.enableMaintenance(intervalSeconds=None, everyMutations=1000, vacuumPagesPerStep=10)
+        self.testDatabase.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                               'auctionTitle': 'TEXT NOT NULL',
+                                               'fund': 'TEXT NOT NULL',
+                                               'winningBid': 'FLOAT NOT NULL'})
+        self.testDatabase.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                                        ((auctionID, 'Table ' * 20, 'General Fund', 6.0) for auctionID in range(999)))
+        self.assertEqual(self.testDatabase.maintenanceReports, [])
+        self.testDatabase.deleteRecords('bids', 'auctionID', range(999))
+        self.waitForReports(1)
+        report = self.testDatabase.maintenanceReports[0]
+        self.assertGreater(report['pagesReclaimed'], 0)
+        self.assertEqual(report['pagesBefore'] - report['pagesAfter'], report['pagesReclaimed'])
+        self.assertEqual(self.testDatabase.connection.execute('PRAGMA freelist_count').fetchone()[0], 0)
+        
+    # Test that requestMaintenance runs it straight away and collects planner statistics
+    def test_request_maintenance(self):
+        self.testDatabase.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                               'fund': 'TEXT NOT NULL'})
+        self.testDatabase.createIndex('idx_bids_fund', 'bids', ('fund',))
+        self.testDatabase.createRecords('bids', ('auctionID', 'fund'), ((1, 'General Fund'), (2, 'Enterprise')))
+        self.testDatabase.enableMaintenance(intervalSeconds=None, everyMutations=None, rebuild=True)
+        self.assertEqual(self.testDatabase.connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.testDatabase.requestMaintenance()
+        self.waitForReports(1)
+        self.assertIn('Database rebuilt with VACUUM', self.expectedOutput.getvalue())
+        # The foreground connection keeps the auto_vacuum it read before the rebuild, so check the file itself
+        checkConnection = sqlite3.connect(self.databaseName)
+        self.assertEqual(checkConnection.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        checkConnection.close()
+        self.assertEqual(self.testDatabase.maintenanceReports[0]['pagesReclaimed'], 0)
+        self.assertTrue(self.testDatabase.connection.execute("SELECT * FROM sqlite_stat1 WHERE idx = 'idx_bids_fund'").fetchall())
+        self.testDatabase.disableMaintenance()
+        self.testDatabase.requestMaintenance()
+        self.assertEqual(len(self.testDatabase.maintenanceReports), 1)
+        self.assertEqual(self.testDatabase.connection.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+        
+    # Test that the rebuild is opt in, and a run with no writes since the last one commits nothing so the cache is kept
+    def test_maintenance_idle_run(self):
+        self.testDatabase.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                               'fund': 'TEXT NOT NULL'})
+        self.testDatabase.createRecords('bids', ('auctionID', 'fund'), ((1, 'General Fund'), (2, 'Enterprise')))
+        self.testDatabase.enableCache()
+        self.testDatabase.enableMaintenance(intervalSeconds=None, everyMutations=None)
+        self.assertIn('Incremental vacuum unavailable until the database is rebuilt with VACUUM', self.expectedOutput.getvalue())
+        self.testDatabase.requestMaintenance()
+        self.waitForReports(1)
+        self.assertTrue(self.testDatabase.maintenanceReports[0]['analyzed'])
+        self.testDatabase.readRecord('bids', 'auctionID', 1)
+        self.testDatabase.requestMaintenance()
+        self.waitForReports(2)
+        self.assertFalse(self.testDatabase.maintenanceReports[1]['analyzed'])
+        self.testDatabase.readRecord('bids', 'auctionID', 1)
+        self.assertEqual(self.testDatabase.getCacheStats()['hits'], 1)
+        self.assertNotIn('Database rebuilt with VACUUM', self.expectedOutput.getvalue())
+        self.assertEqual(self.testDatabase.connection.execute('PRAGMA auto_vacuum').fetchone()[0], 0)
+        
+    # Test that maintenance is refused for in memory databases, which only the foreground connection can reach
+    def test_maintenance_in_memory(self):
+        memoryDatabase = bidDatabase.BidDatabase(self.databaseName, inMemory=True)
+        memoryDatabase.enableMaintenance(intervalSeconds=None, everyMutations=1)
+        memoryDatabase.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL'})
+        memoryDatabase.createRecords('bids', ('auctionID',), ((1,), (2,)))
+        memoryDatabase.requestMaintenance()
+        memoryDatabase.close()
+        self.assertIn('Maintenance unavailable for in memory databases', self.expectedOutput.getvalue())
+        self.assertEqual(memoryDatabase.maintenanceReports, [])
+
+class TestBidDatabaseExport(BidDatabaseTestCase):
+    records: tuple[tuple] = ((2, 'Dell Laptop, 15"', 'General Fund', 118.5), (1, 'Table', 'Enterprise', 6.0))
+        
+    # Test exporting to CSV in key order with quoting
+    def test_export_csv(self):
+        exportName: str = self.scratchFile('test_export.csv')
+        self.assertEqual(self.testDatabase.exportCsv(exportName), 2)
+        with open(exportName, newline='') as exportFile:
+            self.assertEqual(list(csv.reader(exportFile)), [['auctionID', 'auctionTitle', 'fund', 'winningBid'],
+                                                             ['1', 'Table', 'Enterprise', '6.0'],
+                                                             ['2', 'Dell Laptop, 15"', 'General Fund', '118.5']])
+        self.assertIn('2 records exported', self.expectedOutput.getvalue())
+            
+    # Test exporting to compressed JSON Lines
+    def test_export_jsonl_compressed(self):
+        exportName: str = self.scratchFile('test_export.jsonl.gz')
+        self.assertEqual(self.testDatabase.exportJsonl(exportName), 2)
+        with gzip.open(exportName, 'rt') as exportFile:
+            self.assertEqual([json.loads(line) for line in exportFile],
+                             [{'auctionID': 1, 'auctionTitle': 'Table', 'fund': 'Enterprise', 'winningBid': 6.0},
+                              {'auctionID': 2, 'auctionTitle': 'Dell Laptop, 15"', 'fund': 'General Fund', 'winningBid': 118.5}])
+
 def bidDatabase_test_suite():
     return unittest.TestSuite(tests=[
         TestBidDatabase('test_create_database'),
@@ -170,7 +685,18 @@ def bidDatabase_test_suite():
         TestBidDatabase('test_read_record'),
         TestBidDatabase('test_update_record'),
         TestBidDatabase('test_delete_record'),
-        TestBidDatabase('test_delete_table')
+        TestBidDatabase('test_delete_table'),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseIndexes),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseAggregate),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseSearch),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseMerge),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseTracing),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseCache),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseBatch),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseCompact),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseInMemory),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseMaintenance),
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestBidDatabaseExport)
     ])        
         
 if __name__ == '__main__':
@@ -0,0 +1,99 @@
+#=======================================================================================
+# Name        : test_asyncBidDatabase.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Test of asyncBidDatabase module
+#=======================================================================================
+
+import unittest
+import asyncBidDatabase
+import asyncio
+import sys
+import io
+import os
+
+class TestAsyncBidDatabase(unittest.TestCase):
+    databaseName: str = 'test_bidDatabaseAsync.sqlite'
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    
+    def setUp(self):
+        self.removeDatabase()
+        self.expectedOutput = io.StringIO()
+        sys.stdout = self.expectedOutput
+        
+    def tearDown(self):
+        sys.stdout = sys.__stdout__
+        self.removeDatabase()
+        
+    def removeDatabase(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.databaseName + suffix):
+                os.remove(self.databaseName + suffix)
+                
+    async def createDatabase(self):
+        database = asyncBidDatabase.AsyncBidDatabase(self.databaseName, readerThreads=2)
+        await database.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                            'auctionTitle': 'TEXT NOT NULL',
+                                            'fund': 'TEXT NOT NULL',
+                                            'winningBid': 'FLOAT NOT NULL'})
+        return database
+    
+    # Test that concurrent single inserts are committed in fewer transactions than inserts
+    def test_coalesced_writes(self):
+        async def run():
+            async with await self.createDatabase() as database:
+                results = await asyncio.gather(*(database.createRecord('bids', self.tableCols, (auctionID, 'Table', 'General Fund', 6.0))
+                                                 for auctionID in range(200)))
+                self.assertEqual(results, [1] * 200)
+                self.assertEqual(database.writeCount, 201)
+                self.assertLess(database.transactionCount, 201)
+                self.assertEqual(await database.readRecord('bids', 'auctionID', 199), (199, 'Table', 'General Fund', 6.0))
+        asyncio.run(run())
+        
+    # Test that a failing write is rolled back without losing the writes committed with it
+    def test_failed_write(self):
+        async def run():
+            async with await self.createDatabase() as database:
+                results = await asyncio.gather(database.createRecord('bids', self.tableCols, (1, 'Table', 'General Fund', 6.0)),
+                                               database.updateRecord('bids', 'auctionID', 1, {'noSuchColumn': 1}),
+                                               database.updateRecord('bids', 'auctionID', 1, {'winningBid': 7.0}))
+                self.assertEqual(results, [1, None, 1])
+                self.assertEqual(await database.readRange('bids', 'auctionID', 0, 10), [(1, 'Table', 'General Fund', 7.0)])
+        asyncio.run(run())
+        self.assertIn('no such column: noSuchColumn', self.expectedOutput.getvalue())
+        
+    # Test that a write raising something other than a database error fails only that write, and the writer keeps going
+    def test_write_raising(self):
+        def brokenBids():
+            yield (1, 'Table', 'General Fund', 6.0)
+            raise ValueError('bad bid')
+            
+        async def run():
+            async with await self.createDatabase() as database:
+                with self.assertRaises(ValueError):
+                    await database.createRecords('bids', self.tableCols, brokenBids())
+                self.assertEqual(await database.createRecord('bids', self.tableCols, (2, 'Desk', 'General Fund', 8.0)), 1)
+                self.assertEqual(await database.readRange('bids', 'auctionID', 0, 10), [(2, 'Desk', 'General Fund', 8.0)])
+        asyncio.run(asyncio.wait_for(run(), 10))
+        self.assertIn('bad bid', self.expectedOutput.getvalue())
+        
+    # Test bulk loading from an async generator, streaming it back and aggregating it
+    def test_load_and_stream(self):
+        async def generateBids():
+            for auctionID in range(25):
+                yield (auctionID, f'Title{auctionID}', 'Enterprise' if auctionID % 2 else 'General Fund', 1.0)
+                
+        async def run():
+            async with await self.createDatabase() as database:
+                self.assertEqual(await database.loadRecords('bids', self.tableCols, generateBids(), batchRows=10), 25)
+                self.assertEqual([record[0] async for record in database.streamRecords(batchRows=10)], list(range(25)))
+                self.assertEqual(await database.aggregate('bids', ('fund',), {'bids': ('COUNT', '*')}),
+                                 [('Enterprise', 12), ('General Fund', 13)])
+                self.assertEqual(await database.deleteRecord('bids', 'auctionID', 3), 1)
+                self.assertIsNone(await database.readRecord('bids', 'auctionID', 3))
+        asyncio.run(run())
+        self.assertIn('25 records loaded', self.expectedOutput.getvalue())
+        
+if __name__ == '__main__':
+    unittest.main()
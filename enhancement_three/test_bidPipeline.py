@@ -0,0 +1,99 @@
+#=======================================================================================
+# Name        : test_bidPipeline.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Test of bidPipeline module
+#=======================================================================================
+
+import unittest
+import bidDatabase
+import bidPipeline
+import sys
+import io
+import os
+import tempfile
+import threading
+
+class TestBidPipeline(unittest.TestCase):
+    csvName: str = 'test_bidPipeline.csv'
+    
+    def setUp(self):
+        self.expectedOutput = io.StringIO()
+        sys.stdout = self.expectedOutput
+        self.scratch = tempfile.TemporaryDirectory()
+        self.databaseName = os.path.join(self.scratch.name, 'test_bidPipeline.sqlite')
+        with open(self.csvName, 'w', newline='') as csvFile:
+            csvFile.write('Auction Title,Auction ID,Department ,CloseDate ,Winning Bid,InventoryID,Fund\n')
+            for auctionID in range(1, 501):
+                csvFile.write(f'"Chair, {auctionID}",{auctionID},GENERAL SERVICES,12/1/2016,"$1,{auctionID:03d}.00 ","{auctionID},\n{auctionID + 1}",'
+                              f'{"Enterprise" if auctionID % 2 else "General Fund"}\n')
+        
+    def tearDown(self):
+        sys.stdout = sys.__stdout__
+        os.remove(self.csvName)
+        self.scratch.cleanup()
+        
+    def openDatabase(self, fileName):
+        database = bidDatabase.BidDatabase(fileName)
+        database.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                      'auctionTitle': 'TEXT NOT NULL',
+                                      'fund': 'TEXT NOT NULL',
+                                      'winningBid': 'FLOAT NOT NULL'})
+        return database
+        
+    # Test that small byte ranges split every row exactly once and arrive in file order
+    def test_ingest_parallel(self):
+        batches = []
+        writers = set()
+        def consume(batch):
+            writers.add(threading.current_thread().name)
+            batches.append(batch)
+        parsed = bidPipeline.ingestParallel(self.csvName, consume, workers=3, chunkBytes=1000, maxQueuedBatches=2)
+        self.assertEqual(parsed, 500)
+        self.assertEqual(writers, {'bidPipelineWriter'})
+        self.assertGreater(len(batches), 10)
+        records = [record for batch in batches for record in batch]
+        self.assertEqual([record[0] for record in records], list(range(1, 501)))
+        self.assertEqual(records[41], (42, 'Chair, 42', 'General Fund', 1042.0))
+        
+    # Test that an error in the writer stops the parsers and is raised
+    def test_ingest_parallel_consume_error(self):
+        def consume(batch):
+            raise RuntimeError('disk full')
+        with self.assertRaises(RuntimeError):
+            bidPipeline.ingestParallel(self.csvName, consume, workers=2, chunkBytes=1000, maxQueuedBatches=1)
+            
+    # Test loading the database with parser processes, the writer thread using its own connection
+    def test_load_bids_parallel(self):
+        database = self.openDatabase(self.databaseName)
+        bidPipeline.loadBidsParallel(self.csvName, database, workers=2, parallelMinBytes=0)
+        self.assertIn('500 records loaded', self.expectedOutput.getvalue())
+        self.assertEqual(database.aggregate('bids', ('fund',), {'bids': ('COUNT', '*')}), [('Enterprise', 250), ('General Fund', 250)])
+        database.close()
+        
+    # Test that loading a file again reports the records added rather than the records parsed
+    def test_load_bids_parallel_counts(self):
+        database = self.openDatabase(self.databaseName)
+        database.createRecords('bids', ('auctionID', 'auctionTitle', 'fund', 'winningBid'),
+                               ((auctionID, f'Chair, {auctionID}', 'Enterprise', 0.0) for auctionID in range(1, 101)))
+        bidPipeline.loadBidsParallel(self.csvName, database, workers=2, parallelMinBytes=0)
+        self.assertIn('400 records loaded\n100 of 500 records parsed were unchanged or not loaded', self.expectedOutput.getvalue())
+        bidPipeline.loadBidsParallel(self.csvName, database, False, workers=2, parallelMinBytes=0)
+        self.assertIn('0 records loaded\n100 records updated\n400 of 500', self.expectedOutput.getvalue())
+        database.close()
+        
+    # Test that small files, and databases only the caller's connection can reach, are loaded on the calling thread
+    def test_load_bids_serial_fallback(self):
+        for fileName in (self.databaseName, ':memory:'):
+            with self.subTest(fileName=fileName):
+                self.expectedOutput.seek(0)
+                self.expectedOutput.truncate(0)
+                database = self.openDatabase(fileName)
+                bidPipeline.loadBidsParallel(self.csvName, database, workers=2, parallelMinBytes=0 if fileName == ':memory:' else 1 << 20)
+                self.assertIn('500 records loaded', self.expectedOutput.getvalue())
+                self.assertEqual(database.aggregate('bids', (), {'bids': ('COUNT', '*')}), [(500,)])
+                database.close()
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -8,20 +8,28 @@
 
 import unittest
 import bidReview
+# Importable once bidReview has put the shared ingest folder on the path
+import bidIngest
 import bidDatabase
 import csv
 import sys
 import io
 import os
+import shutil
+import tempfile
+import time
 
 class TestBid(unittest.TestCase):
     # Setup database for tests
     def setUp(self):
+        # Work in a temporary directory so the test files and the load cache stay out of the source tree
+        scratchDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(scratchDirectory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(scratchDirectory.name)
         self.testDatabaseName: str = 'test_bidDatabase.sqlite'
-        if os.path.exists(self.testDatabaseName):
-            os.remove(self.testDatabaseName)
-            
         self.testDatabase: bidDatabase.BidDatabase = bidDatabase.BidDatabase(self.testDatabaseName)
+        self.addCleanup(self.testDatabase.close)
         self.testTable: str = 'bids'
         self.testDatabase.createTable(self.testTable,
                                       {
@@ -52,5 +60,103 @@ class TestBid(unittest.TestCase):
         except Exception as e:
             self.fail(f"loadBids raised an exception on \"good\" CSV file: {e}")
         
+    # Test loadBids into the compact schema reads back the same records
+    def test_load_bids_compact(self):
+        with open('test_bidReviewGood.csv', 'w', newline='') as csvfile:
+            testCsvWriter = csv.writer(csvfile)
+            testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+            testCsvWriter.writerow([2, 'Title2', 'Fund2', '$2,000.10'])
+            testCsvWriter.writerow([1, 'Title1', 'Fund1', '$1'])
+            testCsvWriter.writerow([3, 'Title3', 'Fund2', '$3'])
+        compactDatabase: bidDatabase.BidDatabase = bidDatabase.BidDatabase(':memory:')
+        compactDatabase.createCompactTable('bids')
+        bidReview.loadBids('test_bidReviewGood.csv', compactDatabase, compact=True)
+        compactDatabase.readRecords('bids')
+        self.assertTrue(self.expectedOutput.getvalue().strip().endswith("Records added successfully\nRecords found\n(1, 'Title1', 'Fund1', 1.0)\n(2, 'Title2', 'Fund2', 2000.1)\n(3, 'Title3', 'Fund2', 3.0)"))
+        self.assertEqual(compactDatabase.cursor.execute('SELECT * FROM bidsCompact WHERE auctionID = 2').fetchone(), (2, 'Title2', 1, 200010))
+        
+    # Test that loadBidsResumable carries on from a saved checkpoint and sets malformed rows aside
+    def test_load_bids_resumable(self):
+        with open('test_bidReviewGood.csv', 'w', newline='') as csvfile:
+            testCsvWriter = csv.writer(csvfile)
+            testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+            for auctionID in range(1, 9):
+                testCsvWriter.writerow([auctionID, f'Title{auctionID}', 'Fund1', 'unknown' if auctionID == 6 else f'${auctionID}'])
+        self.addCleanup(os.remove, 'test_bidReviewGood_rejects.csv')
+        # Commit the first batch with its checkpoint, as an interrupted load would have
+        records, progress = next(bidIngest.readBatchesResumable('test_bidReviewGood.csv', batchRows=1, blockBytes=40))
+        self.testDatabase.createRecords(self.testTable, ('auctionID', 'auctionTitle', 'fund', 'winningBid'), records, True,
+                                        (os.path.abspath('test_bidReviewGood.csv'), progress))
+        self.assertEqual(self.testDatabase.readCheckpoint(os.path.abspath('test_bidReviewGood.csv')), progress)
+        
+        bidReview.loadBidsResumable('test_bidReviewGood.csv', self.testDatabase)
+        self.assertIn(f'Resuming after {progress["rowsLoaded"]} records', self.expectedOutput.getvalue())
+        self.assertIn('7 records loaded\n1 malformed rows written to test_bidReviewGood_rejects.csv', self.expectedOutput.getvalue())
+        self.assertEqual([row[0] for row in self.testDatabase.cursor.execute('SELECT auctionID FROM bids ORDER BY auctionID')], [1, 2, 3, 4, 5, 7, 8])
+        self.assertIsNone(self.testDatabase.readCheckpoint(os.path.abspath('test_bidReviewGood.csv')))
+        with open('test_bidReviewGood_rejects.csv') as rejectFile:
+            self.assertEqual(rejectFile.read().splitlines(), ['Auction ID,Auction Title,Fund,Winning Bid', '6,Title6,Fund1,unknown'])
+        
+    # Test that loadBidsBulk loads every file in a directory, keeping the newest file's copy of a duplicate bid
+    def test_load_bids_bulk(self):
+        os.makedirs('test_bidReviewBulk', exist_ok=True)
+        self.addCleanup(shutil.rmtree, 'test_bidReviewBulk')
+        for fileName, rows in (('older.csv', [[3, 'Title3', 'Fund3', '$3'], [2, 'Title2', 'Fund2', '$2']]),
+                               ('newer.csv', [[2, 'Title2', 'Fund2', '$2,000.00'], [1, 'Title1', 'Fund1', '$1']])):
+            with open(os.path.join('test_bidReviewBulk', fileName), 'w', newline='') as csvfile:
+                testCsvWriter = csv.writer(csvfile)
+                testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+                testCsvWriter.writerows(rows)
+        os.utime(os.path.join('test_bidReviewBulk', 'older.csv'), (1_000_000, 1_000_000))
+        bidReview.loadBidsBulk('test_bidReviewBulk', self.testDatabase, workers=1)
+        self.assertIn('2 files, 4 rows, 3 bids loaded', self.expectedOutput.getvalue())
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT * FROM bids ORDER BY auctionID').fetchall(),
+                         [(1, 'Title1', 'Fund1', 1.0), (2, 'Title2', 'Fund2', 2000.0), (3, 'Title3', 'Fund3', 3.0)])
+        # The oldest file's copy replaces it when duplicates in the database are updated
+        bidReview.loadBidsBulk('test_bidReviewBulk', self.testDatabase, False, policy='first', workers=1)
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT winningBid FROM bids WHERE auctionID = 2').fetchone(), (2.0,))
+        
+    # Test that rows appended to a followed file are written when applyFollowed is called
+    def test_follow_bids(self):
+        with open('test_bidReviewGood.csv', 'w', newline='') as csvfile:
+            testCsvWriter = csv.writer(csvfile)
+            testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+            testCsvWriter.writerow([2, 'Title2', 'Fund2', '$2'])
+            testCsvWriter.writerow([1, 'Title1', 'Fund1', '$1'])
+        follower = bidReview.followBids('test_bidReviewGood.csv')
+        self.addCleanup(follower.stop)
+        bidReview.loadBids('test_bidReviewGood.csv', self.testDatabase, cached=False)
+        with open('test_bidReviewGood.csv', 'a', newline='') as csvfile:
+            csv.writer(csvfile).writerow([3, 'Title3', 'Fund3', '$3'])
+        deadline = time.monotonic() + 5
+        while not bidReview.applyFollowed(follower, self.testDatabase) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([row[0] for row in self.testDatabase.cursor.execute('SELECT auctionID FROM bids ORDER BY auctionID')], [1, 2, 3])
+        
+    # Test that applyDiff changes the database into what loading the corrected file gives
+    def test_apply_diff(self):
+        for fileName, rows in (('test_bidReviewGood.csv', [[2, 'Title2', 'Fund2', '$2'], [1, 'Title1', 'Fund1', '$1'], [3, 'Title3', 'Fund3', '$3']]),
+                               ('test_bidReviewCorrected.csv', [[4, 'Title4', 'Fund4', '$4'], [1, 'Title1', 'Fund1', '$1'], [3, 'Title3', 'Fund1', '$30']])):
+            with open(fileName, 'w', newline='') as csvfile:
+                testCsvWriter = csv.writer(csvfile)
+                testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+                testCsvWriter.writerows(rows)
+        self.addCleanup(os.remove, 'test_bidReviewCorrected.csv')
+        bidReview.loadBids('test_bidReviewGood.csv', self.testDatabase, cached=False)
+        bidReview.applyDiff('test_bidReviewGood.csv', 'test_bidReviewCorrected.csv', self.testDatabase)
+        self.assertIn('Changes applied: 1 inserted, 1 updated, 1 deleted', self.expectedOutput.getvalue())
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT * FROM bids ORDER BY auctionID').fetchall(),
+                         [(1, 'Title1', 'Fund1', 1.0), (3, 'Title3', 'Fund1', 30.0), (4, 'Title4', 'Fund4', 4.0)])
+        
+    # Test that a sorted load gives the same table as loading the file in its own order
+    def test_load_bids_sorted(self):
+        with open('test_bidReviewGood.csv', 'w', newline='') as csvfile:
+            testCsvWriter = csv.writer(csvfile)
+            testCsvWriter.writerow(['Auction ID', 'Auction Title', 'Fund', 'Winning Bid'])
+            testCsvWriter.writerows([[auctionID, f'Title{auctionID}', 'Fund1', f'${auctionID}'] for auctionID in (5, 2, 7, 1, 4, 6, 3)])
+        bidReview.loadBids('test_bidReviewGood.csv', self.testDatabase, sortFirst=True)
+        self.assertEqual(self.testDatabase.cursor.execute('SELECT * FROM bids ORDER BY rowid').fetchall(),
+                         [(auctionID, f'Title{auctionID}', 'Fund1', float(auctionID)) for auctionID in range(1, 8)])
+        
 if __name__ == '__main__':
     unittest.main(verbosity=2)
\ No newline at end of file
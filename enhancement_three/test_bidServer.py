@@ -0,0 +1,118 @@
+#=======================================================================================
+# Name        : test_bidServer.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Test of bidServer and bidLoadClient modules
+#=======================================================================================
+
+import unittest
+import bidServer
+import bidLoadClient
+import asyncio
+import json
+import sys
+import io
+import os
+
+class TestBidServer(unittest.TestCase):
+    databaseName: str = 'test_bidDatabaseServer.sqlite'
+    records: list[list] = [[auctionID, f'Title{auctionID}', 'Enterprise' if auctionID % 2 else 'General Fund', float(auctionID)]
+                           for auctionID in range(1, 11)]
+    
+    def setUp(self):
+        self.removeDatabase()
+        self.expectedOutput = io.StringIO()
+        sys.stdout = self.expectedOutput
+        
+    def tearDown(self):
+        sys.stdout = sys.__stdout__
+        self.removeDatabase()
+        
+    def removeDatabase(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.databaseName + suffix):
+                os.remove(self.databaseName + suffix)
+                
+    def openBackend(self, backendName):
+        if backendName == 'tree':
+            return bidServer.openTreeBackend()
+        return bidServer.DatabaseBackend(self.databaseName)
+    
+    async def exchange(self, port, requests):
+        # Send every request before reading any response to exercise pipelining
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b''.join(json.dumps(request).encode() + b'\n' for request in requests))
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        writer.close()
+        return responses
+    
+    # Test every operation, pipelined on one connection, against both backends
+    def test_operations(self):
+        async def run(backendName):
+            server = bidServer.BidServer(self.openBackend(backendName))
+            port = await server.start(port=0)
+            try:
+                responses = await self.exchange(port, [
+                    {'id': 1, 'op': 'load', 'records': self.records},
+                    {'id': 2, 'op': 'get', 'ids': [3, 99, 4]},
+                    {'id': 3, 'op': 'range', 'low': 8, 'high': 20},
+                    {'id': 4, 'op': 'remove', 'ids': [9, 99]},
+                    {'id': 5, 'op': 'aggregate', 'groupBy': ['fund'], 'metrics': {'bids': ['COUNT', '*'], 'top': ['MAX', 'winningBid']}},
+                    {'id': 6, 'op': 'aggregate', 'groupBy': ['fund; DROP TABLE bids'], 'metrics': {'bids': ['COUNT', '*']}},
+                    {'id': 7, 'op': 'fly'}])
+            finally:
+                await server.stop()
+            self.assertEqual([response['id'] for response in responses], [1, 2, 3, 4, 5, 6, 7])
+            self.assertEqual(responses[0]['result'], 10)
+            self.assertEqual(responses[1]['result'], [self.records[2], None, self.records[3]])
+            self.assertEqual(responses[2]['result'], self.records[7:])
+            self.assertEqual(responses[3]['result'], 1)
+            self.assertEqual(responses[4]['result'], [['Enterprise', 4, 7.0], ['General Fund', 5, 10.0]])
+            self.assertFalse(responses[5]['ok'])
+            self.assertEqual(responses[6], {'id': 7, 'ok': False, 'error': 'RequestError: Unknown op: fly'})
+            self.assertEqual(server.requestCount, 7)
+            
+        for backendName in ('tree', 'database'):
+            with self.subTest(backend=backendName):
+                asyncio.run(run(backendName))
+                
+    # Test loading a CSV file and running the load generator against it
+    def test_load_client(self):
+        async def run():
+            server = bidServer.BidServer(self.openBackend('tree'), dataDirectory='.')
+            port = await server.start(port=0)
+            try:
+                responses = await self.exchange(port, [{'id': 1, 'op': 'load', 'path': 'eBid_Monthly_Sales_Dec_2016.csv'}])
+                results = await bidLoadClient.runLoad(port=port, seconds=0.2, connections=2, pipelineDepth=4, idsPerRequest=3)
+            finally:
+                await server.stop()
+            self.assertGreater(responses[0]['result'], 0)
+            self.assertGreater(results['requests'], 0)
+            self.assertLessEqual(results['p50'], results['max'])
+            
+        asyncio.run(run())
+        self.assertIn('requests/s', self.expectedOutput.getvalue())
+        
+    # Test that load requests can only name files inside the data directory
+    def test_load_path_restricted(self):
+        async def run(dataDirectory):
+            server = bidServer.BidServer(self.openBackend('tree'), dataDirectory=dataDirectory)
+            port = await server.start(port=0)
+            try:
+                return await self.exchange(port, [{'id': 1, 'op': 'load', 'path': '../enhancement_two/eBid_Monthly_Sales_Dec_2016.csv'},
+                                                  {'id': 2, 'op': 'load', 'path': os.path.abspath('eBid_Monthly_Sales_Dec_2016.csv')},
+                                                  {'id': 3, 'op': 'range', 'low': 0, 'high': 10 ** 12}])
+            finally:
+                await server.stop()
+                
+        responses = asyncio.run(run(None))
+        self.assertEqual([response['ok'] for response in responses], [False, False, True])
+        self.assertIn('disabled', responses[0]['error'])
+        responses = asyncio.run(run('.'))
+        self.assertEqual([response['ok'] for response in responses], [False, True, True])
+        self.assertIn('outside the data directory', responses[0]['error'])
+        self.assertGreater(responses[1]['result'], 0)
+        
+if __name__ == '__main__':
+    unittest.main()
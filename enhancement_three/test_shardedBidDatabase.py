@@ -0,0 +1,121 @@
+#=======================================================================================
+# Name        : test_shardedBidDatabase.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Test of shardedBidDatabase module
+#=======================================================================================
+
+import unittest
+import shardedBidDatabase
+import sqlite3
+import sys
+import io
+import os
+
+class TestShardedBidDatabase(unittest.TestCase):
+    shardNames: list[str] = [f'test_shard{shardIndex}.sqlite' for shardIndex in range(3)]
+    tableCols: tuple[str] = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+    records: list[tuple] = [(auctionID, f'Title{auctionID}', 'Enterprise' if auctionID % 2 else 'General Fund', float(auctionID))
+                            for auctionID in range(1, 31)]
+    
+    def setUp(self):
+        self.removeShards()
+        self.expectedOutput = io.StringIO()
+        sys.stdout = self.expectedOutput
+        
+    def tearDown(self):
+        sys.stdout = sys.__stdout__
+        self.removeShards()
+        
+    def removeShards(self):
+        for shardName in self.shardNames:
+            if os.path.exists(shardName):
+                os.remove(shardName)
+                
+    def createDatabase(self, boundaries=None):
+        database = shardedBidDatabase.ShardedBidDatabase(self.shardNames, boundaries=boundaries)
+        database.createTable('bids', {'auctionID': 'INTEGER PRIMARY KEY NOT NULL',
+                                      'auctionTitle': 'TEXT NOT NULL',
+                                      'fund': 'TEXT NOT NULL',
+                                      'winningBid': 'FLOAT NOT NULL'})
+        database.createRecords('bids', self.tableCols, self.records)
+        self.addCleanup(database.close)
+        return database
+    
+    # Test that range partitioning places keys in the right files
+    def test_range_partitioning(self):
+        self.createDatabase(boundaries=[11, 21])
+        self.assertEqual(self.expectedOutput.getvalue().strip(),
+                         'Connected to 3 database shards successfully\nTable created successfully\nRecords added successfully')
+        for shardName, expectedKeys in zip(self.shardNames, (range(1, 11), range(11, 21), range(21, 31))):
+            with sqlite3.connect(shardName) as connection:
+                self.assertEqual([row[0] for row in connection.execute('SELECT auctionID FROM bids')], list(expectedKeys))
+                
+    # Test that reads merge hash partitioned shards back into key order
+    def test_read_in_key_order(self):
+        database = self.createDatabase()
+        self.assertEqual(database.readRange('bids', 'auctionID', 5, 9), self.records[4:9])
+        database.readRecords('bids')
+        self.assertTrue(self.expectedOutput.getvalue().strip().endswith(
+            'Records found\n' + '\n'.join(str(record) for record in self.records)))
+        
+    # Test single record functions route to the owning shard
+    def test_record_crud(self):
+        database = self.createDatabase(boundaries=[11, 21])
+        database.updateRecord('bids', 'auctionID', 15, {'winningBid': 150.0})
+        database.deleteRecord('bids', 'auctionID', 16)
+        self.assertEqual(database.readRecord('bids', 'auctionID', 15), (15, 'Title15', 'Enterprise', 150.0))
+        self.assertEqual(database.readRange('bids', 'auctionID', 15, 17), [(15, 'Title15', 'Enterprise', 150.0), self.records[16]])
+        with self.assertRaises(ValueError):
+            database.updateRecord('bids', 'auctionID', 15, {'auctionID': 1})
+            
+    # Test that schema changes reach every shard
+    def test_alter_tables(self):
+        database = self.createDatabase()
+        database.addTableColumn('bids', 'closeDate', 'TEXT')
+        database.updateTableColumnName('bids', 'closeDate', 'closedOn')
+        database.updateTableName('bids', 'auctions')
+        self.assertEqual(database.readRecord('auctions', 'auctionID', 4), self.records[3] + (None,))
+        for shardName in self.shardNames:
+            with sqlite3.connect(shardName) as connection:
+                self.assertEqual([row[1] for row in connection.execute('PRAGMA table_info(auctions)')], list(self.tableCols) + ['closedOn'])
+        with self.assertRaises(ValueError):
+            database.updateTableColumnName('auctions', 'auctionID', 'bidID')
+            
+    # Test that a schema change failing on one shard is rolled back on the others, and reads from a failed shard return None
+    def test_failed_shard(self):
+        database = self.createDatabase()
+        database.executors[1].submit(lambda: database.shards[1].cursor.execute('ALTER TABLE bids ADD COLUMN closeDate TEXT')).result()
+        database.addTableColumn('bids', 'closeDate', 'TEXT')
+        self.assertIn('duplicate column name', self.expectedOutput.getvalue())
+        self.assertNotIn('New column added successfully', self.expectedOutput.getvalue())
+        for shardIndex, shardName in enumerate(self.shardNames):
+            with sqlite3.connect(shardName) as connection:
+                self.assertEqual('closeDate' in [row[1] for row in connection.execute('PRAGMA table_info(bids)')], shardIndex == 1)
+        self.assertIsNone(database.readRecord('missing', 'auctionID', 4))
+        self.assertIn('Encounted while reading auctionID 4 from: missing', self.expectedOutput.getvalue())
+        with self.assertRaises(IndexError):
+            database.readRecord('bids', 'auctionID', 100)
+        
+    # Test that a load failing on one shard is rolled back on every shard, so it can be run again once fixed
+    def test_failed_shard_load(self):
+        database = self.createDatabase(boundaries=[11, 21])
+        newRecords = [(auctionID, f'Title{auctionID}', 'Enterprise', 1.0) for auctionID in (5, 15, 25, 31, 32)]
+        database.createRecords('bids', self.tableCols, newRecords[:3] + [(33, None, 'Enterprise', 1.0)] + newRecords[3:], False)
+        self.assertIn('NOT NULL constraint failed', self.expectedOutput.getvalue())
+        self.assertEqual(database.readRange('bids', 'auctionID', 1, 40), self.records)
+        database.createRecords('bids', self.tableCols, newRecords, False)
+        self.assertEqual(database.readRange('bids', 'auctionID', 31, 40), newRecords[3:])
+        self.assertEqual(database.readRecord('bids', 'auctionID', 15), newRecords[1])
+        
+    # Test that aggregates combined across shards match a single database
+    def test_aggregate(self):
+        database = self.createDatabase()
+        results = database.aggregate('bids', ('fund',), {'total': ('SUM', 'winningBid'), 'bids': ('COUNT', '*'),
+                                                         'average': ('AVG', 'winningBid'), 'smallest': ('MIN', 'winningBid')},
+                                     'auctionID <= ?', (10,))
+        self.assertEqual(results, [('Enterprise', 25.0, 5, 5.0, 1.0), ('General Fund', 30.0, 5, 6.0, 2.0)])
+        
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
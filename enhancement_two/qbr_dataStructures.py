@@ -7,7 +7,7 @@
 #               Contains Node class, BinarySearchTree class, and RedBlackTree class
 #=======================================================================================
 
-from typing import NewType, Any, NoReturn
+from typing import NewType, Any, NoReturn, Iterator
 from enum import Enum
 
 # New type definitions
@@ -350,9 +350,20 @@ class BinarySearchTree:
         return None
     
     # Solution adapted from: https://www.geeksforgeeks.org/inorder-tree-traversal-without-recursion/
-    def inOrderTraversal(self) -> NoReturn:
+    def inOrderKeys(self, low: Any = None) -> Iterator[Any]:
         """
-        Prints the BST to the screen in order
+        Yields the keys in the BST in order without building a list of them
+        
+        Parameters
+        ----------
+        low: Any (optional)
+            Start at the first key not less than low, without visiting the
+            subtrees below it. If None, start at the smallest key (default is None)
+        
+        Returns
+        -------
+        Iterator[Any]
+            The keys from smallest to largest
         """
         # Stack to hold path while traversing
         stack: list = []
@@ -360,11 +371,25 @@ class BinarySearchTree:
         while currentNode is not None or len(stack) > 0:
             # Traverse tree and add path to stack
             while currentNode is not None:
+                # Keys to the left of one below low are below low too
+                if low is not None and currentNode.key < low:
+                    currentNode = currentNode.rightNode
+                    continue
                 stack.append(currentNode)
                 currentNode = currentNode.leftNode
+            # The keys left were all below low
+            if len(stack) == 0:
+                break
             currentNode = stack.pop()
-            print(currentNode, end='\n')
+            yield currentNode.key
             currentNode = currentNode.rightNode
+    
+    def inOrderTraversal(self) -> NoReturn:
+        """
+        Prints the BST to the screen in order
+        """
+        for key in self.inOrderKeys():
+            print(key, end='\n')
         return
  
 # Red-Black Tree Class
@@ -700,9 +725,20 @@ class RedBlackTree:
         return node
     
     # Solution adapted from: https://www.geeksforgeeks.org/inorder-tree-traversal-without-recursion/
-    def inOrderTraversal(self) -> NoReturn:
+    def inOrderKeys(self, low: Any = None) -> Iterator[Any]:
         """
-        Prints the RBT to the screen in order
+        Yields the keys in the RBT in order without building a list of them
+        
+        Parameters
+        ----------
+        low: Any (optional)
+            Start at the first key not less than low, without visiting the
+            subtrees below it. If None, start at the smallest key (default is None)
+        
+        Returns
+        -------
+        Iterator[Any]
+            The keys from smallest to largest
         """
         # Stack to hold path while traversing
         stack: list = []
@@ -710,10 +746,25 @@ class RedBlackTree:
         while currentNode is not None or len(stack) > 0:
             # Traverse tree and add path to stack
             while currentNode is not None:
+                # Keys to the left of one below low are below low too
+                if low is not None and currentNode.key is not None and currentNode.key < low:
+                    currentNode = currentNode.rightNode
+                    continue
                 stack.append(currentNode)
                 currentNode = currentNode.leftNode
+            # The keys left were all below low
+            if len(stack) == 0:
+                break
             currentNode = stack.pop()
+            # Skip the empty black leaves
             if currentNode.key is not None:
-                print(currentNode, end='\n')
+                yield currentNode.key
             currentNode = currentNode.rightNode
+    
+    def inOrderTraversal(self) -> NoReturn:
+        """
+        Prints the RBT to the screen in order
+        """
+        for key in self.inOrderKeys():
+            print(key, end='\n')
         return
\ No newline at end of file
@@ -229,6 +229,12 @@ class TestBinarySearchTree(unittest.TestCase):
         # directs output back to console for future use
         sys.stdout = sys.__stdout__
         self.assertEqual(result.getvalue().strip(), expected)
+    
+    # Test in-order key generator
+    def test_in_order_keys(self):
+        self.assertEqual(list(self.bst.inOrderKeys()), sorted(set(keys)))
+        for low in range(-1, max(keys) + 2):
+            self.assertEqual(list(self.bst.inOrderKeys(low)), [key for key in sorted(set(keys)) if key >= low])
 
 class TestRedBlackTree(unittest.TestCase):
     # Build test RBT
@@ -317,6 +323,12 @@ class TestRedBlackTree(unittest.TestCase):
         # directs output back to console for future use
         sys.stdout = sys.__stdout__
         self.assertEqual(result.getvalue().strip(), expected)
+    
+    # Test in-order key generator
+    def test_in_order_keys(self):
+        self.assertEqual(list(self.rbt.inOrderKeys()), sorted(set(keys)))
+        for low in range(-1, max(keys) + 2):
+            self.assertEqual(list(self.rbt.inOrderKeys(low)), [key for key in sorted(set(keys)) if key >= low])
 
 def node_test_suite():
     return unittest.TestSuite(tests=[
@@ -334,7 +346,8 @@ def binarySearchTree_test_suite():
         TestBinarySearchTree("test_insert"),
         TestBinarySearchTree("test_search"),
         TestBinarySearchTree("test_delete"),
-        TestBinarySearchTree("test_in_order_traversal")
+        TestBinarySearchTree("test_in_order_traversal"),
+        TestBinarySearchTree("test_in_order_keys")
     ])
     
 def redBlackTree_test_suite():
@@ -342,7 +355,8 @@ def redBlackTree_test_suite():
         TestRedBlackTree("test_insert"),
         TestRedBlackTree("test_search"),
         TestRedBlackTree("test_delete"),
-        TestRedBlackTree("test_in_order_traversal")
+        TestRedBlackTree("test_in_order_traversal"),
+        TestRedBlackTree("test_in_order_keys")
     ])
     
 if __name__ == '__main__':
@@ -0,0 +1,1870 @@
+#=======================================================================================
+# Name        : bidIngest.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Streams typed bids out of eBid CSV exports a batch at a time, and writes
+#               bids back out as CSV or JSON Lines exports. Shared by the bidReview
+#               driver of every enhancement
+#=======================================================================================
+
+import array
+import bz2
+import concurrent.futures
+import contextlib
+import csv
+import ctypes
+import glob
+import gzip
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import lzma
+import mmap
+import operator
+import os
+import pickle
+import queue
+import select
+import struct
+import sys
+import tempfile
+import threading
+import time
+import typing
+
+# Bids handed to the loader at a time. Memory use depends on this, not on the file size
+BATCH_ROWS: int = 10_000
+# Characters read to detect the CSV dialect and header
+SNIFF_BYTES: int = 1024
+# Header names of the columns a bid is built from, in record order
+BID_COLUMNS: tuple[str] = ('Auction ID', 'Auction Title', 'Fund', 'Winning Bid')
+# Bytes of CSV each parser process handles at a time when parsing in parallel
+CHUNK_BYTES: int = 4 << 20
+# Parsed chunks allowed to wait for the loader before parallel parsing pauses
+MAX_QUEUED_BATCHES: int = 4
+# Bytes read at a time while scanning for quotes and record boundaries
+SCAN_BYTES: int = 1 << 20
+# Directory, next to each CSV, holding the parsed columns of the CSVs loaded so far
+CACHE_DIRECTORY: str = '.bidCache'
+# Start of every cache file. Changing the layout means changing the version at the end
+CACHE_MAGIC: bytes = b'BIDCACHE0001'
+# Bytes before a checkpoint's offset hashed to tell whether the file is still the one checkpointed
+ANCHOR_BYTES: int = 1 << 16
+# Opens a compressed CSV by its extension, decompressing as it is read
+COMPRESSED_OPENERS: dict[str, typing.Callable[..., typing.IO]] = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+# Decompressed bytes handed to the parser at a time
+DECOMPRESS_BYTES: int = 1 << 20
+# Decompressed chunks allowed to wait for the parser before decompression pauses
+MAX_QUEUED_CHUNKS: int = 4
+# Files picked up when a whole directory is loaded
+CSV_EXTENSIONS: tuple[str] = ('.csv',) + tuple(f'.csv{extension}' for extension in COMPRESSED_OPENERS)
+# Which copy of an auction ID is kept when loading several files: the one from the file
+# modified last, or the one from the file modified first
+DUPLICATE_POLICIES: tuple[str] = ('latest', 'first')
+# Longest wait between checks of a followed file. Without inotify it is also the longest
+# an appended row waits before it is read
+FOLLOW_POLL_SECONDS: float = 1.0
+# inotify events that mean a followed file may have grown, been truncated or been replaced:
+# IN_MODIFY, IN_ATTRIB, IN_DELETE_SELF and IN_MOVE_SELF
+INOTIFY_EVENTS: int = 0x002 | 0x004 | 0x400 | 0x800
+# Memory a sort by auction ID may fill with records before it sorts them and writes them
+# to a temporary file as a run. Bigger files are sorted in runs, which are then merged
+SORT_MEMORY_BYTES: int = 256 << 20
+# Memory counted for each record being sorted on top of its text: the tuple, the ID, the
+# amount and the list slot holding them
+SORT_RECORD_OVERHEAD: int = 100
+# Field names written by the export functions, matching the columns of the enhancement three database
+EXPORT_COLUMNS: tuple[str] = ('auctionID', 'auctionTitle', 'fund', 'winningBid')
+# Write buffer of an uncompressed export
+EXPORT_BUFFER_BYTES: int = 1 << 20
+
+class FileFormatError(Exception):
+    """
+    Custom exception for handling incorrectly formatted file
+    """
+
+def parseAmount(amount: str) -> float:
+    """
+    Converts a winning bid such as '$2,000.00 ' to a float
+
+    Parameters
+    ----------
+    amount: str
+        The winning bid as written in the CSV
+
+    Returns
+    -------
+    float
+        The winning bid
+    """
+    # strip initial $ sign and thousands separators
+    return float(amount[1:].replace(',', ''))
+
+def sniffDialect(sample: str) -> type[csv.Dialect]:
+    """
+    Detects the dialect of a CSV sample for every reader in this module. Only the delimiter
+    and quote character are taken from the sample, and spaces after a delimiter are kept. A quote inside a quoted field is always
+    read as written twice, since the byte-level parsers can't follow any other rule and the
+    sniffer's guess at it changes with the sample
+
+    Parameters
+    ----------
+    sample: str
+        The start of the CSV file
+
+    Returns
+    -------
+    type[Dialect]
+        The dialect
+    """
+    dialect = csv.Sniffer().sniff(sample)
+    dialect.doublequote = True
+    dialect.escapechar = None
+    dialect.skipinitialspace = False
+    return dialect
+
+def readRows(csvFile: typing.TextIO) -> typing.Iterator[list[str]]:
+    """
+    Detects the dialect and header of an open CSV file and yields its rows, header first.
+    The sample is read only once, so files that can't seek back, like pipes, work too
+
+    Parameters
+    ----------
+    csvFile: TextIO
+        The CSV file, opened in text mode
+
+    Returns
+    -------
+    Iterator[list[str]]
+        Each row of the file
+    """
+    sample: str = csvFile.read(SNIFF_BYTES)
+    if not sample:
+        raise FileFormatError("CSV file is empty")
+    # detects csv dialect and presence of header
+    dialect: type[csv.Dialect] = sniffDialect(sample)
+    if not csv.Sniffer().has_header(sample):
+        raise FileFormatError("No header found in CSV file")
+    if csvFile.seekable():
+        csvFile.seek(0)
+        lines: typing.Iterable[str] = csvFile
+    else:
+        # Finish the sample's last line so it can be handed back ahead of the rest of the file
+        lines = itertools.chain((sample + csvFile.readline()).splitlines(keepends=True), csvFile)
+    yield from csv.reader(lines, dialect)
+
+def readBatches(source: str | typing.TextIO, batchRows: int = BATCH_ROWS) -> typing.Iterator[list[tuple[int, str, str, float]]]:
+    """
+    Yields the bids in a CSV file in batches, reading only as far as the batch being built.
+    Paths of regular files are read through readBatchesMapped, and paths ending in .gz,
+    .bz2 or .xz through readBatchesCompressed
+
+    Parameters
+    ----------
+    source: str | TextIO
+        Relative path of the CSV file, or a file already open in text mode
+    batchRows: int (optional)
+        The most bids in a batch (default is BATCH_ROWS)
+
+    Returns
+    -------
+    Iterator[list[tuple[int, str, str, float]]]
+        Lists of bids as (auctionID, auctionTitle, fund, winningBid), in file order
+    """
+    if isinstance(source, str) and isCompressed(source):
+        yield from readBatchesCompressed(source, batchRows)
+        return
+    if isinstance(source, str) and os.path.isfile(source):
+        yield from readBatchesMapped(source, batchRows)
+        return
+    # A file passed in is left open for the caller
+    with (open(source) if isinstance(source, str) else contextlib.nullcontext(source)) as csvFile:
+        rows: typing.Iterator[list[str]] = readRows(csvFile)
+        header: list[str] = next(rows)
+        bidIdColumn, titleColumn, fundColumn, bidAmountColumn = (header.index(colName) for colName in BID_COLUMNS)
+        batch: list[tuple[int, str, str, float]] = []
+        for row in rows:
+            if not row:
+                continue
+            batch.append((int(row[bidIdColumn]), row[titleColumn], row[fundColumn], parseAmount(row[bidAmountColumn])))
+            if len(batch) == batchRows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def readBatchesMapped(csvPath: str, batchRows: int = BATCH_ROWS) -> typing.Iterator[list[tuple[int, str, str, float]]]:
+    """
+    Yields the same bids as readBatches, but reads the file through a memory map and
+    builds each bid straight from the line, split only as far as the last bid column.
+    Rows with a quote in them go through the csv module, since only those can hide a
+    delimiter or newline inside a field
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    batchRows: int (optional)
+        The most bids in a batch (default is BATCH_ROWS)
+
+    Returns
+    -------
+    Iterator[list[tuple[int, str, str, float]]]
+        Lists of bids as (auctionID, auctionTitle, fund, winningBid), in file order
+    """
+    header, dialect = sniffFile(csvPath)
+    columns: tuple[int] = tuple(header.index(colName) for colName in BID_COLUMNS)
+    if dialect.quotechar != '"' or dialect.escapechar is not None or len(dialect.delimiter.encode()) != 1:
+        # The byte scan only knows the usual quoting, so leave anything else to the csv module
+        with open(csvPath) as csvFile:
+            yield from readBatches(csvFile, batchRows)
+        return
+    with open(csvPath, 'rb') as csvFile, mmap.mmap(csvFile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        batch: list[tuple[int, str, str, float]] = []
+        for bids in projectRecords(buffer, _recordEnd(buffer, 0, len(buffer)), len(buffer), dialect.delimiter, columns):
+            batch.extend(bids)
+            while len(batch) >= batchRows:
+                yield batch[:batchRows]
+                del batch[:batchRows]
+        if batch:
+            yield batch
+
+def isCompressed(csvPath: str) -> bool:
+    """
+    Checks whether a CSV path names a compressed file, by its extension
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+
+    Returns
+    -------
+    bool
+        True if the path ends in one of the COMPRESSED_OPENERS extensions
+    """
+    return os.path.splitext(csvPath)[1].lower() in COMPRESSED_OPENERS
+
+def readBatchesCompressed(csvPath: str,
+                          batchRows: int = BATCH_ROWS,
+                          chunkBytes: int = DECOMPRESS_BYTES,
+                          maxQueuedChunks: int = MAX_QUEUED_CHUNKS) -> typing.Iterator[list[tuple[int, str, str, float]]]:
+    """
+    Yields the same bids as readBatches for a .gz, .bz2 or .xz CSV file without writing it
+    out decompressed. A thread decompresses the file while the calling thread parses the
+    chunks it has already decompressed, and decompression pauses whenever maxQueuedChunks
+    are waiting, so memory stays at a few chunks however large the file is
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the compressed CSV file
+    batchRows: int (optional)
+        The most bids in a batch (default is BATCH_ROWS)
+    chunkBytes: int (optional)
+        Decompressed bytes parsed at a time (default is DECOMPRESS_BYTES)
+    maxQueuedChunks: int (optional)
+        Decompressed chunks allowed to wait for the parser (default is MAX_QUEUED_CHUNKS)
+
+    Returns
+    -------
+    Iterator[list[tuple[int, str, str, float]]]
+        Lists of bids as (auctionID, auctionTitle, fund, winningBid), in file order
+    """
+    header, dialect = sniffFile(csvPath)
+    columns: tuple[int] = tuple(header.index(colName) for colName in BID_COLUMNS)
+    if dialect.quotechar != '"' or dialect.escapechar is not None or len(dialect.delimiter.encode()) != 1:
+        # The byte scan only knows the usual quoting, so leave anything else to the csv module
+        with COMPRESSED_OPENERS[os.path.splitext(csvPath)[1].lower()](csvPath, 'rt', newline='') as csvFile:
+            yield from readBatches(csvFile, batchRows)
+        return
+    chunks: typing.Iterator[bytes] = decompressChunks(csvPath, chunkBytes, maxQueuedChunks)
+    try:
+        pending: bytes = b''
+        headerEnd: int | None = None
+        batch: list[tuple[int, str, str, float]] = []
+        for chunk in itertools.chain(chunks, [None]):
+            pending += chunk or b''
+            if headerEnd is None:
+                headerEnd = _recordEnd(pending, 0, len(pending))
+                if headerEnd == len(pending) and chunk is not None and not pending.endswith(b'\n'):
+                    # The header hasn't been read to its end yet
+                    headerEnd = None
+                    continue
+                pending = pending[headerEnd:]
+            # Only whole lines are parsed, and what is left over waits for the next chunk
+            blockEnd: int = len(pending) if chunk is None else pending.rfind(b'\n') + 1
+            bids, consumed = _projectBlock(pending[:blockEnd], chunk is None, dialect.delimiter, columns) if blockEnd else ([], 0)
+            pending = pending[consumed:]
+            batch.extend(bids)
+            while len(batch) >= batchRows:
+                yield batch[:batchRows]
+                del batch[:batchRows]
+        if batch:
+            yield batch
+    finally:
+        chunks.close()
+
+def decompressChunks(csvPath: str, chunkBytes: int = DECOMPRESS_BYTES, maxQueuedChunks: int = MAX_QUEUED_CHUNKS) -> typing.Iterator[bytes]:
+    """
+    Yields the decompressed contents of a .gz, .bz2 or .xz file a chunk at a time, with
+    the decompression done on another thread. The decompressors let go of the GIL while
+    they work, so it overlaps with whatever the caller does with each chunk
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the compressed file
+    chunkBytes: int (optional)
+        Decompressed bytes in each chunk (default is DECOMPRESS_BYTES)
+    maxQueuedChunks: int (optional)
+        Chunks allowed to wait for the caller before decompression pauses (default is MAX_QUEUED_CHUNKS)
+
+    Returns
+    -------
+    Iterator[bytes]
+        Each chunk of the decompressed file, in order
+    """
+    opener: typing.Callable[..., typing.IO] = COMPRESSED_OPENERS[os.path.splitext(csvPath)[1].lower()]
+    chunks: queue.Queue = queue.Queue(maxsize=maxQueuedChunks)
+    stopping: threading.Event = threading.Event()
+
+    def _put(item: typing.Any) -> None:
+        while not stopping.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _decompress() -> None:
+        try:
+            with opener(csvPath, 'rb') as compressedFile:
+                while not stopping.is_set():
+                    chunk: bytes = compressedFile.read(chunkBytes)
+                    if not chunk:
+                        break
+                    _put(chunk)
+            _put(None)
+        except Exception as error:
+            _put(error)
+
+    decompressor: threading.Thread = threading.Thread(target=_decompress, name='bidIngestDecompressor', daemon=True)
+    decompressor.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stopping.set()
+        decompressor.join()
+
+def sniffFile(csvPath: str) -> tuple[list[str], type[csv.Dialect]]:
+    """
+    Reads the header and detects the dialect of a CSV file, decompressing the start of it
+    if the path ends in .gz, .bz2 or .xz
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+
+    Returns
+    -------
+    tuple[list[str], type[Dialect]]
+        The header row and the dialect
+    """
+    with (COMPRESSED_OPENERS[os.path.splitext(csvPath)[1].lower()](csvPath, 'rt', newline='') if isCompressed(csvPath) else open(csvPath)) as csvFile:
+        header: list[str] = next(readRows(csvFile))
+        # readRows has already checked the same sample, so this can't fail
+        csvFile.seek(0)
+        return header, sniffDialect(csvFile.read(SNIFF_BYTES))
+
+def projectRecords(buffer: mmap.mmap | bytes,
+                   start: int,
+                   end: int,
+                   delimiter: str,
+                   columns: tuple[int],
+                   blockBytes: int = SCAN_BYTES) -> typing.Iterator[list[tuple[int, str, str, float]]]:
+    """
+    Yields the bids in a byte range a block at a time. Each line is split only as far as
+    the last bid column, so the trailing columns of a wide export are never split out.
+    Lines with a quote in them are parsed by one csv reader per block, or the whole block
+    is when most of its lines have quotes
+
+    Parameters
+    ----------
+    buffer: mmap | bytes
+        The CSV file's contents
+    start: int
+        Offset of the range's first record
+    end: int
+        Offset just past the range's last record
+    delimiter: str
+        The CSV delimiter, a single byte once encoded
+    columns: tuple[int]
+        Positions of the Auction ID, Auction Title, Fund and Winning Bid columns
+    blockBytes: int (optional)
+        Bytes split into lines at a time (default is SCAN_BYTES)
+
+    Returns
+    -------
+    Iterator[list[tuple[int, str, str, float]]]
+        Lists of bids as (auctionID, auctionTitle, fund, winningBid), in file order
+    """
+    for bids, _ in _projectBlocks(buffer, start, end, delimiter, columns, blockBytes):
+        yield bids
+
+def _projectBlocks(buffer: mmap.mmap | bytes,
+                   start: int,
+                   end: int,
+                   delimiter: str,
+                   columns: tuple[int],
+                   blockBytes: int,
+                   rejects: list[bytes] | None = None) -> typing.Iterator[tuple[list[tuple[int, str, str, float]], int]]:
+    """
+    Yields the bids in each block with the offset just past the block. If rejects is given,
+    malformed records are added to it instead of raising. Not meant to be called on it's own
+    """
+    position: int = start
+    while position < end:
+        blockEnd: int = min(end, position + blockBytes)
+        if blockEnd < end:
+            blockEnd = buffer.rfind(b'\n', position, blockEnd) + 1
+        bids, consumed = _projectOrReject(buffer[position:blockEnd], blockEnd == end, delimiter, columns, rejects) if blockEnd > position else ([], 0)
+        if consumed == 0:
+            # A record longer than the block, so parse exactly that record
+            blockEnd = _recordEnd(buffer, position, end)
+            bids, consumed = _projectOrReject(buffer[position:blockEnd], True, delimiter, columns, rejects)
+        position += consumed
+        yield bids, position
+
+def _projectOrReject(block: bytes,
+                     endsRecord: bool,
+                     delimiter: str,
+                     columns: tuple[int],
+                     rejects: list[bytes] | None) -> tuple[list[tuple[int, str, str, float]], int]:
+    """
+    Parses a block, falling back to one record at a time to set malformed records aside
+    when rejects is given. Not meant to be called on it's own
+    """
+    if rejects is None:
+        return _projectBlock(block, endsRecord, delimiter, columns)
+    try:
+        return _projectBlock(block, endsRecord, delimiter, columns)
+    except (FileFormatError, ValueError):
+        pass
+    bids: list[tuple[int, str, str, float]] = []
+    position: int = 0
+    while position < len(block):
+        recordEnd: int = _recordEnd(block, position, len(block))
+        record: bytes = block[position:recordEnd]
+        if not endsRecord and record.count(b'"') % 2 == 1:
+            # The record runs past the block, so leave it for the next one
+            break
+        try:
+            bids.extend(_projectBlock(record, True, delimiter, columns)[0])
+        except (FileFormatError, ValueError):
+            rejects.append(record)
+        position = recordEnd
+    return bids, position
+
+def _projectBlock(block: bytes, endsRecord: bool, delimiter: str, columns: tuple[int]) -> tuple[list[tuple[int, str, str, float]], int]:
+    """
+    Parses the whole records in a block and returns them with the number of bytes they
+    take up. Not meant to be called on it's own
+    """
+    bidIdColumn, titleColumn, fundColumn, bidAmountColumn = columns
+    text: str = block.decode()
+    lines: list[str] = text.split('\n')
+    if not lines[-1]:
+        # The block ends in a newline, leaving an empty last item
+        lines.pop()
+    if '\r' in text:
+        # Text mode reads \r\n as \n, so do the same
+        lines = [line.removesuffix('\r') for line in lines]
+    quotes: int = text.count('"')
+    consumed: int = len(block)
+    if quotes % 2 == 1 and not endsRecord:
+        # The last record runs past the block, so stop after the last one that ends in it
+        wholeLines: int = 0
+        quotes = 0
+        for index, line in enumerate(lines):
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                wholeLines = index + 1
+        lines = lines[:wholeLines]
+        consumed = len(block) - len(block.split(b'\n', wholeLines)[-1]) if wholeLines else 0
+    quoted: list[str] = [line for line in lines if '"' in line] if quotes else []
+    try:
+        if len(quoted) * 2 > len(lines) or any(line.count('"') % 2 for line in quoted):
+            # Mostly quoted lines, or records spanning lines, which only the csv module can join
+            return [(int(row[bidIdColumn]), row[titleColumn], row[fundColumn], parseAmount(row[bidAmountColumn]))
+                    for row in csv.reader(io.StringIO('\n'.join(lines), newline=''), delimiter=delimiter) if row], consumed
+        # Each quoted line is a whole record, so one reader parses them in the same order as the lines
+        quotedRows: typing.Iterator[list[str]] = csv.reader(quoted, delimiter=delimiter)
+        lastColumn: int = max(columns)
+        return [(int(fields[bidIdColumn]), fields[titleColumn], fields[fundColumn], parseAmount(fields[bidAmountColumn]))
+                for line in lines if line
+                for fields in [next(quotedRows) if '"' in line else line.split(delimiter, lastColumn + 1)]], consumed
+    except IndexError:
+        raise FileFormatError("Record has fewer columns than the header") from None
+
+def _recordEnd(buffer: mmap.mmap | bytes, position: int, end: int) -> int:
+    """
+    Finds the offset just past the record starting at position, skipping newlines inside
+    quoted fields. Not meant to be called on it's own
+    """
+    quotes: int = 0
+    while True:
+        lineEnd: int = buffer.find(b'\n', position, end)
+        if lineEnd < 0:
+            return end
+        quotes += buffer[position:lineEnd].count(b'"')
+        if quotes % 2 == 0:
+            return lineEnd + 1
+        position = lineEnd + 1
+
+def countQuotes(csvPath: str, start: int, end: int) -> int:
+    """
+    Counts the quote characters in a byte range. Runs in a parser process
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    start: int
+        Offset of the range's first byte
+    end: int
+        Offset just past the range's last byte
+
+    Returns
+    -------
+    int
+        The number of '"' bytes in the range
+    """
+    quotes: int = 0
+    with open(csvPath, 'rb') as csvFile:
+        csvFile.seek(start)
+        while start < end:
+            block: bytes = csvFile.read(min(SCAN_BYTES, end - start))
+            if not block:
+                break
+            quotes += block.count(b'"')
+            start += len(block)
+    return quotes
+
+def findRecordStart(csvFile: typing.BinaryIO, offset: int, inQuotes: bool) -> int:
+    """
+    Finds the first record that starts at or after an offset. A newline only ends a
+    record when it isn't inside a quoted field, like the Inventory ID lists
+
+    Parameters
+    ----------
+    csvFile: BinaryIO
+        The CSV file, opened in binary mode
+    offset: int
+        Where to start looking
+    inQuotes: bool
+        Whether offset falls inside a quoted field
+
+    Returns
+    -------
+    int
+        The offset of the record's first byte, or the file size if there isn't one
+    """
+    csvFile.seek(offset - 1)
+    if csvFile.read(1) == b'\n' and not inQuotes:
+        return offset
+    position: int = offset
+    while True:
+        block: bytes = csvFile.read(SCAN_BYTES)
+        if not block:
+            return position
+        index: int = 0
+        while True:
+            # Inside quotes only the closing quote matters. Doubled quotes toggle twice, leaving the state unchanged
+            index = block.find(b'"', index) if inQuotes else _findAny(block, index)
+            if index < 0:
+                break
+            if block[index] == ord('"'):
+                inQuotes = not inQuotes
+            else:
+                return position + index + 1
+            index += 1
+        position += len(block)
+
+def _findAny(block: bytes, index: int) -> int:
+    """
+    Finds the next quote or newline in a block. Not meant to be called on it's own
+    """
+    quote: int = block.find(b'"', index)
+    newline: int = block.find(b'\n', index)
+    if quote < 0 or 0 <= newline < quote:
+        return newline
+    return quote
+
+def splitRecords(csvPath: str, executor: concurrent.futures.Executor, chunkBytes: int = CHUNK_BYTES) -> list[tuple[int, int]]:
+    """
+    Divides a CSV file into byte ranges that each hold whole records. The quotes in every
+    chunk are counted in parallel first, which tells whether each chunk starts inside a
+    quoted field
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of CSV file to split
+    executor: Executor
+        Runs the quote counts
+    chunkBytes: int (optional)
+        Approximate size of each range (default is CHUNK_BYTES)
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        The (start, end) offset of each range after the header
+    """
+    with open(csvPath, 'rb') as csvFile:
+        headerLine: bytes = csvFile.readline()
+        fileSize: int = os.fstat(csvFile.fileno()).st_size
+        starts: list[int] = list(range(len(headerLine), fileSize, chunkBytes))
+        counts: list[int] = list(executor.map(countQuotes, itertools.repeat(csvPath), starts, starts[1:] + [fileSize]))
+        recordStarts: list[int] = []
+        quotesBefore: int = headerLine.count(b'"')
+        for start, quotes in zip(starts, counts):
+            recordStarts.append(findRecordStart(csvFile, start, quotesBefore % 2 == 1))
+            quotesBefore += quotes
+    recordStarts.append(fileSize)
+    return [(start, end) for start, end in zip(recordStarts, recordStarts[1:]) if start < end]
+
+def parseRecords(csvPath: str, start: int, end: int, delimiter: str, columns: tuple[int]) -> list[tuple[int, str, str, float]]:
+    """
+    Parses the whole records in a byte range into bids. Runs in a parser process
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    start: int
+        Offset of the range's first record
+    end: int
+        Offset just past the range's last record
+    delimiter: str
+        The CSV delimiter
+    columns: tuple[int]
+        Positions of the Auction ID, Auction Title, Fund and Winning Bid columns
+
+    Returns
+    -------
+    list[tuple[int, str, str, float]]
+        The bids as (auctionID, auctionTitle, fund, winningBid)
+    """
+    with open(csvPath, 'rb') as csvFile, mmap.mmap(csvFile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return [bid for bids in projectRecords(buffer, start, end, delimiter, columns) for bid in bids]
+
+def readBatchesParallel(csvPath: str,
+                        workers: int | None = None,
+                        chunkBytes: int = CHUNK_BYTES,
+                        maxQueuedBatches: int = MAX_QUEUED_BATCHES) -> typing.Iterator[list[tuple[int, str, str, float]]]:
+    """
+    Yields the bids in a CSV file a chunk at a time, in file order, with the chunks parsed
+    by a pool of processes. Parsing pauses whenever maxQueuedBatches are waiting, so memory
+    stays at a few chunks however large the file is. A compressed file can't be split
+    without decompressing it, so it is read by readBatchesCompressed instead
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    workers: int | None (optional)
+        Number of parser processes. If None, one per CPU (default is None)
+    chunkBytes: int (optional)
+        Bytes parsed per batch (default is CHUNK_BYTES)
+    maxQueuedBatches: int (optional)
+        Parsed batches allowed to wait for the loader (default is MAX_QUEUED_BATCHES)
+
+    Returns
+    -------
+    Iterator[list[tuple[int, str, str, float]]]
+        Lists of bids as (auctionID, auctionTitle, fund, winningBid), in file order
+    """
+    if isCompressed(csvPath):
+        yield from readBatchesCompressed(csvPath)
+        return
+    workers = workers or os.cpu_count() or 1
+    batches: queue.Queue = queue.Queue(maxsize=maxQueuedBatches)
+    stopping: threading.Event = threading.Event()
+
+    def _feed() -> None:
+        # Keeps every parser busy without letting finished batches pile up past the queue
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                header, dialect = sniffFile(csvPath)
+                delimiter: str = dialect.delimiter
+                ranges: list[tuple[int, int]] = splitRecords(csvPath, executor, chunkBytes)
+                columns: tuple[int] = tuple(header.index(colName) for colName in BID_COLUMNS)
+                remaining: typing.Iterator[tuple[int, int]] = iter(ranges)
+                pending: list[concurrent.futures.Future] = [executor.submit(parseRecords, csvPath, start, end, delimiter, columns)
+                                                            for start, end in itertools.islice(remaining, workers)]
+                while pending and not stopping.is_set():
+                    batch: list[tuple[int, str, str, float]] = pending.pop(0).result()
+                    nextRange: tuple[int, int] | None = next(remaining, None)
+                    if nextRange is not None:
+                        pending.append(executor.submit(parseRecords, csvPath, *nextRange, delimiter, columns))
+                    while not stopping.is_set():
+                        try:
+                            batches.put(batch, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                for future in pending:
+                    future.cancel()
+            batches.put(None)
+        except Exception as error:
+            batches.put(error)
+
+    feeder: threading.Thread = threading.Thread(target=_feed, name='bidIngestFeeder', daemon=True)
+    feeder.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            yield batch
+    finally:
+        stopping.set()
+        # Let the feeder past a full queue so it can shut the parsers down
+        while feeder.is_alive():
+            try:
+                batches.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+def cachePath(csvPath: str, cacheDirectory: str | None = None) -> str:
+    """
+    Finds where the parsed columns of a CSV file are cached
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    cacheDirectory: str | None (optional)
+        Directory of cache files. If None, CACHE_DIRECTORY next to the CSV file (default is None)
+
+    Returns
+    -------
+    str
+        Path of the cache file
+    """
+    if cacheDirectory is None:
+        cacheDirectory = os.path.join(os.path.dirname(csvPath), CACHE_DIRECTORY)
+    # The same file name can be loaded from more than one directory into a shared cache directory
+    pathHash: str = hashlib.blake2b(os.path.abspath(csvPath).encode(), digest_size=8).hexdigest()
+    return os.path.join(cacheDirectory, f'{os.path.basename(csvPath)}.{pathHash}.bids')
+
+def fileDigest(csvPath: str) -> str:
+    """
+    Hashes the contents of a file
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the file
+
+    Returns
+    -------
+    str
+        The BLAKE2b digest in hex
+    """
+    digest = hashlib.blake2b()
+    with open(csvPath, 'rb') as csvFile:
+        while block := csvFile.read(SCAN_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+def readBatchesCached(csvPath: str,
+                      reader: typing.Callable[[str], typing.Iterator[list[tuple[int, str, str, float]]]] = readBatches,
+                      cacheDirectory: str | None = None) -> typing.Iterator[list[tuple[int, str, str, float]]]:
+    """
+    Yields the bids in a CSV file from the cache of its parsed columns, if the file's size,
+    modified time and content hash still match the cache. Otherwise the stale cache is
+    deleted and the file is parsed by reader, with the columns cached once every batch
+    has been read
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    reader: Callable[[str], Iterator[list[tuple[int, str, str, float]]]] (optional)
+        Parses the file when it isn't cached (default is readBatches)
+    cacheDirectory: str | None (optional)
+        Directory of cache files. If None, CACHE_DIRECTORY next to the CSV file (default is None)
+
+    Returns
+    -------
+    Iterator[list[tuple[int, str, str, float]]]
+        Lists of bids as (auctionID, auctionTitle, fund, winningBid), in file order
+    """
+    cacheFile: str = cachePath(csvPath, cacheDirectory)
+    before: os.stat_result = os.stat(csvPath)
+    digest: str = fileDigest(csvPath)
+    key: dict[str, typing.Any] = {'path': os.path.abspath(csvPath), 'size': before.st_size, 'mtimeNs': before.st_mtime_ns,
+                                  'digest': digest, 'byteOrder': sys.byteorder}
+    columns: tuple | None = _loadCache(cacheFile, key)
+    if columns is not None:
+        ids, amounts, fundCodes, titleEnds, titles, funds = columns
+        titleStarts = array.array('Q', [0]) + titleEnds[:-1]
+        for batchStart in range(0, len(ids), BATCH_ROWS):
+            rows: slice = slice(batchStart, batchStart + BATCH_ROWS)
+            yield [(auctionID, titles[titleStart:titleEnd], funds[fundCode], winningBid)
+                   for auctionID, titleStart, titleEnd, fundCode, winningBid
+                   in zip(ids[rows], titleStarts[rows], titleEnds[rows], fundCodes[rows], amounts[rows])]
+        return
+    if os.path.exists(cacheFile):
+        os.remove(cacheFile)
+    ids = array.array('q')
+    amounts = array.array('d')
+    fundCodes = array.array('I')
+    titleEnds = array.array('Q')
+    titleParts: list[str] = []
+    fundIds: dict[str, int] = {}
+    titleLength: int = 0
+    for batch in reader(csvPath):
+        for auctionID, auctionTitle, fund, winningBid in batch:
+            ids.append(auctionID)
+            amounts.append(winningBid)
+            fundCodes.append(fundIds.setdefault(fund, len(fundIds)))
+            titleLength += len(auctionTitle)
+            titleEnds.append(titleLength)
+        titleParts.append(''.join(record[1] for record in batch))
+        yield batch
+    after: os.stat_result = os.stat(csvPath)
+    if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+        # Changed while it was being read, so what was parsed may not match the digest
+        return
+    try:
+        _writeCache(cacheFile, key, (ids, amounts, fundCodes, titleEnds), ''.join(titleParts), list(fundIds))
+    except OSError as error:
+        print(f'Error encountered: {error}')
+        print(f'    Encounted while caching {csvPath}')
+
+def _loadCache(cacheFile: str, key: dict[str, typing.Any]) -> tuple | None:
+    """
+    Loads the columns cached for a file, or returns None if there aren't any or they are
+    stale. Not meant to be called on it's own
+    """
+    try:
+        with open(cacheFile, 'rb') as cache, mmap.mmap(cache.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+                return None
+            offset: int = len(CACHE_MAGIC) + 4
+            (metadataBytes,) = struct.unpack_from('<I', buffer, len(CACHE_MAGIC))
+            metadata: dict[str, typing.Any] = json.loads(buffer[offset:offset + metadataBytes])
+            if metadata['key'] != key:
+                return None
+            offset += metadataBytes
+            columns: list[array.array] = []
+            with memoryview(buffer) as view:
+                for typeCode in ('q', 'd', 'I', 'Q'):
+                    column = array.array(typeCode)
+                    # Each column starts on a multiple of 8 bytes
+                    offset += -offset % 8
+                    column.frombytes(view[offset:offset + metadata['rows'] * column.itemsize])
+                    offset += metadata['rows'] * column.itemsize
+                    columns.append(column)
+            if len(buffer) != offset + metadata['titleBytes']:
+                # Cut short, or written by something else
+                return None
+            titles: str = buffer[offset:].decode()
+            return (*columns, titles, metadata['funds'])
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, struct.error) as error:
+        print(f'Error encountered: {error}')
+        print(f'    Encounted while reading cache {cacheFile}')
+        return None
+
+def _writeCache(cacheFile: str, key: dict[str, typing.Any], columns: tuple[array.array], titles: str, funds: list[str]) -> None:
+    """
+    Writes parsed columns to a cache file, replacing it in one step so a reader never sees
+    half a file. Not meant to be called on it's own
+    """
+    os.makedirs(os.path.dirname(cacheFile) or '.', exist_ok=True)
+    titleBytes: bytes = titles.encode()
+    metadata: bytes = json.dumps({'key': key, 'rows': len(columns[0]), 'titleBytes': len(titleBytes), 'funds': funds}).encode()
+    temporaryFile: str = f'{cacheFile}.{os.getpid()}.tmp'
+    try:
+        with open(temporaryFile, 'wb') as cache:
+            cache.write(CACHE_MAGIC + struct.pack('<I', len(metadata)) + metadata)
+            for column in columns:
+                cache.write(bytes(-cache.tell() % 8))
+                column.tofile(cache)
+            cache.write(titleBytes)
+        os.replace(temporaryFile, cacheFile)
+    finally:
+        if os.path.exists(temporaryFile):
+            os.remove(temporaryFile)
+
+def rejectsPath(csvPath: str) -> str:
+    """
+    Finds where readBatchesResumable writes the malformed rows of a CSV file by default
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+
+    Returns
+    -------
+    str
+        The CSV file's path with _rejects added before the extension
+    """
+    root, extension = os.path.splitext(csvPath)
+    return f'{root}_rejects{extension or ".csv"}'
+
+def readBatchesResumable(csvPath: str,
+                         progress: dict[str, typing.Any] | None = None,
+                         rejectPath: str | None = None,
+                         batchRows: int = BATCH_ROWS,
+                         blockBytes: int = SCAN_BYTES) -> typing.Iterator[tuple[list[tuple[int, str, str, float]], dict[str, typing.Any]]]:
+    """
+    Yields the bids in a CSV file in batches, each with the progress made once it has been
+    loaded. Saving that progress along with the batch, and passing it back in after an
+    interruption, carries on from the first record not yet loaded. Malformed rows are
+    appended to a reject file, after the header, instead of stopping the load
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    progress: dict[str, Any] | None (optional)
+        Progress yielded with the last batch that was loaded. If None, the file is read
+        from the start (default is None)
+    rejectPath: str | None (optional)
+        Relative path of the reject file. If None, rejectsPath(csvPath) (default is None)
+    batchRows: int (optional)
+        Bids in a batch before it is handed over. Batches end between blocks, so may be a
+        little larger (default is BATCH_ROWS)
+    blockBytes: int (optional)
+        Bytes parsed at a time (default is SCAN_BYTES)
+
+    Returns
+    -------
+    Iterator[tuple[list[tuple[int, str, str, float]], dict[str, Any]]]
+        Each batch of bids as (auctionID, auctionTitle, fund, winningBid), in file order,
+        with the 'byteOffset' just past it, 'rowsLoaded' and 'rowsRejected' so far, the
+        'rejectBytes' written and an 'anchor' hash for checkpointMatches
+    """
+    if isCompressed(csvPath):
+        raise FileFormatError("Compressed files can't be resumed part way through, so decompress it first")
+    header, dialect = sniffFile(csvPath)
+    columns: tuple[int] = tuple(header.index(colName) for colName in BID_COLUMNS)
+    rejectPath = rejectPath or rejectsPath(csvPath)
+    progress = dict(progress or {'byteOffset': None, 'rowsLoaded': 0, 'rowsRejected': 0, 'rejectBytes': 0})
+    if os.path.exists(rejectPath):
+        # Anything after the saved size was rejected from batches that weren't loaded, so they are read again
+        with open(rejectPath, 'r+b') as rejectFile:
+            rejectFile.truncate(progress['rejectBytes'])
+    with open(csvPath, 'rb') as csvFile, mmap.mmap(csvFile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        headerEnd: int = _recordEnd(buffer, 0, len(buffer))
+        batch: list[tuple[int, str, str, float]] = []
+        rejects: list[bytes] = []
+        for bids, position in _projectBlocks(buffer, progress['byteOffset'] or headerEnd, len(buffer), dialect.delimiter, columns, blockBytes, rejects):
+            batch.extend(bids)
+            if len(batch) < batchRows and position < len(buffer):
+                continue
+            if rejects:
+                progress['rejectBytes'] = _writeRejects(rejectPath, buffer[:headerEnd], rejects)
+                progress['rowsRejected'] += len(rejects)
+                rejects.clear()
+            progress.update(byteOffset=position, rowsLoaded=progress['rowsLoaded'] + len(batch), anchor=_anchor(buffer, headerEnd, position))
+            yield batch, dict(progress)
+            batch = []
+
+def checkpointMatches(csvPath: str, progress: dict[str, typing.Any]) -> bool:
+    """
+    Checks that a CSV file still holds what it did when progress was saved, so loading can
+    carry on from there. Rows appended since don't matter
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    progress: dict[str, Any]
+        Progress yielded by readBatchesResumable
+
+    Returns
+    -------
+    bool
+        True if the header and the bytes just before the saved offset are unchanged
+    """
+    with open(csvPath, 'rb') as csvFile:
+        if os.fstat(csvFile.fileno()).st_size < progress['byteOffset']:
+            return False
+        with mmap.mmap(csvFile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _anchor(buffer, _recordEnd(buffer, 0, len(buffer)), progress['byteOffset']) == progress['anchor']
+
+def _anchor(buffer: mmap.mmap, headerEnd: int, position: int) -> str:
+    """
+    Hashes the header and the bytes just before position. Not meant to be called on it's own
+    """
+    return hashlib.blake2b(buffer[:headerEnd] + buffer[max(headerEnd, position - ANCHOR_BYTES):position], digest_size=16).hexdigest()
+
+def _writeRejects(rejectPath: str, headerLine: bytes, records: list[bytes]) -> int:
+    """
+    Appends malformed records to the reject file, starting it with the header, and returns
+    its size once they are safely on disk. Not meant to be called on it's own
+    """
+    with open(rejectPath, 'ab') as rejectFile:
+        if rejectFile.tell() == 0:
+            rejectFile.write(headerLine)
+        for record in records:
+            rejectFile.write(record if record.endswith(b'\n') else record + b'\n')
+        rejectFile.flush()
+        os.fsync(rejectFile.fileno())
+        return rejectFile.tell()
+
+def writeSnapshot(snapshotPath: str, progress: dict[str, typing.Any], records: typing.Iterable[tuple[int, str, str, float]]) -> None:
+    """
+    Writes every bid loaded so far with the progress of the load, replacing any earlier
+    snapshot in one step, so the bids and the progress always match
+
+    Parameters
+    ----------
+    snapshotPath: str
+        Relative path of the snapshot file
+    progress: dict[str, Any]
+        Progress yielded by readBatchesResumable with the last batch loaded
+    records: Iterable[tuple[int, str, str, float]]
+        The bids as (auctionID, auctionTitle, fund, winningBid)
+    """
+    temporaryFile: str = f'{snapshotPath}.{os.getpid()}.tmp'
+    try:
+        with open(temporaryFile, 'w', buffering=SCAN_BYTES) as snapshotFile:
+            snapshotFile.write(json.dumps(progress) + '\n')
+            for record in records:
+                snapshotFile.write(json.dumps(record) + '\n')
+            snapshotFile.flush()
+            os.fsync(snapshotFile.fileno())
+        os.replace(temporaryFile, snapshotPath)
+    finally:
+        if os.path.exists(temporaryFile):
+            os.remove(temporaryFile)
+
+def readSnapshot(snapshotPath: str) -> tuple[dict[str, typing.Any], list[tuple[int, str, str, float]]]:
+    """
+    Reads a snapshot written by writeSnapshot
+
+    Parameters
+    ----------
+    snapshotPath: str
+        Relative path of the snapshot file
+
+    Returns
+    -------
+    tuple[dict[str, Any], list[tuple[int, str, str, float]]]
+        The progress of the load and the bids loaded, in the order they were written
+    """
+    with open(snapshotPath) as snapshotFile:
+        progress: dict[str, typing.Any] = json.loads(snapshotFile.readline())
+        return progress, [tuple(json.loads(line)) for line in snapshotFile]
+
+def isBulkSource(source: typing.Any) -> bool:
+    """
+    Checks whether a source to load names several files, as a directory or a glob pattern
+
+    Parameters
+    ----------
+    source: Any
+        The path or open file to be loaded
+
+    Returns
+    -------
+    bool
+        True if source is a directory or contains *, ? or [
+    """
+    return isinstance(source, str) and (os.path.isdir(source) or any(character in source for character in '*?['))
+
+def expandSources(pattern: str) -> list[str]:
+    """
+    Lists the CSV files in a directory, or the files matching a glob pattern, oldest first
+
+    Parameters
+    ----------
+    pattern: str
+        A directory, whose files ending in CSV_EXTENSIONS are listed, or a glob pattern
+
+    Returns
+    -------
+    list[str]
+        The files' paths, by modified time and then by name
+    """
+    if os.path.isdir(pattern):
+        paths: list[str] = [os.path.join(pattern, name) for name in os.listdir(pattern) if name.lower().endswith(CSV_EXTENSIONS)]
+    else:
+        paths = glob.glob(pattern)
+    return sorted((path for path in paths if os.path.isfile(path)), key=lambda path: (os.path.getmtime(path), path))
+
+def parseRun(csvPath: str, runPath: str, cached: bool = True, memoryBytes: int = SORT_MEMORY_BYTES) -> dict[str, typing.Any]:
+    """
+    Sorts the bids in a CSV file by auction ID into a run file for mergeRuns, with
+    sortByAuctionId holding no more than memoryBytes of them at once. Bids with the same ID
+    stay in file order
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    runPath: str
+        Path of the run file written. A file too big for memoryBytes is sorted in runs
+        written to the same directory
+    cached: bool (optional)
+        Read the file through readBatchesCached (default is True)
+    memoryBytes: int (optional)
+        Memory allowed for the bids being sorted (default is SORT_MEMORY_BYTES)
+
+    Returns
+    -------
+    dict[str, Any]
+        The file's 'path', 'rows', 'bytes' and parse 'seconds'
+    """
+    startTime: float = time.perf_counter()
+    records: typing.Iterator[tuple] = itertools.chain.from_iterable(readBatchesCached(csvPath) if cached else readBatches(csvPath))
+    sortStats: dict[str, int] = {}
+    _dumpRun(sortByAuctionId(records, memoryBytes, os.path.dirname(runPath), sortStats), runPath)
+    return {'path': csvPath, 'rows': sortStats['records'], 'bytes': os.path.getsize(csvPath), 'seconds': time.perf_counter() - startTime}
+
+def mergeFiles(paths: list[str],
+               policy: str = 'latest',
+               workers: int | None = None,
+               cached: bool = True,
+               memoryBytes: int = SORT_MEMORY_BYTES,
+               tempDirectory: str | None = None,
+               stats: list[dict[str, typing.Any]] | None = None) -> typing.Iterator[tuple[int, str, str, float]]:
+    """
+    Parses several CSV files at once, one per process, into runs sorted by auction ID and
+    written to temporary files, then merges the runs with mergeRuns. Only a batch of each
+    run is read back at a time, so memory doesn't depend on the size of the files
+
+    Parameters
+    ----------
+    paths: list[str]
+        Relative paths of the CSV files, oldest first
+    policy: str (optional)
+        'latest' keeps the bid from the last file holding the ID, 'first' the bid from the
+        first (default is 'latest')
+    workers: int | None (optional)
+        Number of parser processes. If None, one per CPU, and with one the files are
+        parsed on the calling process (default is None)
+    cached: bool (optional)
+        Read each file through readBatchesCached (default is True)
+    memoryBytes: int (optional)
+        Memory allowed for the bids being sorted, shared between the processes (default is SORT_MEMORY_BYTES)
+    tempDirectory: str | None (optional)
+        Where the runs are written. If None, the system's temporary directory (default is None)
+    stats: list[dict[str, Any]] | None (optional)
+        If given, the statistics parseRun gave for each file are added to it, in paths
+        order, before the first bid is yielded (default is None)
+
+    Returns
+    -------
+    Iterator[tuple[int, str, str, float]]
+        Bids as (auctionID, auctionTitle, fund, winningBid), by auction ID
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Duplicate policy must be one of {DUPLICATE_POLICIES}, not {policy!r}")
+    workers = max(min(workers or os.cpu_count() or 1, len(paths)), 1)
+    with tempfile.TemporaryDirectory(prefix='bidMerge', dir=tempDirectory) as runDirectory:
+        runPaths: list[str] = [os.path.join(runDirectory, f'file{index}') for index in range(len(paths))]
+        if workers <= 1:
+            fileStats: list[dict[str, typing.Any]] = [parseRun(path, runPath, cached, memoryBytes) for path, runPath in zip(paths, runPaths)]
+        else:
+            # Each process sorts one file at a time, so between them they stay within memoryBytes
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                fileStats = list(executor.map(parseRun, paths, runPaths, itertools.repeat(cached), itertools.repeat(memoryBytes // workers)))
+        if stats is not None:
+            stats.extend(fileStats)
+        yield from mergeRuns([_readRun(runPath) for runPath in runPaths], policy)
+
+def mergeRuns(runs: list[typing.Iterable[tuple[int, str, str, float]]], policy: str = 'latest') -> typing.Iterator[tuple[int, str, str, float]]:
+    """
+    Merges runs sorted by auction ID into one stream in a single pass, keeping one bid per
+    auction ID
+
+    Parameters
+    ----------
+    runs: list[Iterable[tuple[int, str, str, float]]]
+        Bids of each file sorted by auction ID, oldest file first
+    policy: str (optional)
+        'latest' keeps the bid from the last run holding the ID, 'first' the bid from the
+        first (default is 'latest')
+
+    Returns
+    -------
+    Iterator[tuple[int, str, str, float]]
+        Bids as (auctionID, auctionTitle, fund, winningBid), by auction ID
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Duplicate policy must be one of {DUPLICATE_POLICIES}, not {policy!r}")
+    # heapq.merge hands back equal IDs in the order of the runs, so copies come out oldest first
+    for _, copies in itertools.groupby(heapq.merge(*runs, key=operator.itemgetter(0)), key=operator.itemgetter(0)):
+        record: tuple[int, str, str, float] = next(copies)
+        if policy == 'latest':
+            for record in copies:
+                pass
+        yield record
+
+def reportThroughput(stats: list[dict[str, typing.Any]], loaded: int, seconds: float) -> None:
+    """
+    Prints the rows and megabytes per second of each file parsed by mergeFiles, and of the
+    whole load
+
+    Parameters
+    ----------
+    stats: list[dict[str, Any]]
+        The statistics mergeFiles gave for each file
+    loaded: int
+        Bids left after duplicates were dropped
+    seconds: float
+        Time taken by the whole load, including merging and inserting
+    """
+    for fileStats in stats:
+        fileSeconds: float = max(fileStats['seconds'], 1e-9)
+        print(f"  {fileStats['path']}: {fileStats['rows']:,} rows in {fileSeconds:.2f} s, "
+              f"{fileStats['rows'] / fileSeconds:,.0f} rows/s, {fileStats['bytes'] / fileSeconds / 1e6:,.1f} MB/s")
+    rows: int = sum(fileStats['rows'] for fileStats in stats)
+    totalBytes: int = sum(fileStats['bytes'] for fileStats in stats)
+    seconds = max(seconds, 1e-9)
+    print(f"{len(stats)} files, {rows:,} rows, {loaded:,} bids loaded in {seconds:.2f} s, "
+          f"{rows / seconds:,.0f} rows/s, {totalBytes / seconds / 1e6:,.1f} MB/s")
+
+def followStart(csvPath: str, fromEnd: bool = True) -> dict[str, typing.Any]:
+    """
+    Reads the header of a CSV file to be followed and picks where following starts
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    fromEnd: bool (optional)
+        Start after the last whole line already in the file, so only rows appended from now
+        on are read. If False, start after the header (default is True)
+
+    Returns
+    -------
+    dict[str, Any]
+        The 'byteOffset' to read from, the 'header' row and its 'headerLine' as written,
+        the 'delimiter', the file's 'inode', and 'rowsLoaded' and 'rowsRejected' set to 0
+    """
+    if isCompressed(csvPath):
+        raise FileFormatError("Compressed files can't be appended to, so can't be followed")
+    header, dialect = sniffFile(csvPath)
+    with open(csvPath, 'rb') as csvFile:
+        contents: bytes = csvFile.read(SCAN_BYTES)
+        headerEnd: int = _recordEnd(contents, 0, len(contents))
+        byteOffset: int = headerEnd
+        size: int = os.fstat(csvFile.fileno()).st_size
+        if fromEnd and size > headerEnd:
+            # A row still being written is left to be read once it is finished
+            csvFile.seek(max(headerEnd, size - SCAN_BYTES))
+            tail: bytes = csvFile.read()
+            byteOffset = max(headerEnd, size - len(tail) + tail.rfind(b'\n') + 1)
+        return {'byteOffset': byteOffset, 'header': header, 'headerLine': contents[:headerEnd].decode(), 'delimiter': dialect.delimiter,
+                'inode': os.fstat(csvFile.fileno()).st_ino, 'rowsLoaded': 0, 'rowsRejected': 0}
+
+def followBatches(csvPath: str,
+                  state: dict[str, typing.Any] | None = None,
+                  pollSeconds: float = FOLLOW_POLL_SECONDS,
+                  stopping: threading.Event | None = None,
+                  rejectPath: str | None = None) -> typing.Iterator[tuple[list[tuple[int, str, str, float]], dict[str, typing.Any]]]:
+    """
+    Yields the bids appended to a CSV file as they are written, until stopping is set. Only
+    whole rows are read, so a row still being written waits for its newline. On Linux the
+    file is watched with inotify so appends are read at once, and it is also checked every
+    pollSeconds. A file that is truncated or replaced, as when a feed starts a new month,
+    is followed again from its header. Malformed rows are appended to a reject file
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file
+    state: dict[str, Any] | None (optional)
+        State from followStart, or yielded with the last batch. If None, followStart(csvPath)
+        once iteration begins, so rows appended before then are skipped (default is None)
+    pollSeconds: float (optional)
+        Longest wait between checks of the file (default is FOLLOW_POLL_SECONDS)
+    stopping: threading.Event | None (optional)
+        Set to stop following. If None, following only stops when the iterator is closed
+        (default is None)
+    rejectPath: str | None (optional)
+        Relative path of the reject file. If None, rejectsPath(csvPath) (default is None)
+
+    Returns
+    -------
+    Iterator[tuple[list[tuple[int, str, str, float]], dict[str, Any]]]
+        Each batch of appended bids as (auctionID, auctionTitle, fund, winningBid), in file
+        order, with the state to carry on from after it
+    """
+    state = dict(state or followStart(csvPath))
+    rejectPath = rejectPath or rejectsPath(csvPath)
+    columns: tuple[int] = tuple(state['header'].index(colName) for colName in BID_COLUMNS)
+    watcher: _FileWatcher = _FileWatcher(csvPath)
+    try:
+        while stopping is None or not stopping.is_set():
+            try:
+                stat: os.stat_result = os.stat(csvPath)
+            except FileNotFoundError:
+                # Being replaced, so look again shortly
+                watcher.wait(pollSeconds, stopping)
+                continue
+            if stat.st_ino != state['inode'] or stat.st_size < state['byteOffset']:
+                state.update({key: value for key, value in followStart(csvPath, fromEnd=False).items() if key not in ('rowsLoaded', 'rowsRejected')})
+                columns = tuple(state['header'].index(colName) for colName in BID_COLUMNS)
+                watcher.close()
+                watcher = _FileWatcher(csvPath)
+            available: int = stat.st_size - state['byteOffset']
+            appended: bytes = _readAppended(csvPath, state['byteOffset'], min(available, CHUNK_BYTES)) if available > 0 else b''
+            rejects: list[bytes] = []
+            bids, consumed = _projectOrReject(appended[:appended.rfind(b'\n') + 1], False, state['delimiter'], columns, rejects)
+            if consumed == 0 and len(appended) < available:
+                # One record is longer than a chunk, so read all that has been appended
+                appended = _readAppended(csvPath, state['byteOffset'], available)
+                bids, consumed = _projectOrReject(appended[:appended.rfind(b'\n') + 1], False, state['delimiter'], columns, rejects)
+            if consumed == 0:
+                watcher.wait(pollSeconds, stopping)
+                continue
+            if rejects:
+                _writeRejects(rejectPath, state['headerLine'].encode(), rejects)
+            state.update(byteOffset=state['byteOffset'] + consumed, rowsLoaded=state['rowsLoaded'] + len(bids),
+                         rowsRejected=state['rowsRejected'] + len(rejects))
+            yield bids, dict(state)
+    finally:
+        watcher.close()
+
+def _readAppended(csvPath: str, offset: int, size: int) -> bytes:
+    """
+    Reads size bytes of a file from offset. Not meant to be called on it's own
+    """
+    with open(csvPath, 'rb') as csvFile:
+        csvFile.seek(offset)
+        return csvFile.read(size)
+
+class _FileWatcher:
+    """
+    Waits for a file to change, using inotify where it is available and sleeping otherwise.
+    Not meant to be used on it's own
+    """
+    def __init__(self, path: str) -> None:
+        self.descriptor: int = -1
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            libc: ctypes.CDLL = ctypes.CDLL(None, use_errno=True)
+            descriptor: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if descriptor >= 0 and libc.inotify_add_watch(descriptor, os.fsencode(path), INOTIFY_EVENTS) >= 0:
+            self.descriptor = descriptor
+        elif descriptor >= 0:
+            os.close(descriptor)
+
+    def wait(self, timeout: float, stopping: threading.Event | None = None) -> None:
+        """
+        Returns once the file changes, stopping is set, or timeout seconds have passed
+        """
+        deadline: float = time.monotonic() + timeout
+        # Wait a tenth of a second at a time so a stop is noticed quickly
+        while (remaining := deadline - time.monotonic()) > 0 and not (stopping is not None and stopping.is_set()):
+            if self.descriptor < 0:
+                time.sleep(min(remaining, 0.1))
+            elif select.select([self.descriptor], [], [], min(remaining, 0.1))[0]:
+                # Read every waiting event so the next wait only wakes for new ones
+                with contextlib.suppress(BlockingIOError):
+                    while os.read(self.descriptor, 4096):
+                        pass
+                return
+
+    def close(self) -> None:
+        """
+        Stops watching the file
+        """
+        if self.descriptor >= 0:
+            os.close(self.descriptor)
+            self.descriptor = -1
+
+class BidFollower:
+    """
+    Follows a CSV file with followBatches on a background thread. The bids appended to it
+    are kept until the thread that owns the tree or database collects them with pending,
+    since neither can be written from two threads
+
+    Attributes
+    ----------
+    csvPath: str
+        The file being followed
+    state: dict[str, Any]
+        The followBatches state of the bids collected so far, such as 'rowsLoaded'
+    """
+    def __init__(self, csvPath: str, fromEnd: bool = True, pollSeconds: float = FOLLOW_POLL_SECONDS) -> None:
+        """
+        Initializer for the BidFollower class. Reads the header and starts following
+
+        Parameters
+        ----------
+        csvPath: str
+            Relative path of the CSV file
+        fromEnd: bool (optional)
+            Only follow rows appended from now on. If False, every row in the file is
+            collected first (default is True)
+        pollSeconds: float (optional)
+            Longest wait between checks of the file (default is FOLLOW_POLL_SECONDS)
+        """
+        self.csvPath: str = csvPath
+        self.state: dict[str, typing.Any] = followStart(csvPath, fromEnd)
+        # Queue of (batch, state) pairs, or (error, None) if following failed
+        self._batches: queue.SimpleQueue = queue.SimpleQueue()
+        self._stopping: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(target=self._follow, args=(pollSeconds,), name='bidIngestFollower', daemon=True)
+        self._thread.start()
+
+    def _follow(self, pollSeconds: float) -> None:
+        """
+        Runs on the background thread. Not meant to be called on it's own
+        """
+        try:
+            for batch, state in followBatches(self.csvPath, self.state, pollSeconds, self._stopping):
+                self._batches.put((batch, state))
+        except Exception as error:
+            self._batches.put((error, None))
+
+    def pending(self) -> list[tuple[int, str, str, float]]:
+        """
+        Collects the bids appended since the last call, without waiting
+
+        Returns
+        -------
+        list[tuple[int, str, str, float]]
+            Bids as (auctionID, auctionTitle, fund, winningBid), in file order
+        """
+        bids: list[tuple[int, str, str, float]] = []
+        while True:
+            try:
+                batch, state = self._batches.get_nowait()
+            except queue.Empty:
+                return bids
+            if isinstance(batch, Exception):
+                raise batch
+            bids.extend(batch)
+            self.state = state
+
+    def stop(self) -> None:
+        """
+        Stops following and waits for the background thread to finish
+        """
+        self._stopping.set()
+        self._thread.join()
+
+def sortByAuctionId(records: typing.Iterable[tuple],
+                    memoryBytes: int = SORT_MEMORY_BYTES,
+                    tempDirectory: str | None = None,
+                    stats: dict[str, int] | None = None) -> typing.Iterator[tuple]:
+    """
+    Yields records by their first item, the auction ID, holding at most memoryBytes of them
+    and a batch from each run in memory. Records are collected until they fill memoryBytes,
+    sorted and written to a temporary file as a run, and the runs are merged with
+    heapq.merge. Records with the same ID stay in the order they came in. Every sort by
+    auction ID in this module goes through here
+
+    Parameters
+    ----------
+    records: Iterable[tuple]
+        The records to sort, each starting with its auction ID. The strings in them are
+        what is counted against memoryBytes
+    memoryBytes: int (optional)
+        Memory allowed for the records of one run (default is SORT_MEMORY_BYTES)
+    tempDirectory: str | None (optional)
+        Where the runs are written. If None, the system's temporary directory (default is None)
+    stats: dict[str, int] | None (optional)
+        If given, filled with the number of 'records' and of 'runs' they were sorted in
+        before the first record is yielded (default is None)
+
+    Returns
+    -------
+    Iterator[tuple]
+        The records, by auction ID
+    """
+    with tempfile.TemporaryDirectory(prefix='bidSort', dir=tempDirectory) as runDirectory:
+        runPaths: list[str] = []
+        run: list[tuple] = []
+        runBytes: int = 0
+        count: int = 0
+        for record in records:
+            run.append(record)
+            count += 1
+            runBytes += SORT_RECORD_OVERHEAD + sum(sys.getsizeof(field) for field in record if isinstance(field, str))
+            if runBytes >= memoryBytes:
+                runPaths.append(_writeRun(run, os.path.join(runDirectory, f'run{len(runPaths)}')))
+                run, runBytes = [], 0
+        run.sort(key=operator.itemgetter(0))
+        if stats is not None:
+            stats.update(records=count, runs=len(runPaths) + bool(run))
+        # The last run stays in memory and comes last, so equal IDs still merge in the order they came in
+        yield from heapq.merge(*(_readRun(runPath) for runPath in runPaths), run, key=operator.itemgetter(0))
+
+def sortedRecords(source: str | typing.TextIO,
+                  memoryBytes: int = SORT_MEMORY_BYTES,
+                  tempDirectory: str | None = None) -> typing.Iterator[tuple[int, str, str, float]]:
+    """
+    Yields the bids in a CSV file by auction ID, with sortByAuctionId sorting any file too
+    big for memoryBytes on disk. Bids with the same ID stay in file order
+
+    Parameters
+    ----------
+    source: str | TextIO
+        Relative path of the CSV file, or a file already open in text mode
+    memoryBytes: int (optional)
+        Memory allowed for the bids of one run (default is SORT_MEMORY_BYTES)
+    tempDirectory: str | None (optional)
+        Where the runs are written. If None, the system's temporary directory (default is None)
+
+    Returns
+    -------
+    Iterator[tuple[int, str, str, float]]
+        Bids as (auctionID, auctionTitle, fund, winningBid), by auction ID
+    """
+    yield from sortByAuctionId(itertools.chain.from_iterable(readBatches(source)), memoryBytes, tempDirectory)
+
+def _writeRun(run: list[tuple], runPath: str) -> str:
+    """
+    Sorts a run by auction ID and writes it to a file a batch at a time. Not meant to be
+    called on it's own
+    """
+    run.sort(key=operator.itemgetter(0))
+    return _dumpRun(run, runPath)
+
+def _dumpRun(records: typing.Iterable[tuple], runPath: str) -> str:
+    """
+    Writes records already in order to a run file a batch at a time. Not meant to be
+    called on it's own
+    """
+    records = iter(records)
+    with open(runPath, 'wb') as runFile:
+        while batch := list(itertools.islice(records, BATCH_ROWS)):
+            pickle.dump(batch, runFile, pickle.HIGHEST_PROTOCOL)
+    return runPath
+
+def _readRun(runPath: str) -> typing.Iterator[tuple]:
+    """
+    Reads back a run written by _writeRun a batch at a time. Not meant to be called on it's own
+    """
+    with open(runPath, 'rb') as runFile:
+        while True:
+            try:
+                yield from pickle.load(runFile)
+            except EOFError:
+                return
+
+def diffRecords(oldPath: str, newPath: str, memoryBytes: int = SORT_MEMORY_BYTES) -> typing.Iterator[tuple[str, tuple[int, str, str, float]]]:
+    """
+    Compares two exports by auction ID in a single pass over both, read in ID order with
+    sortedRecords, so memory doesn't depend on the size of either. Where an export holds
+    an ID more than once its first bid is used, as a load ignoring duplicates would
+
+    Parameters
+    ----------
+    oldPath: str
+        Relative path of the earlier CSV export
+    newPath: str
+        Relative path of the later CSV export
+    memoryBytes: int (optional)
+        Memory allowed for the bids of one run, for each file (default is SORT_MEMORY_BYTES)
+
+    Returns
+    -------
+    Iterator[tuple[str, tuple[int, str, str, float]]]
+        ('insert', bid) for auction IDs only in the new export, ('update', bid) for IDs
+        whose bid differs, with the new bid, and ('delete', bid) for IDs only in the old
+        export, with the old bid. By auction ID
+    """
+    firstCopies: typing.Callable = lambda records: (next(copies) for _, copies in itertools.groupby(records, key=operator.itemgetter(0)))
+    oldRecords: typing.Iterator[tuple] = firstCopies(sortedRecords(oldPath, memoryBytes))
+    newRecords: typing.Iterator[tuple] = firstCopies(sortedRecords(newPath, memoryBytes))
+    oldRecord: tuple | None = next(oldRecords, None)
+    newRecord: tuple | None = next(newRecords, None)
+    while oldRecord is not None or newRecord is not None:
+        if newRecord is None or (oldRecord is not None and oldRecord[0] < newRecord[0]):
+            yield 'delete', oldRecord
+            oldRecord = next(oldRecords, None)
+        elif oldRecord is None or newRecord[0] < oldRecord[0]:
+            yield 'insert', newRecord
+            newRecord = next(newRecords, None)
+        else:
+            if newRecord != oldRecord:
+                yield 'update', newRecord
+            oldRecord, newRecord = next(oldRecords, None), next(newRecords, None)
+
+def diffBatches(oldPath: str,
+                newPath: str,
+                batchRows: int = BATCH_ROWS,
+                memoryBytes: int = SORT_MEMORY_BYTES) -> typing.Iterator[dict[str, list[tuple[int, str, str, float]]]]:
+    """
+    Groups the changes from diffRecords into change sets small enough to apply as one batch
+
+    Parameters
+    ----------
+    oldPath: str
+        Relative path of the earlier CSV export
+    newPath: str
+        Relative path of the later CSV export
+    batchRows: int (optional)
+        The most changes in a change set (default is BATCH_ROWS)
+    memoryBytes: int (optional)
+        Memory allowed for the bids of one run, for each file (default is SORT_MEMORY_BYTES)
+
+    Returns
+    -------
+    Iterator[dict[str, list[tuple[int, str, str, float]]]]
+        Change sets of 'insert', 'update' and 'delete' bids, as diffRecords gives them
+    """
+    changes: typing.Iterator[tuple[str, tuple]] = diffRecords(oldPath, newPath, memoryBytes)
+    while changeSet := list(itertools.islice(changes, batchRows)):
+        grouped: dict[str, list[tuple[int, str, str, float]]] = {'insert': [], 'update': [], 'delete': []}
+        for change, record in changeSet:
+            grouped[change].append(record)
+        yield grouped
+
+def readBatchesSorted(source: str | typing.TextIO,
+                      batchRows: int = BATCH_ROWS,
+                      memoryBytes: int = SORT_MEMORY_BYTES,
+                      tempDirectory: str | None = None) -> typing.Iterator[list[tuple[int, str, str, float]]]:
+    """
+    Yields the bids in a CSV file in batches, in auction ID order, with sortedRecords sorting
+    any file too big to sort in memory on disk
+
+    Parameters
+    ----------
+    source: str | TextIO
+        Relative path of the CSV file, or a file already open in text mode
+    batchRows: int (optional)
+        The most bids in a batch (default is BATCH_ROWS)
+    memoryBytes: int (optional)
+        Memory allowed for the bids of one run (default is SORT_MEMORY_BYTES)
+    tempDirectory: str | None (optional)
+        Where the runs are written. If None, the system's temporary directory (default is None)
+
+    Returns
+    -------
+    Iterator[list[tuple[int, str, str, float]]]
+        Lists of bids as (auctionID, auctionTitle, fund, winningBid), by auction ID
+    """
+    records: typing.Iterator[tuple[int, str, str, float]] = sortedRecords(source, memoryBytes, tempDirectory)
+    while batch := list(itertools.islice(records, batchRows)):
+        yield batch
+
+def sortCsv(csvPath: str,
+            outputPath: str,
+            memoryBytes: int = SORT_MEMORY_BYTES,
+            tempDirectory: str | None = None) -> dict[str, int]:
+    """
+    Writes a copy of a CSV file with its records in auction ID order, for files bigger than
+    memory, using sortByAuctionId. Every column and the header are kept exactly as written,
+    and records with the same ID stay in file order. Either path may end in .gz, .bz2 or .xz
+    to be read or written compressed
+
+    Parameters
+    ----------
+    csvPath: str
+        Relative path of the CSV file to sort
+    outputPath: str
+        Relative path of the sorted file. It only appears once it is complete
+    memoryBytes: int (optional)
+        Memory allowed for the records of one run (default is SORT_MEMORY_BYTES)
+    tempDirectory: str | None (optional)
+        Where the runs are written. If None, the system's temporary directory (default is None)
+
+    Returns
+    -------
+    dict[str, int]
+        The number of 'records' written and of 'runs' they were sorted in
+    """
+    header, dialect = sniffFile(csvPath)
+    bidIdColumn: int = header.index(BID_COLUMNS[0])
+    delimiter: str = dialect.delimiter
+    opener: typing.Callable[..., typing.IO] = COMPRESSED_OPENERS[os.path.splitext(outputPath)[1].lower()] if isCompressed(outputPath) else open
+    temporaryFile: str = f'{outputPath}.{os.getpid()}.tmp'
+    records: typing.Iterator[str] = _rawRecords(csvPath)
+    headerLine: str = next(records)
+    # A last record without a line ending gets the header's, so it can be written mid file
+    lineEnding: str = headerLine[len(headerLine.rstrip('\r\n')):] or '\n'
+
+    def _keyed() -> typing.Iterator[tuple[int, str]]:
+        for record in records:
+            if not record.strip():
+                continue
+            fields: list[str] = next(csv.reader([record], dialect)) if '"' in record else record.split(delimiter, bidIdColumn + 1)
+            try:
+                auctionID: int = int(fields[bidIdColumn])
+            except (IndexError, ValueError):
+                raise FileFormatError(f"Record has no Auction ID: {record.strip()[:80]}") from None
+            yield auctionID, record if record.endswith('\n') else record + lineEnding
+
+    stats: dict[str, int] = {'records': 0, 'runs': 0}
+    try:
+        with opener(temporaryFile, 'wt', newline='') as outputFile:
+            outputFile.write(headerLine)
+            for _, record in sortByAuctionId(_keyed(), memoryBytes, tempDirectory, stats):
+                outputFile.write(record)
+        os.replace(temporaryFile, outputPath)
+    finally:
+        records.close()
+        if os.path.exists(temporaryFile):
+            os.remove(temporaryFile)
+    return stats
+
+def _rawRecords(csvPath: str) -> typing.Iterator[str]:
+    """
+    Yields each record of a CSV file, header first, exactly as written with its line ending.
+    A record spanning lines is yielded whole. Not meant to be called on it's own
+    """
+    with (COMPRESSED_OPENERS[os.path.splitext(csvPath)[1].lower()](csvPath, 'rt', newline='') if isCompressed(csvPath)
+          else open(csvPath, newline='')) as csvFile:
+        parts: list[str] = []
+        quotes: int = 0
+        for line in csvFile:
+            parts.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                yield ''.join(parts)
+                parts, quotes = [], 0
+        if parts:
+            yield ''.join(parts)
+
+def openExportFile(path: str) -> typing.TextIO:
+    """
+    Opens a text file for exporting, compressing on the fly when the path ends in
+    .gz, .bz2 or .xz
+
+    Parameters
+    ----------
+    path: str
+        Relative path of the file to write
+
+    Returns
+    -------
+    TextIO
+        A buffered text writer
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', compresslevel=6, newline='')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'wt', newline='')
+    if path.endswith('.xz'):
+        return lzma.open(path, 'wt', newline='')
+    return open(path, 'w', newline='', buffering=EXPORT_BUFFER_BYTES)
+
+def isJsonl(path: str) -> bool:
+    """
+    Tells whether an export path names a JSON Lines file rather than a CSV file
+
+    Parameters
+    ----------
+    path: str
+        Relative path of the export, which may end in .gz, .bz2 or .xz
+
+    Returns
+    -------
+    bool
+        True if the name ends in .jsonl before any compression extension
+    """
+    basePath, extension = os.path.splitext(path.lower())
+    if extension in COMPRESSED_OPENERS:
+        extension = os.path.splitext(basePath)[1]
+    return extension == '.jsonl'
+
+def exportCsv(records: typing.Iterable[tuple], path: str, columns: tuple[str] = EXPORT_COLUMNS) -> int:
+    """
+    Streams records to a CSV file with a header row, a batch at a time, so no copy of
+    the data is made
+
+    Parameters
+    ----------
+    records: Iterable[tuple]
+        The records to write, in the order to write them
+    path: str
+        Relative path of the file to write. Ending it in .gz, .bz2 or .xz compresses the file
+    columns: tuple[str] (optional)
+        The header row, naming each field of a record (default is EXPORT_COLUMNS)
+
+    Returns
+    -------
+    int
+        The number of records exported
+    """
+    exported: int = 0
+    records = iter(records)
+    with openExportFile(path) as exportFile:
+        csvWriter = csv.writer(exportFile)
+        csvWriter.writerow(columns)
+        while batch := list(itertools.islice(records, BATCH_ROWS)):
+            csvWriter.writerows(batch)
+            exported += len(batch)
+    return exported
+
+def exportJsonl(records: typing.Iterable[tuple], path: str, columns: tuple[str] = EXPORT_COLUMNS) -> int:
+    """
+    Streams records to a JSON Lines file, one object per record keyed by column name,
+    a batch at a time so no copy of the data is made
+
+    Parameters
+    ----------
+    records: Iterable[tuple]
+        The records to write, in the order to write them
+    path: str
+        Relative path of the file to write. Ending it in .gz, .bz2 or .xz compresses the file
+    columns: tuple[str] (optional)
+        The key of each field of a record (default is EXPORT_COLUMNS)
+
+    Returns
+    -------
+    int
+        The number of records exported
+    """
+    exported: int = 0
+    records = iter(records)
+    with openExportFile(path) as exportFile:
+        while batch := list(itertools.islice(records, BATCH_ROWS)):
+            # One write per batch rather than per line keeps the writer's call overhead down
+            exportFile.write(''.join(json.dumps(dict(zip(columns, record))) + '\n' for record in batch))
+            exported += len(batch)
+    return exported
+
+def exportRecords(records: typing.Iterable[tuple], path: str, columns: tuple[str] = EXPORT_COLUMNS) -> int:
+    """
+    Streams records to a JSON Lines file when the path names one (see isJsonl), or to a
+    CSV file otherwise. Takes the same arguments as exportCsv
+
+    Returns
+    -------
+    int
+        The number of records exported
+    """
+    return (exportJsonl if isJsonl(path) else exportCsv)(records, path, columns)
+
+if __name__ == '__main__':
+    # Usage: python bidIngest.py [input CSV] [sorted output CSV] [memory MiB]
+    # Sorts an export by Auction ID, for files bigger than memory
+    if len(sys.argv) < 3:
+        print('Usage: python bidIngest.py [input CSV] [sorted output CSV] [memory MiB]')
+        sys.exit(1)
+    startTime: float = time.perf_counter()
+    sortStats: dict[str, int] = sortCsv(sys.argv[1], sys.argv[2], int(sys.argv[3]) << 20 if len(sys.argv) > 3 else SORT_MEMORY_BYTES)
+    print(f"{sortStats['records']:,} records sorted in {sortStats['runs']} runs in {time.perf_counter() - startTime:.2f} s")
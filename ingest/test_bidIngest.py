@@ -0,0 +1,373 @@
+#=======================================================================================
+# Name        : test_bidIngest.py
+# Author      : Quintin B. Rozelle
+# Version     : 1.0
+# Date        : 2025-06-02
+# Description : Test of bidIngest module
+#=======================================================================================
+
+import unittest
+import bidIngest
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import shutil
+import threading
+import time
+
+class NonSeekableFile(io.StringIO):
+    # Behaves like a pipe, which can only be read forwards
+    def seekable(self):
+        return False
+
+class TestBidIngest(unittest.TestCase):
+    csvText: str = ('Auction Title,Auction ID,Department ,Winning Bid,InventoryID,Fund\n'
+                    + ''.join(f'"Chair, {auctionID}",{auctionID},GENERAL SERVICES,"$1,{auctionID:03d}.00 ","{auctionID},\n{auctionID + 1}",Enterprise\n'
+                              for auctionID in range(1, 26)))
+    
+    # Test that bids come out typed, in file order and in batches of the requested size
+    def test_read_batches(self):
+        batches = list(bidIngest.readBatches(io.StringIO(self.csvText), batchRows=10))
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+        self.assertEqual(batches[0][0], (1, 'Chair, 1', 'Enterprise', 1001.0))
+        self.assertEqual([record[0] for batch in batches for record in batch], list(range(1, 26)))
+        
+    # Test that a stream that can't seek back past the sniffed sample gives the same bids
+    def test_read_batches_non_seekable(self):
+        self.assertEqual(list(bidIngest.readBatches(NonSeekableFile(self.csvText), batchRows=10)),
+                         list(bidIngest.readBatches(io.StringIO(self.csvText), batchRows=10)))
+        
+    # Test that files without a header are rejected
+    def test_read_batches_no_header(self):
+        with self.assertRaises(bidIngest.FileFormatError):
+            list(bidIngest.readBatches(io.StringIO('1,2,3\n4,5,6\n7,8,9\n')))
+            
+    # Test that the memory mapped reader gives the same bids as the csv module, with or without quotes and CRLF line endings
+    def test_read_batches_mapped(self):
+        plainText: str = ''.join(f'Desk {auctionID},{auctionID},GENERAL SERVICES,$4.00 ,{auctionID},General Fund\n' for auctionID in range(26, 40))
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        for csvText in (self.csvText + plainText, (self.csvText + plainText).replace('\n', '\r\n')):
+            with self.subTest(crlf='\r' in csvText):
+                with open('test_bidIngest.csv', 'w', newline='') as csvFile:
+                    csvFile.write(csvText)
+                mapped = list(bidIngest.readBatchesMapped('test_bidIngest.csv', batchRows=10))
+                self.assertEqual([len(batch) for batch in mapped], [10, 10, 10, 9])
+                self.assertEqual(mapped, list(bidIngest.readBatches(io.StringIO(csvText, newline=''), batchRows=10)))
+                self.assertEqual(mapped[3][-1], (39, 'Desk 39', 'General Fund', 4.0))
+                
+    # Test that a quote written twice inside a quoted field reads the same from a path, an open file and the parallel reader,
+    # even when the sniffed sample has no such quote in it
+    def test_read_batches_doubled_quotes(self):
+        csvText: str = ('Auction ID,Auction Title,Fund,Winning Bid\n' + ''.join(f'{auctionID},Desk {auctionID},General Fund,$4.00 \n' for auctionID in range(1, 100))
+                        + '100,"HP 19"" Monitor",General Fund,$5.00 \n101,"Chair, ""Oak""",General Fund,$6.00 \n')
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        mapped = [record for batch in bidIngest.readBatches('test_bidIngest.csv') for record in batch]
+        self.assertEqual(mapped[-2:], [(100, 'HP 19" Monitor', 'General Fund', 5.0), (101, 'Chair, "Oak"', 'General Fund', 6.0)])
+        self.assertEqual([record for batch in bidIngest.readBatches(io.StringIO(csvText)) for record in batch], mapped)
+        self.assertEqual([record for batch in bidIngest.readBatchesParallel('test_bidIngest.csv', workers=2, chunkBytes=512) for record in batch], mapped)
+        
+    # Test that records spanning lines and blocks come out whole, whatever the block size
+    def test_project_records_blocks(self):
+        csvBytes: bytes = self.csvText.encode()
+        start: int = csvBytes.index(b'\n') + 1
+        expected = [record for batch in bidIngest.readBatches(io.StringIO(self.csvText)) for record in batch]
+        for blockBytes in (5, 16, 64, 1 << 20):
+            with self.subTest(blockBytes=blockBytes):
+                bids = [bid for block in bidIngest.projectRecords(csvBytes, start, len(csvBytes), ',', (1, 0, 5, 3), blockBytes) for bid in block]
+                self.assertEqual(bids, expected)
+                
+    # Test that a record missing bid columns is reported
+    def test_read_batches_mapped_short_record(self):
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(self.csvText + 'Desk,40,GENERAL SERVICES\n')
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        with self.assertRaises(bidIngest.FileFormatError):
+            list(bidIngest.readBatchesMapped('test_bidIngest.csv'))
+            
+    # Test that record starts skip newlines inside quoted fields
+    def test_find_record_start(self):
+        csvFile = io.BytesIO(b'a,b\n"x\ny",1\n"z",2\n')
+        self.assertEqual(bidIngest.findRecordStart(csvFile, 4, False), 4)
+        self.assertEqual(bidIngest.findRecordStart(csvFile, 6, True), 12)
+        self.assertEqual(bidIngest.findRecordStart(csvFile, 13, True), 18)
+        self.assertEqual(bidIngest.findRecordStart(csvFile, 17, False), 18)
+        
+    # Test that parsing tiny chunks in parallel gives the same bids, in order, as parsing serially
+    def test_read_batches_parallel(self):
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(self.csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        for chunkBytes in (7, 50, 1000):
+            with self.subTest(chunkBytes=chunkBytes):
+                parallel = [record for batch in bidIngest.readBatchesParallel('test_bidIngest.csv', 2, chunkBytes, 2) for record in batch]
+                self.assertEqual(parallel, [record for batch in bidIngest.readBatches('test_bidIngest.csv') for record in batch])
+                
+    # Test that stopping early shuts the parsers down
+    def test_read_batches_parallel_stop_early(self):
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(self.csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        batches = bidIngest.readBatchesParallel('test_bidIngest.csv', 2, 50, 1)
+        self.assertEqual(next(batches)[0][0], 1)
+        batches.close()
+        
+    # Test that a second read of an unchanged file comes from the cache and that changing the file invalidates it
+    def test_read_batches_cached(self):
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(self.csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        self.addCleanup(shutil.rmtree, 'test_bidIngestCache', ignore_errors=True)
+        expected = list(bidIngest.readBatches('test_bidIngest.csv'))
+        self.assertEqual(list(bidIngest.readBatchesCached('test_bidIngest.csv', cacheDirectory='test_bidIngestCache')), expected)
+        self.assertTrue(os.path.exists(bidIngest.cachePath('test_bidIngest.csv', 'test_bidIngestCache')))
+        
+        def _failingReader(csvPath):
+            raise AssertionError('Parsed a cached file')
+        cached = [record for batch in bidIngest.readBatchesCached('test_bidIngest.csv', _failingReader, 'test_bidIngestCache') for record in batch]
+        self.assertEqual(cached, [record for batch in expected for record in batch])
+        with open('test_bidIngest.csv', 'a') as csvFile:
+            csvFile.write('Desk,26,GENERAL SERVICES,$7.50 ,26,Enterprise\n')
+        reloaded = [record for batch in bidIngest.readBatchesCached('test_bidIngest.csv', cacheDirectory='test_bidIngestCache') for record in batch]
+        self.assertEqual(reloaded[-1], (26, 'Desk', 'Enterprise', 7.5))
+        
+    # Test that a damaged cache file is ignored and replaced
+    def test_read_batches_cached_damaged(self):
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(self.csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        self.addCleanup(shutil.rmtree, 'test_bidIngestCache', ignore_errors=True)
+        expected = list(bidIngest.readBatches('test_bidIngest.csv'))
+        list(bidIngest.readBatchesCached('test_bidIngest.csv', cacheDirectory='test_bidIngestCache'))
+        cacheFile: str = bidIngest.cachePath('test_bidIngest.csv', 'test_bidIngestCache')
+        for cacheBytes in (os.path.getsize(cacheFile) - 8, 40):
+            with self.subTest(cacheBytes=cacheBytes):
+                with open(cacheFile, 'r+b') as cache:
+                    cache.truncate(cacheBytes)
+                self.assertEqual(list(bidIngest.readBatchesCached('test_bidIngest.csv', cacheDirectory='test_bidIngestCache')), expected)
+                self.assertEqual(list(bidIngest.readBatchesCached('test_bidIngest.csv', cacheDirectory='test_bidIngestCache')), expected)
+        
+    # Test that compressed files give the same bids as the plain text, whatever the chunk size
+    def test_read_batches_compressed(self):
+        expected = list(bidIngest.readBatches(io.StringIO(self.csvText), batchRows=10))
+        for extension, opener in (('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open)):
+            with self.subTest(extension=extension):
+                with opener('test_bidIngest.csv' + extension, 'wt') as csvFile:
+                    csvFile.write(self.csvText)
+                self.addCleanup(os.remove, 'test_bidIngest.csv' + extension)
+                self.assertEqual(list(bidIngest.readBatches('test_bidIngest.csv' + extension, batchRows=10)), expected)
+                for chunkBytes in (5, 64):
+                    self.assertEqual(list(bidIngest.readBatchesCompressed('test_bidIngest.csv' + extension, 10, chunkBytes)), expected)
+        with self.assertRaises(bidIngest.FileFormatError):
+            next(bidIngest.readBatchesResumable('test_bidIngest.csv.gz'))
+            
+    # Test that stopping part way through a compressed file stops its decompressor thread
+    def test_decompress_chunks_closed(self):
+        with gzip.open('test_bidIngest.csv.gz', 'wt') as csvFile:
+            csvFile.write(self.csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv.gz')
+        chunks = bidIngest.decompressChunks('test_bidIngest.csv.gz', chunkBytes=16, maxQueuedChunks=1)
+        self.assertEqual(next(chunks), self.csvText.encode()[:16])
+        chunks.close()
+        self.assertNotIn('bidIngestDecompressor', [thread.name for thread in threading.enumerate()])
+        
+    # Test that a directory's CSV files are sorted into runs on disk, oldest file first, and merged with either duplicate policy
+    def test_merge_files(self):
+        os.makedirs('test_bidIngestBulk', exist_ok=True)
+        self.addCleanup(shutil.rmtree, 'test_bidIngestBulk')
+        header: str = 'Auction ID,Auction Title,Fund,Winning Bid\n'
+        with open('test_bidIngestBulk/newer.csv', 'w') as csvFile:
+            csvFile.write(header + '5,Desk,General Fund,$5\n2,Chair,Enterprise,$20\n')
+        with gzip.open('test_bidIngestBulk/older.csv.gz', 'wt') as csvFile:
+            csvFile.write(header + '3,Lamp,General Fund,$3\n2,Chair,General Fund,$2\n1,Table,Enterprise,$1\n')
+        with open('test_bidIngestBulk/notes.txt', 'w') as textFile:
+            textFile.write('not a csv')
+        os.utime('test_bidIngestBulk/older.csv.gz', (1_000_000, 1_000_000))
+        paths = bidIngest.expandSources('test_bidIngestBulk')
+        self.assertEqual([os.path.basename(path) for path in paths], ['older.csv.gz', 'newer.csv'])
+        self.assertEqual(bidIngest.expandSources('test_bidIngestBulk/*.csv'), ['test_bidIngestBulk/newer.csv'])
+        os.makedirs('test_bidIngestSort', exist_ok=True)
+        self.addCleanup(shutil.rmtree, 'test_bidIngestSort')
+        for workers, memoryBytes in ((1, 1 << 20), (2, 1 << 20), (2, 300)):
+            with self.subTest(workers=workers, memoryBytes=memoryBytes):
+                stats = []
+                merged = bidIngest.mergeFiles(paths, 'latest', workers, cached=False, memoryBytes=memoryBytes, tempDirectory='test_bidIngestSort', stats=stats)
+                self.assertEqual(list(merged), [(1, 'Table', 'Enterprise', 1.0), (2, 'Chair', 'Enterprise', 20.0),
+                                                (3, 'Lamp', 'General Fund', 3.0), (5, 'Desk', 'General Fund', 5.0)])
+                self.assertEqual([fileStats['rows'] for fileStats in stats], [3, 2])
+                self.assertEqual(os.listdir('test_bidIngestSort'), [])
+        self.assertEqual([record[3] for record in bidIngest.mergeFiles(paths, 'first', cached=False)], [1.0, 2.0, 3.0, 5.0])
+        with self.assertRaises(ValueError):
+            list(bidIngest.mergeRuns([[(1, 'Table', 'Enterprise', 1.0)]], 'newest'))
+        
+    # Test that following a file reads only whole appended rows, and starts again from the header when the file is replaced
+    def test_follow_batches(self):
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(self.csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        self.addCleanup(os.remove, 'test_bidIngest_rejects.csv')
+        stopping = threading.Event()
+        batches = bidIngest.followBatches('test_bidIngest.csv', bidIngest.followStart('test_bidIngest.csv'), 0.05, stopping)
+        self.addCleanup(batches.close)
+        with open('test_bidIngest.csv', 'a') as csvFile:
+            csvFile.write('"Desk, 26",26,GENERAL SERVICES,$26 ,26,Enterprise\nDesk 27,27,GEN')
+        bids, state = next(batches)
+        self.assertEqual(bids, [(26, 'Desk, 26', 'Enterprise', 26.0)])
+        with open('test_bidIngest.csv', 'a') as csvFile:
+            csvFile.write('ERAL SERVICES,$27 ,27,General Fund\nDesk 28,28,GENERAL SERVICES,unknown,28,General Fund\n')
+        bids, state = next(batches)
+        self.assertEqual(bids, [(27, 'Desk 27', 'General Fund', 27.0)])
+        self.assertEqual((state['rowsLoaded'], state['rowsRejected'], state['byteOffset']), (2, 1, os.path.getsize('test_bidIngest.csv')))
+        with open('test_bidIngest_rejects.csv') as rejectFile:
+            self.assertEqual(rejectFile.read().splitlines()[1:], ['Desk 28,28,GENERAL SERVICES,unknown,28,General Fund'])
+        # A new month's file in its place is read from its first row
+        with open('test_bidIngest.csv.new', 'w') as csvFile:
+            csvFile.write('Auction ID,Fund,Winning Bid,Auction Title\n40,Enterprise,$4,Lamp\n')
+        os.replace('test_bidIngest.csv.new', 'test_bidIngest.csv')
+        bids, state = next(batches)
+        self.assertEqual(bids, [(40, 'Lamp', 'Enterprise', 4.0)])
+        self.assertEqual(state['rowsLoaded'], 3)
+        stopping.set()
+        self.assertEqual(list(batches), [])
+        
+    # Test that a BidFollower collects appended rows on its own thread until stopped
+    def test_bid_follower(self):
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(self.csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        follower = bidIngest.BidFollower('test_bidIngest.csv', pollSeconds=0.05)
+        self.addCleanup(follower.stop)
+        self.assertEqual(follower.pending(), [])
+        with open('test_bidIngest.csv', 'a') as csvFile:
+            csvFile.write('Desk 26,26,GENERAL SERVICES,$26 ,26,Enterprise\n')
+        deadline = time.monotonic() + 5
+        bids = []
+        while not bids and time.monotonic() < deadline:
+            time.sleep(0.01)
+            bids = follower.pending()
+        self.assertEqual(bids, [(26, 'Desk 26', 'Enterprise', 26.0)])
+        self.assertEqual(follower.state['rowsLoaded'], 1)
+        follower.stop()
+        self.assertNotIn('bidIngestFollower', [thread.name for thread in threading.enumerate()])
+        
+    # Test that sorting in runs spilled to disk under a memory budget gives the same order as sorting in memory, with duplicate IDs in file order
+    def test_sorted_records(self):
+        csvText: str = 'Auction ID,Auction Title,Fund,Winning Bid\n' + ''.join(f'{auctionID % 7},Title {index},General Fund,${index}\n' for index, auctionID in enumerate(range(20, 0, -1)))
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        os.makedirs('test_bidIngestSort', exist_ok=True)
+        self.addCleanup(shutil.rmtree, 'test_bidIngestSort')
+        expected = sorted((record for batch in bidIngest.readBatches(io.StringIO(csvText)) for record in batch), key=lambda record: record[0])
+        for memoryBytes in (500, 2000, 1 << 20):
+            with self.subTest(memoryBytes=memoryBytes):
+                stats = {}
+                records = bidIngest.sortByAuctionId((record for batch in bidIngest.readBatches('test_bidIngest.csv') for record in batch), memoryBytes, 'test_bidIngestSort', stats)
+                self.assertEqual(list(records), expected)
+                self.assertEqual(stats['runs'] > 1, memoryBytes < 1 << 20)
+                self.assertEqual(list(bidIngest.sortedRecords('test_bidIngest.csv', memoryBytes, 'test_bidIngestSort')), expected)
+                self.assertEqual(os.listdir('test_bidIngestSort'), [])
+                
+    # Test that sortCsv keeps the header and every row exactly, duplicates in file order, whatever the memory budget
+    def test_sort_csv(self):
+        rows: list[str] = [f'{auctionID % 7},"Title, {index}",General Fund,"${index:,}.00 ",extra\n' for index, auctionID in enumerate(range(40, 0, -1))]
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write('Auction ID,Auction Title,Fund,Winning Bid,Note\n' + ''.join(rows))
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        self.addCleanup(os.remove, 'test_bidIngest.csv.sorted')
+        self.addCleanup(os.remove, 'test_bidIngest.csv.gz')
+        expected: str = 'Auction ID,Auction Title,Fund,Winning Bid,Note\n' + ''.join(sorted(rows, key=lambda row: int(row.split(',')[0])))
+        for outputPath, memoryBytes, opener in (('test_bidIngest.csv.sorted', 1 << 10, open), ('test_bidIngest.csv.sorted', 1 << 30, open),
+                                                ('test_bidIngest.csv.gz', 1 << 10, gzip.open)):
+            with self.subTest(outputPath=outputPath, memoryBytes=memoryBytes):
+                stats = bidIngest.sortCsv('test_bidIngest.csv', outputPath, memoryBytes)
+                self.assertEqual(stats['records'], 40)
+                self.assertEqual(stats['runs'] > 1, memoryBytes < 1 << 20)
+                with opener(outputPath, 'rt') as sortedFile:
+                    self.assertEqual(sortedFile.read(), expected)
+        sortedIds = [record[0] for batch in bidIngest.readBatchesSorted('test_bidIngest.csv', batchRows=7, memoryBytes=1000) for record in batch]
+        self.assertEqual(sortedIds, sorted(sortedIds))
+        self.assertEqual(len(sortedIds), 40)
+        
+    # Test that two exports diff into inserts, updates and deletes by auction ID, in change sets of the requested size
+    def test_diff_batches(self):
+        header: str = 'Auction ID,Auction Title,Fund,Winning Bid\n'
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(header + '4,Desk,General Fund,$4\n1,Chair,General Fund,$1\n2,Lamp,Enterprise,$2\n6,Rug,Enterprise,$6\n')
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        with open('test_bidIngest.csv.new', 'w') as csvFile:
+            csvFile.write(header + '5,Sofa,General Fund,$5\n2,Lamp,Enterprise,$2\n1,Chair,General Fund,$10\n6,Rug,Enterprise,$6\n3,Bed,Enterprise,$3\n3,Bed,Enterprise,$30\n')
+        self.addCleanup(os.remove, 'test_bidIngest.csv.new')
+        self.assertEqual(list(bidIngest.diffRecords('test_bidIngest.csv', 'test_bidIngest.csv.new', memoryBytes=300)),
+                         [('update', (1, 'Chair', 'General Fund', 10.0)), ('insert', (3, 'Bed', 'Enterprise', 3.0)),
+                          ('delete', (4, 'Desk', 'General Fund', 4.0)), ('insert', (5, 'Sofa', 'General Fund', 5.0))])
+        changeSets = list(bidIngest.diffBatches('test_bidIngest.csv', 'test_bidIngest.csv.new', batchRows=3))
+        self.assertEqual([{change: [record[0] for record in records] for change, records in changeSet.items()} for changeSet in changeSets],
+                         [{'insert': [3], 'update': [1], 'delete': [4]}, {'insert': [5], 'update': [], 'delete': []}])
+        self.assertEqual(list(bidIngest.diffRecords('test_bidIngest.csv', 'test_bidIngest.csv')), [])
+        
+    # Test that malformed rows go to the reject file and that resuming from a batch's progress reads only what came after it
+    def test_read_batches_resumable(self):
+        csvText: str = self.csvText.replace('"$1,007.00 "', 'unknown').replace('"$1,019.00 "', '$19') + 'Desk,26\n'
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(csvText)
+        self.addCleanup(os.remove, 'test_bidIngest.csv')
+        self.addCleanup(os.remove, 'test_bidIngest_rejects.csv')
+        batches = list(bidIngest.readBatchesResumable('test_bidIngest.csv', batchRows=5, blockBytes=100))
+        loaded = [record[0] for batch, _ in batches for record in batch]
+        self.assertEqual(loaded, [auctionID for auctionID in range(1, 26) if auctionID != 7])
+        self.assertEqual(batches[-1][1]['rowsLoaded'], 24)
+        self.assertEqual(batches[-1][1]['rowsRejected'], 2)
+        with open('test_bidIngest_rejects.csv') as rejectFile:
+            rejected = rejectFile.read()
+        self.assertTrue(rejected.startswith('Auction Title,Auction ID'))
+        self.assertEqual([row.split(',')[0] for row in rejected.splitlines()[1:]], ['"Chair', '8"', 'Desk'])
+        
+        # Resume from the middle batch, as if the load had stopped after it
+        progress = batches[len(batches) // 2][1]
+        resumed = [record[0] for batch, _ in bidIngest.readBatchesResumable('test_bidIngest.csv', progress, batchRows=5, blockBytes=100) for record in batch]
+        self.assertEqual(loaded[:progress['rowsLoaded']] + resumed, loaded)
+        with open('test_bidIngest_rejects.csv') as rejectFile:
+            self.assertEqual(rejectFile.read(), rejected)
+        self.assertTrue(bidIngest.checkpointMatches('test_bidIngest.csv', progress))
+        with open('test_bidIngest.csv', 'a') as csvFile:
+            csvFile.write('Desk,27,GENERAL SERVICES,$7.50 ,27,Enterprise\n')
+        self.assertTrue(bidIngest.checkpointMatches('test_bidIngest.csv', progress))
+        with open('test_bidIngest.csv', 'w') as csvFile:
+            csvFile.write(csvText.replace('Chair, 2', 'Chair, 9'))
+        self.assertFalse(bidIngest.checkpointMatches('test_bidIngest.csv', progress))
+        
+    # Test that a snapshot reads back the progress and bids it was written with
+    def test_snapshot(self):
+        self.addCleanup(os.remove, 'test_bidIngest.snapshot')
+        progress = {'byteOffset': 10, 'rowsLoaded': 2, 'rowsRejected': 0, 'rejectBytes': 0, 'anchor': 'x'}
+        bidIngest.writeSnapshot('test_bidIngest.snapshot', progress, iter([(1, 'Chair', 'Enterprise', 2.5), (2, 'Desk', 'General Fund', 3.0)]))
+        self.assertEqual(bidIngest.readSnapshot('test_bidIngest.snapshot'), (progress, [(1, 'Chair', 'Enterprise', 2.5), (2, 'Desk', 'General Fund', 3.0)]))
+        
+    # Test that exported files read back as the same bids, with the format picked by the file name
+    def test_export_records(self):
+        records = list(bidIngest.readBatches(io.StringIO(self.csvText), batchRows=10 ** 6))[0]
+        for path in ('test_bidIngestExport.csv', 'test_bidIngestExport.csv.xz', 'test_bidIngestExport.jsonl', 'test_bidIngestExport.jsonl.gz'):
+            with self.subTest(path=path):
+                self.addCleanup(os.remove, path)
+                self.assertEqual(bidIngest.exportRecords(iter(records), path), len(records))
+                if bidIngest.isJsonl(path):
+                    with (gzip.open(path, 'rt') if path.endswith('.gz') else open(path)) as exportFile:
+                        self.assertEqual([tuple(json.loads(line).values()) for line in exportFile], records)
+                else:
+                    with (lzma.open(path, 'rt', newline='') if path.endswith('.xz') else open(path, newline='')) as exportFile:
+                        self.assertEqual(list(csv.reader(exportFile)), [list(bidIngest.EXPORT_COLUMNS)] + [[str(value) for value in record] for record in records])
+        self.assertFalse(bidIngest.isJsonl('bids.jsonl.csv'))
+        
+    # Test parsing of winning bid amounts
+    def test_parse_amount(self):
+        self.assertEqual(bidIngest.parseAmount('$2,000.00 '), 2000.0)
+        self.assertEqual(bidIngest.parseAmount('$4'), 4.0)
+        
+if __name__ == '__main__':
+    unittest.main(verbosity=2)